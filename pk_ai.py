@@ -0,0 +1,293 @@
+import json
+import os
+from bisect import bisect_right
+from itertools import accumulate
+
+from pk_engine import NUM_AREAS, RandomStrategy, Strategy
+from pk_search import default_table
+
+# AIの戦略の実装と登録（pk_engine.Strategy を実装したもの）
+
+# 適応型AIの設定
+ADAPTIVE_DECAY = 0.9         # 1回の観測ごとに過去の観測の重みを何倍にするか
+ADAPTIVE_PRIOR = 0.5         # 各エリアの事前分布（ディリクレ分布）の重み
+ADAPTIVE_EXPLORE = 0.2       # 読みを外してランダムに選ぶ確率（読まれにくくするため）
+ADAPTIVE_BLEND = (0.5, 0.3, 0.2)  # 予測に使う（減衰事後分布, 遷移表, 出現頻度）の比率
+RESCALE_LIMIT = 1e12         # 減衰用の重みがこれを超えたら正規化し直す
+
+# 探索型AIの設定
+SEARCH_EXPLOIT = 0.2         # 互角以上のときに、均衡戦略の代わりに相手の傾向を突く確率
+SEARCH_EXPLOIT_TRAILING = 0.6  # 勝率が0.5を下回っているとき（リスクを取ってでも読みに賭ける）
+
+# 9エリアの重み付きでランダムに選ぶ戦略
+class WeightedStrategy(Strategy):
+    def __init__(self, name, kick_weights, save_weights):
+        self.name = name
+        self.kick_cumulative = list(accumulate(kick_weights))
+        self.save_cumulative = list(accumulate(save_weights))
+
+    def choose_kick(self, rng, round, own_score, opponent_score):
+        return bisect_right(self.kick_cumulative, rng.random() * self.kick_cumulative[-1])
+
+    def choose_save(self, rng, round, own_score, opponent_score):
+        return bisect_right(self.save_cumulative, rng.random() * self.save_cumulative[-1])
+
+# 相手の9エリアの選び方を学習するモデル
+# 更新も予測も定数時間で、新しいリストを作らない（フレーム落ちの原因にならないように）
+class OpponentModel:
+    def __init__(self, decay=ADAPTIVE_DECAY, prior=ADAPTIVE_PRIOR):
+        self.decay = decay
+        self.prior = prior
+        self.counts = [0] * NUM_AREAS                              # エリアごとの出現回数
+        self.total = 0
+        self.transitions = [0] * (NUM_AREAS * NUM_AREAS)           # 直前のエリア -> 次のエリアの回数
+        self.transition_totals = [0] * NUM_AREAS
+        self.posterior = [0.0] * NUM_AREAS                         # 減衰付きの観測重み（scale倍された値）
+        self.posterior_total = 0.0
+        self.scale = 1.0                                           # 次の観測に加える重み
+        self.last = -1                                             # 直前に選ばれたエリア
+
+    def update(self, area):
+        self.counts[area] += 1
+        self.total += 1
+        if self.last >= 0:
+            self.transitions[self.last * NUM_AREAS + area] += 1
+            self.transition_totals[self.last] += 1
+        self.last = area
+
+        # 過去の観測をすべてdecay倍する代わりに、新しい観測の重みを1/decay倍していく
+        self.scale /= self.decay
+        self.posterior[area] += self.scale
+        self.posterior_total += self.scale
+        if self.scale > RESCALE_LIMIT:
+            # 桁あふれしないようにまれに正規化し直す（エリア数は固定なので定数時間）
+            for i in range(NUM_AREAS):
+                self.posterior[i] /= self.scale
+            self.posterior_total /= self.scale
+            self.scale = 1.0
+
+    def probability(self, area):
+        # 相手が次にareaを選ぶ確率の予測
+        posterior_weight, transition_weight, frequency_weight = ADAPTIVE_BLEND
+
+        prior = self.prior * self.scale
+        posterior = (self.posterior[area] + prior) / (self.posterior_total + prior * NUM_AREAS)
+        frequency = (self.counts[area] + self.prior) / (self.total + self.prior * NUM_AREAS)
+        if self.last >= 0 and self.transition_totals[self.last] > 0:
+            transition = ((self.transitions[self.last * NUM_AREAS + area] + self.prior)
+                          / (self.transition_totals[self.last] + self.prior * NUM_AREAS))
+        else:
+            transition = posterior
+        return posterior_weight * posterior + transition_weight * transition + frequency_weight * frequency
+
+    def pick(self, rng, most_likely):
+        # 予測確率が最大（または最小）のエリアを選ぶ（同点はランダム）
+        best_area = 0
+        best_value = 0.0
+        ties = 0
+        for area in range(NUM_AREAS):
+            value = self.probability(area)
+            if not most_likely:
+                value = -value
+            if ties == 0 or value > best_value:
+                best_area = area
+                best_value = value
+                ties = 1
+            elif value == best_value:
+                ties += 1
+                if rng.randrange(ties) == 0:
+                    best_area = area
+        return best_area
+
+    def get_state(self):
+        return {
+            "counts": list(self.counts),
+            "transitions": list(self.transitions),
+            "posterior": [weight / self.scale for weight in self.posterior],
+            "last": self.last,
+        }
+
+    def set_state(self, state):
+        self.counts[:] = state["counts"]
+        self.total = sum(self.counts)
+        self.transitions[:] = state["transitions"]
+        for area in range(NUM_AREAS):
+            self.transition_totals[area] = sum(self.transitions[area * NUM_AREAS:(area + 1) * NUM_AREAS])
+        self.posterior[:] = state["posterior"]
+        self.posterior_total = sum(self.posterior)
+        self.scale = 1.0
+        self.last = state["last"]
+
+# 人間の癖（9エリアの選び方）を学習して読む戦略
+class AdaptiveStrategy(Strategy):
+    name = "adaptive"
+
+    def __init__(self, explore=ADAPTIVE_EXPLORE):
+        self.explore = explore
+        self.kicks = OpponentModel()  # 相手のシュートの傾向
+        self.saves = OpponentModel()  # 相手のダイビングの傾向
+
+    def choose_kick(self, rng, round, own_score, opponent_score):
+        # 相手キーパーが飛びそうにないエリアを狙う
+        if rng.random() < self.explore:
+            return rng.randint(0, NUM_AREAS - 1)
+        return self.saves.pick(rng, most_likely=False)
+
+    def choose_save(self, rng, round, own_score, opponent_score):
+        # 相手が狙いそうなエリアに飛ぶ
+        if rng.random() < self.explore:
+            return rng.randint(0, NUM_AREAS - 1)
+        return self.kicks.pick(rng, most_likely=True)
+
+    def observe(self, as_kicker, own_area, opponent_area, scored):
+        if as_kicker:
+            self.saves.update(opponent_area)
+        else:
+            self.kicks.update(opponent_area)
+
+    def get_state(self):
+        return {"kicks": self.kicks.get_state(), "saves": self.saves.get_state()}
+
+    def set_state(self, state):
+        self.kicks.set_state(state["kicks"])
+        self.saves.set_state(state["saves"])
+
+# 試合の残りを探索した勝率の表と均衡戦略を使う戦略
+# 均衡戦略は読まれても損をしない代わりに相手の癖を突けないので、負けている局面ほど
+# 相手の傾向（OpponentModel）への最善手を混ぜてリスクを取る
+class SearchStrategy(Strategy):
+    name = "search"
+
+    def __init__(self, table=None):
+        self.fixed_table = table is not None  # 渡された表はルールが変わっても使い続ける
+        self.table = table if table is not None else default_table()
+        self.cumulative_kick = list(accumulate(self.table.kick_mix))
+        self.cumulative_save = list(accumulate(self.table.save_mix))
+        self.kicks = OpponentModel()  # 相手のシュートの傾向
+        self.saves = OpponentModel()  # 相手のダイビングの傾向
+        self.kicks_first = False      # 先攻かどうか（試合の最初の呼び出しで判断する）
+        self.last_round = 0
+
+    def set_rules(self, rounds, sudden_death):
+        # ルールに合った表に切り替える（均衡の混合戦略はルールによらないので作り直さない）
+        if not self.fixed_table and (self.table.rounds, self.table.sudden_death) != (rounds, sudden_death):
+            self.table = default_table(rounds, sudden_death=sudden_death)
+        self.last_round = 0  # 新しい試合
+
+    def start_turn(self, round, kicking):
+        # 試合の最初がシュートなら先攻（エンジンのAIは常に後攻で、最初にセーブを聞かれる）
+        if round == 1 and self.last_round != 1:
+            self.kicks_first = kicking
+        self.last_round = round
+
+    def win_chance(self, round, kicking, own_score, opponent_score):
+        # 表から自分の勝率を引く（表は先攻から見た値）
+        if self.kicks_first:
+            return self.table.value(round, 0 if kicking else 1, own_score, opponent_score)
+        return 1 - self.table.value(round, 1 if kicking else 0, opponent_score, own_score)
+
+    def exploit_weight(self, round, kicking, own_score, opponent_score):
+        if self.win_chance(round, kicking, own_score, opponent_score) < 0.5:
+            return SEARCH_EXPLOIT_TRAILING
+        return SEARCH_EXPLOIT
+
+    def choose_kick(self, rng, round, own_score, opponent_score):
+        self.start_turn(round, True)
+        if rng.random() < self.exploit_weight(round, True, own_score, opponent_score):
+            # 相手キーパーの予測に対して、ゴールの確率が最も高いエリア
+            matrix = self.table.matrix
+            predicted = [self.saves.probability(area) for area in range(NUM_AREAS)]
+            return max(range(NUM_AREAS), key=lambda kick: sum(
+                matrix[kick][save] * predicted[save] for save in range(NUM_AREAS)))
+        return bisect_right(self.cumulative_kick, rng.random() * self.cumulative_kick[-1])
+
+    def choose_save(self, rng, round, own_score, opponent_score):
+        self.start_turn(round, False)
+        if rng.random() < self.exploit_weight(round, False, own_score, opponent_score):
+            # 相手キッカーの予測に対して、ゴールの確率が最も低いエリア
+            matrix = self.table.matrix
+            predicted = [self.kicks.probability(area) for area in range(NUM_AREAS)]
+            return min(range(NUM_AREAS), key=lambda save: sum(
+                matrix[kick][save] * predicted[kick] for kick in range(NUM_AREAS)))
+        return bisect_right(self.cumulative_save, rng.random() * self.cumulative_save[-1])
+
+    def observe(self, as_kicker, own_area, opponent_area, scored):
+        if as_kicker:
+            self.saves.update(opponent_area)
+        else:
+            self.kicks.update(opponent_area)
+
+    def get_state(self):
+        return {"kicks": self.kicks.get_state(), "saves": self.saves.get_state()}
+
+    def set_state(self, state):
+        self.kicks.set_state(state["kicks"])
+        self.saves.set_state(state["saves"])
+
+# 相手の直前の選択をまねる戦略
+class CopycatStrategy(Strategy):
+    name = "copycat"
+
+    def __init__(self):
+        self.last_kick = None  # 相手が直前にシュートしたエリア
+        self.last_save = None  # 相手が直前にダイビングしたエリア
+
+    def choose_kick(self, rng, round, own_score, opponent_score):
+        # 相手キーパーが前回飛んだ場所以外を狙う
+        if self.last_save is None:
+            return rng.randint(0, NUM_AREAS - 1)
+        return (self.last_save + rng.randint(1, NUM_AREAS - 1)) % NUM_AREAS
+
+    def choose_save(self, rng, round, own_score, opponent_score):
+        # 相手が前回狙った場所に飛ぶ
+        if self.last_kick is None:
+            return rng.randint(0, NUM_AREAS - 1)
+        return self.last_kick
+
+    def observe(self, as_kicker, own_area, opponent_area, scored):
+        if as_kicker:
+            self.last_save = opponent_area
+        else:
+            self.last_kick = opponent_area
+
+CORNERS = [1, 0, 1, 0, 0, 0, 1, 0, 1]
+BOTTOM_ROW = [0, 0, 0, 0, 0, 0, 1, 1, 1]
+UNIFORM = [1] * NUM_AREAS
+
+# 名前から戦略を生成する（トーナメントのワーカーでも同じ名前で生成できる）
+STRATEGIES = {
+    "random": RandomStrategy,
+    "corners": lambda: WeightedStrategy("corners", CORNERS, UNIFORM),
+    "low": lambda: WeightedStrategy("low", BOTTOM_ROW, BOTTOM_ROW),
+    "copycat": CopycatStrategy,
+    "adaptive": AdaptiveStrategy,
+    "search": SearchStrategy,
+}
+
+def create_strategy(name):
+    try:
+        factory = STRATEGIES[name]
+    except KeyError:
+        raise ValueError("unknown strategy: %s (choices: %s)" % (name, ", ".join(STRATEGIES))) from None
+    return factory()
+
+def save_profile(strategy, path):
+    # 学習状態をファイルに書き出す（書き込み途中で壊れないように置き換えで保存）
+    state = strategy.get_state()
+    if state is None:
+        return
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"strategy": strategy.name, "state": state}, f)
+    os.replace(temp_path, path)
+
+def load_profile(strategy, path):
+    # 同じ戦略で保存された学習状態があれば読み込む
+    if not os.path.exists(path):
+        return False
+    with open(path, encoding="utf-8") as f:
+        profile = json.load(f)
+    if profile.get("strategy") != strategy.name:
+        return False
+    strategy.set_state(profile["state"])
+    return True
@@ -0,0 +1,112 @@
+import math
+
+# 演出の共通の時計（pygameに依存しない）
+# 時刻は1フレームに1回だけ読み、すべての演出が同じ時刻を使う（演出どうしがずれない）
+# 星の軌道やボールの上下の動きなどの周期的な動きは、起動時に1周期分を表にしておいて引くだけにする
+
+ANIMATION_STEP_MS = 4        # 表の時間の刻み（240Hzの1フレームより細かい）
+
+# 点滅とフラッシュのタイミング（待機モードでは次に見た目が変わる時刻まで眠る）
+BLINK_CYCLE_MS = 800         # 「START GAME」などの点滅の周期
+BLINK_SWITCH_MS = 320        # 周期内でこの時刻を過ぎると黄色になる
+FLASH_CYCLE_MS = 5000        # メニューのフラッシュの周期
+FLASH_MS = 100               # フラッシュの長さ（不透明度はFLASH_MSから0まで下がる）
+
+# 周期的な動きの設定
+BALL_BOB_HEIGHT = 15         # メニューのボールの上下の幅
+RESULT_STARS = 8             # 勝利画面でトロフィーの周りを回る星の数
+TROPHY_SPARKLES = 3          # トロフィーのキラキラの数
+
+class PhaseTable:
+    # 周期periodの関数funcの値をstepミリ秒ごとに1周期分並べた表
+    # 周期がstepで割り切れない場合は最も近い長さに丸める（ずれは1刻み未満）
+    def __init__(self, period, func, step=ANIMATION_STEP_MS):
+        self.step = step
+        self.values = [func(i * step) for i in range(max(1, round(period / step)))]
+
+    def at(self, now):
+        return self.values[(now // self.step) % len(self.values)]
+
+def result_star_offsets(t):
+    # 勝利画面の星の位置（トロフィーの中心からのずれ）
+    star_time = t / 200
+    offsets = []
+    for i in range(RESULT_STARS):
+        angle = star_time / 10 + i * math.pi / 4
+        distance = 80 + math.sin(star_time / 5 + i) * 20
+        offsets.append((math.cos(angle) * distance, math.sin(angle) * distance))
+    return tuple(offsets)
+
+def trophy_sparkles(t):
+    # トロフィーのキラキラ (横のずれ, 縦のずれ, 大きさ)
+    star_time = t / 200
+    return tuple((math.cos(star_time + i * 2) * 15, math.sin(star_time + i) * 10,
+                  int(2 + math.sin(star_time * 2 + i) * 1))
+                 for i in range(TROPHY_SPARKLES))
+
+class AnimationClock:
+    def __init__(self, time_source, still=False):
+        # time_sourceはミリ秒の時刻を返す関数（書き出しやテストでは決まった時刻を返すものを渡す）
+        # stillなら待機画面の連続した動き（ボールの上下、星、キラキラ）を止める（待機モードで点滅の切り替わりまで眠れるように）
+        self.time_source = time_source
+        self.still = still
+        self.now = time_source()
+        self.ball_bob_table = PhaseTable(600 * math.pi, lambda t: math.sin(t / 300) * BALL_BOB_HEIGHT)
+        self.kick_meter_table = PhaseTable(1000 * math.pi, lambda t: (math.sin(t / 500) + 1) / 2)
+        self.save_meter_table = PhaseTable(600 * math.pi, lambda t: (math.sin(t / 300) + 1) / 2)
+        self.result_star_table = PhaseTable(2000 * math.pi, result_star_offsets)
+        self.sparkle_table = PhaseTable(400 * math.pi, trophy_sparkles)
+
+    def tick(self):
+        # フレームの最初に1回だけ時刻を読む
+        self.now = self.time_source()
+        return self.now
+
+    def blink(self, cycle, switch):
+        # 周期cycleのうちswitchを過ぎた後半ならTrue
+        return self.now % cycle > switch
+
+    def ball_bob(self):
+        return self.ball_bob_table.at(self.still_time())
+
+    def kick_meter(self):
+        # キックのパワーメーター（0〜1）
+        return self.kick_meter_table.at(self.now)
+
+    def save_meter(self):
+        # リアクションタイムメーター（0〜1、キックより速い）
+        return self.save_meter_table.at(self.now)
+
+    def result_stars(self):
+        return self.result_star_table.at(self.still_time())
+
+    def sparkles(self):
+        return self.sparkle_table.at(self.still_time())
+
+    def still_time(self):
+        # 止めた動きは時刻0の位置で描く
+        return 0 if self.still else self.now
+
+    def flash_alpha(self):
+        # メニューのフラッシュの不透明度（フラッシュ中でなければ0）
+        flash_time = self.now % FLASH_CYCLE_MS
+        return FLASH_MS - flash_time if flash_time < FLASH_MS else 0
+
+    def cycle_frame(self, interval, count):
+        # intervalミリ秒ごとに切り替わるcount枚のうちの何枚目か
+        return (self.now // interval) % count
+
+    def next_change(self, flash=False):
+        # 次に点滅（とフラッシュ）の見た目が変わるまでのミリ秒（待機モード用）
+        now = self.time_source()
+        phase = now % BLINK_CYCLE_MS
+        if phase <= BLINK_SWITCH_MS:
+            timeout = BLINK_SWITCH_MS + 1 - phase
+        else:
+            timeout = BLINK_CYCLE_MS - phase
+        if flash:
+            flash_time = now % FLASH_CYCLE_MS
+            if flash_time < FLASH_MS:
+                return 0
+            timeout = min(timeout, FLASH_CYCLE_MS - flash_time)
+        return timeout
@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import time
+
+# 描画ベンチマーク（ディスプレイのないCIでも動くようにダミーのビデオドライバーで実行する）
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from pk_engine import GameState
+from pk_game import SCALE_MODES, PKGame, parse_size
+from pk_profiler import FrameProfiler
+
+# 計測する描画関数
+DRAW_FUNCTIONS = (
+    "draw", "draw_menu", "draw_kicking_view", "draw_goalkeeping_view", "draw_result",
+    "draw_field", "draw_goal", "draw_iss_character", "draw_iss_ball", "draw_snes_trophy",
+)
+
+# 台本の設定（各画面でどれだけ待ってから入力するか）
+IDLE_FRAMES = 30             # メニューと結果画面で待つフレーム数
+AIM_FRAMES = 8               # キッカー/キーパーの方向キーの間隔
+AIM_KEYS = (pygame.K_UP, pygame.K_LEFT, pygame.K_DOWN, pygame.K_RIGHT, pygame.K_RIGHT)
+
+class ScriptedPlayer:
+    # 画面の状態を見て決まった順番でキーを押す（MENU → 5ラウンド → RESULT → MENU ...）
+    def __init__(self):
+        self.wait = 0
+        self.aim_index = 0
+        self.matches = 0
+
+    def keys(self, engine):
+        if engine.is_animating:
+            return ()
+        self.wait += 1
+        if engine.session.state in (GameState.MENU, GameState.RESULT):
+            if self.wait < IDLE_FRAMES:
+                return ()
+            if engine.session.state == GameState.RESULT:
+                self.matches += 1
+            self.wait = 0
+            return (pygame.K_SPACE,)
+
+        # キッカー/キーパー: 方向キーをいくつか押してから決定
+        if self.wait < AIM_FRAMES:
+            return ()
+        self.wait = 0
+        if self.aim_index < len(AIM_KEYS):
+            key = AIM_KEYS[(self.aim_index + engine.session.round) % len(AIM_KEYS)]
+            self.aim_index += 1
+            return (key,)
+        self.aim_index = 0
+        return (pygame.K_SPACE,)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_benchmark(frames, matches=None, seed=0, game_options=None):
+    game = PKGame(seed=seed, **(game_options or {}))
+    profiler = FrameProfiler(stages=DRAW_FUNCTIONS)
+    profiler.attach(game)
+    player = ScriptedPlayer()
+    frame_times = []
+    states = {}
+
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    while len(frame_times) < frames and (matches is None or player.matches < matches):
+        frame_start = perf_counter()
+        profiler.begin_frame()
+
+        for key in player.keys(game.engine):
+            game.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+        game.update()
+        game.draw()
+
+        frame_time = perf_counter() - frame_start
+        frame_times.append(frame_time)
+        profiler.end_frame()
+        state = game.engine.session.state.name
+        states[state] = states.get(state, 0) + 1
+    elapsed = perf_counter() - start
+    pygame.quit()
+
+    frame_times.sort()
+    count = len(frame_times)
+    return {
+        "frames": count,
+        "matches": player.matches,
+        "elapsed": elapsed,
+        "fps": count / elapsed if elapsed else 0.0,
+        "frame_ms": {
+            "mean": sum(frame_times) / count * 1000 if count else 0.0,
+            "p50": percentile(frame_times, 0.50) * 1000,
+            "p95": percentile(frame_times, 0.95) * 1000,
+            "p99": percentile(frame_times, 0.99) * 1000,
+            "max": frame_times[-1] * 1000 if count else 0.0,
+        },
+        "frames_per_state": states,
+        "draw_functions": {
+            name: {
+                "calls": profiler.stats[name].calls,
+                "total_ms": profiler.stats[name].total * 1000,
+                "per_frame_ms": profiler.stats[name].total * 1000 / count if count else 0.0,
+            }
+            for name in DRAW_FUNCTIONS
+        },
+    }
+
+def format_report(result):
+    lines = [
+        "frames: %d  matches: %d  elapsed: %.2fs  fps: %.1f" % (
+            result["frames"], result["matches"], result["elapsed"], result["fps"]),
+        "frame time (ms): mean %.3f  p50 %.3f  p95 %.3f  p99 %.3f  max %.3f" % tuple(
+            result["frame_ms"][key] for key in ("mean", "p50", "p95", "p99", "max")),
+        "frames per state: " + ", ".join("%s=%d" % item for item in result["frames_per_state"].items()),
+        "",
+        "%-24s %8s %12s %14s" % ("function", "calls", "total ms", "ms per frame"),
+    ]
+    for name, row in sorted(result["draw_functions"].items(), key=lambda item: -item[1]["total_ms"]):
+        lines.append("%-24s %8d %12.1f %14.4f" % (name, row["calls"], row["total_ms"], row["per_frame_ms"]))
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="フレームレート制限なしで描画を計測するベンチマーク")
+    parser.add_argument("-n", "--frames", type=int, default=3000, help="計測するフレーム数の上限")
+    parser.add_argument("--matches", type=int, help="この試合数を終えたら終了する")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--dirty-rects", action="store_true", help="ダーティ矩形モードで計測する")
+    parser.add_argument("--size", type=parse_size, help="ウィンドウの大きさ（例: 3840x2160）")
+    parser.add_argument("--scale", choices=SCALE_MODES, default="nearest", help="拡大方法")
+    parser.add_argument("--json", help="結果をJSONで書き出すファイル")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.frames, args.matches, args.seed, {
+        "dirty_rects": args.dirty_rects, "window_size": args.size, "scale_mode": args.scale})
+    print(format_report(result))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
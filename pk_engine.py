@@ -0,0 +1,410 @@
+import argparse
+import random
+import zlib
+from enum import Enum, IntEnum
+
+# PKゲームのルールと状態遷移（pygameに依存しない試合エンジン）
+
+# ルールの設定
+ROUNDS = 5                   # PKのラウンド数
+NUM_AREAS = 9                # ゴールのエリア数（3x3）
+SUPER_SAVE_CHANCE = 0.1      # 三角飛び（必ずセーブする特殊能力）の発動確率
+TICK_RATE = 60               # 1秒あたりのtick数（表示のフレームレートとは独立）
+KICK_ANIMATION_TICKS = 60    # キックのアニメーション時間（1tick = 1/60秒）
+
+# ゴールエリアの定義
+class GoalArea(Enum):
+    TOP_LEFT = 0
+    TOP_CENTER = 1
+    TOP_RIGHT = 2
+    MIDDLE_LEFT = 3
+    MIDDLE_CENTER = 4
+    MIDDLE_RIGHT = 5
+    BOTTOM_LEFT = 6
+    BOTTOM_CENTER = 7
+    BOTTOM_RIGHT = 8
+
+# ゲームの状態
+class GameState(Enum):
+    MENU = 0
+    PLAYER_KICKING = 1
+    AI_GOALKEEPING = 2
+    AI_KICKING = 3
+    PLAYER_GOALKEEPING = 4
+    RESULT = 5
+
+# プレイヤーの入力（キー操作をエンジンの操作に変換したもの）
+class Action(IntEnum):
+    NONE = 0
+    UP = 1
+    DOWN = 2
+    LEFT = 3
+    RIGHT = 4
+    CONFIRM = 5
+
+def parse_rounds(value):
+    # コマンドラインの --rounds（1以上の整数）
+    try:
+        rounds = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("rounds must be an integer: %s" % value) from None
+    if rounds < 1:
+        raise argparse.ArgumentTypeError("rounds must be at least 1: %s" % value)
+    return rounds
+
+def move_area(area, action):
+    # 3x3のグリッド内で選択エリアを移動する（端ではそのまま）
+    row, col = divmod(area.value, 3)
+    if action == Action.UP and row > 0:
+        row -= 1
+    elif action == Action.DOWN and row < 2:
+        row += 1
+    elif action == Action.LEFT and col > 0:
+        col -= 1
+    elif action == Action.RIGHT and col < 2:
+        col += 1
+    return GoalArea(row * 3 + col)
+
+def resolve_kick(kick_area, save_area, super_save):
+    # キックの判定（三角飛び発動時は必ずセーブ）
+    return not super_save and kick_area != save_area
+
+def match_over(rounds, sudden_death, first_kicks, second_kicks, first_score, second_score, play_out=False):
+    # 勝敗が決まったか（残りを全部決めても追いつけなければ、規定のラウンド数を待たずに終わる）
+    # サドンデスでは、規定のラウンド数の後も同点なら1ラウンドずつ続ける
+    # play_outなら勝敗が決まっても規定のラウンド数まで蹴る（以前の動き）
+    target = max(rounds, first_kicks, second_kicks)  # 現在のラウンドまでに各チームが蹴る本数
+    first_left = target - first_kicks
+    second_left = target - second_kicks
+    if not play_out and (first_score + first_left < second_score or second_score + second_left < first_score):
+        return True
+    if first_left or second_left:
+        return False
+    return first_score != second_score or not sudden_death
+
+# AIのキッカー/キーパーの戦略（エリアは0〜8の整数で扱う）
+class Strategy:
+    name = "base"
+
+    def choose_kick(self, rng, round, own_score, opponent_score):
+        # シュートするエリアを返す
+        raise NotImplementedError
+
+    def choose_save(self, rng, round, own_score, opponent_score):
+        # ダイビングするエリアを返す
+        raise NotImplementedError
+
+    def observe(self, as_kicker, own_area, opponent_area, scored):
+        # キックの結果を受け取る（学習する戦略だけが使う）
+        pass
+
+    def set_rules(self, rounds, sudden_death):
+        # 試合のルール（ラウンド数とサドンデスの有無）を受け取る（ルールで判断が変わる戦略だけが使う）
+        pass
+
+    def get_state(self):
+        # 保存しておく学習状態（学習しない戦略はNone）
+        return None
+
+    def set_state(self, state):
+        # get_state() で取り出した学習状態を復元する
+        pass
+
+# 一様ランダムにエリアを選ぶ戦略（従来のAI）
+class RandomStrategy(Strategy):
+    name = "random"
+
+    def choose_kick(self, rng, round, own_score, opponent_score):
+        return rng.randint(0, NUM_AREAS - 1)
+
+    def choose_save(self, rng, round, own_score, opponent_score):
+        return rng.randint(0, NUM_AREAS - 1)
+
+def play_shootout(home, away, rng, rounds=ROUNDS, super_save_chance=SUPER_SAVE_CHANCE, sudden_death=False):
+    # 戦略同士のPK戦をアニメーションなしで1試合行う（homeが先攻、勝敗が決まった時点で終わる）
+    home.set_rules(rounds, sudden_death)
+    away.set_rules(rounds, sudden_death)
+    home_score = 0
+    away_score = 0
+    round = 1
+    while True:
+        # homeのキック
+        kick = home.choose_kick(rng, round, home_score, away_score)
+        save = away.choose_save(rng, round, away_score, home_score)
+        scored = resolve_kick(kick, save, rng.random() < super_save_chance)
+        home_score += scored
+        home.observe(True, kick, save, scored)
+        away.observe(False, save, kick, scored)
+        if match_over(rounds, sudden_death, round, round - 1, home_score, away_score):
+            break
+
+        # awayのキック
+        kick = away.choose_kick(rng, round, away_score, home_score)
+        save = home.choose_save(rng, round, home_score, away_score)
+        scored = resolve_kick(kick, save, rng.random() < super_save_chance)
+        away_score += scored
+        away.observe(True, kick, save, scored)
+        home.observe(False, save, kick, scored)
+        if match_over(rounds, sudden_death, round, round, home_score, away_score):
+            break
+        round += 1
+    return home_score, away_score
+
+# 各キックの結果（GameSession.resultsに1キック2ビットで詰める）
+PLAYER_SIDE = 0
+AI_SIDE = 1
+RESULT_NONE = 0              # まだ蹴っていない
+RESULT_MISS = 1
+RESULT_GOAL = 2
+RESULT_VALUES = (None, False, True, None)  # 2ビットの値 -> 結果 (None=未実施, True=ゴール, False=失敗)
+
+# 1試合分の状態（属性を__slots__で固定し、snapshot()/restore()で丸ごと複製できる）
+# 複製は整数・列挙型・文字列の参照をタプルに詰めるだけなので、状態の大きさによらず定数時間
+# ルール（rounds, sudden_death）は試合中に変わらないので複製の対象に含めない
+class GameSession:
+    __slots__ = ("rounds", "sudden_death",
+                 "state", "round", "player_score", "ai_score", "results",
+                 "selected_area", "ai_selected_area", "player_choice", "ai_choice",
+                 "result_message", "animation_timer", "super_save", "show_sankaku_tobi")
+
+    def __init__(self, rounds=ROUNDS, sudden_death=False):
+        self.rounds = rounds
+        self.sudden_death = sudden_death
+        self.reset()
+
+    def reset(self):
+        self.state = GameState.MENU
+        self.round = 1
+        self.player_score = 0
+        self.ai_score = 0
+        self.results = 0                        # 各ラウンドの結果（ラウンドとキッカーごとに2ビット）
+        self.selected_area = GoalArea.MIDDLE_CENTER
+        self.ai_selected_area = None
+        self.player_choice = None               # 三角飛びで位置が変わる前の、双方が選んだエリア
+        self.ai_choice = None
+        self.result_message = ""
+        self.animation_timer = 0
+        self.super_save = False                 # 三角飛び発動フラグ
+        self.show_sankaku_tobi = False          # 三角飛びメッセージの表示フラグ
+
+    def snapshot(self):
+        return (self.state, self.round, self.player_score, self.ai_score, self.results,
+                self.selected_area, self.ai_selected_area, self.player_choice, self.ai_choice,
+                self.result_message, self.animation_timer, self.super_save, self.show_sankaku_tobi)
+
+    def restore(self, snapshot):
+        (self.state, self.round, self.player_score, self.ai_score, self.results,
+         self.selected_area, self.ai_selected_area, self.player_choice, self.ai_choice,
+         self.result_message, self.animation_timer, self.super_save, self.show_sankaku_tobi) = snapshot
+
+    def copy(self):
+        session = GameSession.__new__(GameSession)
+        session.rounds = self.rounds
+        session.sudden_death = self.sudden_death
+        session.restore(self.snapshot())
+        return session
+
+    @property
+    def rounds_played(self):
+        # 結果が記録されているラウンド数（1ラウンドは4ビット）
+        return (self.results.bit_length() + 3) // 4
+
+    def result(self, side, round_index):
+        # round_index（0始まり）のラウンドでsideが蹴った結果 (None=未実施, True=ゴール, False=失敗)
+        return RESULT_VALUES[(self.results >> ((round_index * 2 + side) * 2)) & 3]
+
+    def set_result(self, side, round_index, scored):
+        shift = (round_index * 2 + side) * 2
+        self.results = (self.results & ~(3 << shift)) | ((RESULT_GOAL if scored else RESULT_MISS) << shift)
+
+    @property
+    def player_results(self):
+        return [self.result(PLAYER_SIDE, i) for i in range(max(self.rounds, self.rounds_played))]
+
+    @property
+    def ai_results(self):
+        return [self.result(AI_SIDE, i) for i in range(max(self.rounds, self.rounds_played))]
+
+    @property
+    def is_animating(self):
+        # キックのアニメーション中（入力を受け付けずに時間だけが進む状態）
+        return self.state in (GameState.AI_GOALKEEPING, GameState.AI_KICKING)
+
+class MatchEngine:
+    def __init__(self, seed=None, ai=None, rounds=ROUNDS, sudden_death=False, play_out=False):
+        self.rng = random.Random(seed)
+        self.ai = ai if ai is not None else RandomStrategy()
+        self.ai.set_rules(rounds, sudden_death)
+        self.play_out = play_out  # 勝敗が決まっても規定のラウンド数まで蹴る（古いリプレイの再生用）
+        self.session = GameSession(rounds, sudden_death)  # 試合の状態（リセットしても同じオブジェクトを使い続ける）
+        # 試合の経過を受け取るオブジェクト（match_started / kick_finished / match_finished を持つ。試合の記録用）
+        # 状態を変えずに受け取るだけなので、リプレイの再現性には影響しない
+        self.observers = []
+
+    def reset(self):
+        self.session.reset()
+
+    def snapshot(self):
+        # 試合の状態と乱数の状態をまとめて保存する
+        return self.session.snapshot(), self.rng.getstate()
+
+    def restore(self, snapshot):
+        session, rng_state = snapshot
+        self.session.restore(session)
+        self.rng.setstate(rng_state)
+
+    def fingerprint(self):
+        # 状態の要約値（リプレイが記録時と一致しているかの確認用）
+        session = self.session
+        state = (session.state, session.round, session.player_score, session.ai_score,
+                 session.player_results, session.ai_results, session.selected_area, session.ai_selected_area,
+                 session.animation_timer, session.super_save, session.show_sankaku_tobi, self.rng.getstate())
+        return zlib.crc32(repr(state).encode())
+
+    @property
+    def is_animating(self):
+        return self.session.is_animating
+
+    def choose_ai_area(self):
+        # AIの戦略でシュート方向またはセーブ方向を決定
+        session = self.session
+        if session.state == GameState.PLAYER_KICKING:
+            area = self.ai.choose_save(self.rng, session.round, session.ai_score, session.player_score)
+        else:
+            area = self.ai.choose_kick(self.rng, session.round, session.ai_score, session.player_score)
+        return GoalArea(area)
+
+    def apply(self, action):
+        # プレイヤーの入力を処理
+        session = self.session
+        if session.state == GameState.MENU:
+            if action == Action.CONFIRM:
+                session.state = GameState.PLAYER_KICKING
+                for observer in self.observers:
+                    observer.match_started(self)
+
+        elif session.state in (GameState.PLAYER_KICKING, GameState.PLAYER_GOALKEEPING):
+            if action == Action.CONFIRM:
+                # AIのゴールキーパー（またはキッカー）の動きを決定
+                session.ai_selected_area = self.choose_ai_area()
+                # 三角飛びで位置が変わる前の、双方が選んだエリア
+                session.player_choice = session.selected_area
+                session.ai_choice = session.ai_selected_area
+                if session.state == GameState.PLAYER_KICKING:
+                    session.state = GameState.AI_GOALKEEPING
+                else:
+                    session.state = GameState.AI_KICKING
+                session.animation_timer = 0
+            else:
+                session.selected_area = move_area(session.selected_area, action)
+
+        elif session.state == GameState.RESULT:
+            if action == Action.CONFIRM:
+                session.reset()
+
+    def step(self):
+        # 1tick分だけ状態を進める
+        session = self.session
+        if not session.is_animating:
+            return
+
+        # キック直後に三角飛び判定を行う
+        if session.animation_timer == 0:
+            self.roll_super_save()
+
+        session.animation_timer += 1
+        if session.animation_timer > KICK_ANIMATION_TICKS:
+            self.finish_kick()
+
+    def advance(self, ticks):
+        # 複数tickをまとめて進める（入力待ちの状態では何も起きないので止まる）
+        session = self.session
+        while ticks > 0 and session.is_animating:
+            if session.animation_timer > 0:
+                # 判定の直前まではタイマーを進めるだけでよい
+                skip = min(ticks, KICK_ANIMATION_TICKS - session.animation_timer)
+                session.animation_timer += skip
+                ticks -= skip
+                if ticks == 0:
+                    break
+            self.step()
+            ticks -= 1
+
+    def roll_super_save(self):
+        # 10%の確率で必ずセーブする特殊能力
+        session = self.session
+        session.super_save = self.rng.random() < SUPER_SAVE_CHANCE
+
+        # 特殊能力が発動した場合、キーパーの位置をキッカーが選んだ位置に強制移動
+        if session.state == GameState.AI_GOALKEEPING:
+            kick_area, save_area = session.selected_area, session.ai_selected_area
+        else:
+            kick_area, save_area = session.ai_selected_area, session.selected_area
+
+        if session.super_save and kick_area != save_area:
+            if session.state == GameState.AI_GOALKEEPING:
+                session.ai_selected_area = kick_area
+            else:
+                session.selected_area = kick_area
+            session.show_sankaku_tobi = True
+        else:
+            session.show_sankaku_tobi = False
+
+    def finish_kick(self):
+        # 判定結果を適用
+        session = self.session
+        session.animation_timer = 0
+
+        if session.state == GameState.AI_GOALKEEPING:
+            scored = resolve_kick(session.selected_area, session.ai_selected_area, session.super_save)
+            session.set_result(PLAYER_SIDE, session.round - 1, scored)
+            self.ai.observe(False, session.ai_choice.value, session.player_choice.value, scored)
+            self.notify_kick(PLAYER_SIDE, session.player_choice, session.ai_choice, scored)
+            if scored:
+                session.player_score += 1
+                session.result_message = "GOAL!"
+            else:
+                session.result_message = "SAVED!"
+
+            # 次のフェーズへ（AIが残りを全部決めても追いつけなければ試合終了）
+            if self.is_over(session.round, session.round - 1):
+                self.finish_match()
+            else:
+                session.state = GameState.PLAYER_GOALKEEPING
+                session.selected_area = GoalArea.MIDDLE_CENTER
+
+        else:
+            scored = resolve_kick(session.ai_selected_area, session.selected_area, session.super_save)
+            session.set_result(AI_SIDE, session.round - 1, scored)
+            self.ai.observe(True, session.ai_choice.value, session.player_choice.value, scored)
+            self.notify_kick(AI_SIDE, session.ai_choice, session.player_choice, scored)
+            if scored:
+                session.ai_score += 1
+                session.result_message = "GOAL CONCEDED!"
+            else:
+                session.result_message = "NICE SAVE!"
+
+            # 次のラウンドへ
+            over = self.is_over(session.round, session.round)
+            session.round += 1
+            if over:
+                self.finish_match()
+            else:
+                session.state = GameState.PLAYER_KICKING
+                session.selected_area = GoalArea.MIDDLE_CENTER
+
+    def is_over(self, player_kicks, ai_kicks):
+        session = self.session
+        return match_over(session.rounds, session.sudden_death, player_kicks, ai_kicks,
+                          session.player_score, session.ai_score, self.play_out)
+
+    def notify_kick(self, side, kick_area, save_area, scored):
+        # 選んだエリアは三角飛びで位置が変わる前のもの
+        for observer in self.observers:
+            observer.kick_finished(self, side, kick_area, save_area, self.session.super_save, scored)
+
+    def finish_match(self):
+        self.session.result_message = ""  # 結果メッセージをクリア
+        self.session.state = GameState.RESULT
+        for observer in self.observers:
+            observer.match_finished(self)
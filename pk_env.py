@@ -0,0 +1,276 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from pk_ai import create_strategy
+from pk_engine import NUM_AREAS, ROUNDS, SUPER_SAVE_CHANCE, match_over, parse_rounds, resolve_kick
+from pk_sim import choose_areas, normalize_weights
+
+# 強化学習用の環境（Gym風の reset()/step()、pygameに依存しない）
+# 1ステップは学習するエージェントが関わる1キック。行動はエリア（GoalAreaの値 0〜8）で、
+# エージェントがキッカーならシュート方向、キーパーならダイビング方向になる
+# 試合は試合エンジンと同じルール（三角飛び、勝敗が決まった時点で終了、サドンデス）で進む
+#
+# 観測は小さな整数の配列 [ラウンド, キッカーか(1/0), 自分の得点, 相手の得点, 相手の直前のエリア]
+# （相手の直前のエリアはまだないときNUM_AREAS）
+# 報酬は試合の終わりにだけ与える（勝ち=1, 引き分け=0, 負け=-1）
+
+OBS_ROUND = 0
+OBS_KICKING = 1
+OBS_OWN_SCORE = 2
+OBS_OPPONENT_SCORE = 3
+OBS_LAST_OPPONENT_AREA = 4
+OBS_SIZE = 5
+OBS_DTYPE = np.int16
+NO_AREA = NUM_AREAS          # 相手の直前のエリアがまだないとき
+ROLES = ("both", "kicker", "keeper")  # エージェントが選ぶ場面（選ばない場面は一様ランダムに選ぶ）
+WIN_REWARD = 1.0
+LOSS_REWARD = -1.0
+
+def outcome_reward(own_score, opponent_score):
+    if own_score > opponent_score:
+        return WIN_REWARD
+    return 0.0 if own_score == opponent_score else LOSS_REWARD
+
+class PKEnv:
+    # 1試合ずつ進める環境（相手はpk_aiの戦略）
+    def __init__(self, opponent="random", rounds=ROUNDS, sudden_death=False,
+                 super_save_chance=SUPER_SAVE_CHANCE, role="both", agent_first=True, seed=None):
+        if role not in ROLES:
+            raise ValueError("unknown role: %s (choices: %s)" % (role, ", ".join(ROLES)))
+        self.opponent = create_strategy(opponent) if isinstance(opponent, str) else opponent
+        self.rounds = rounds
+        self.sudden_death = sudden_death
+        self.super_save_chance = super_save_chance
+        self.role = role
+        self.agent_first = agent_first
+        self.rng = random.Random(seed)
+        self.reset()
+
+    def reset(self, seed=None):
+        # (観測, 情報) を返す
+        if seed is not None:
+            self.rng.seed(seed)
+        self.opponent.set_rules(self.rounds, self.sudden_death)
+        self.round = 1
+        self.first_kicked = False    # このラウンドで先攻が蹴り終わったか
+        self.scores = [0, 0]         # [エージェント, 相手]
+        self.last_opponent_area = NO_AREA
+        self.done = False
+        self.skip_uncontrolled()
+        return self.observation(), {}
+
+    @property
+    def agent_kicking(self):
+        # 今のキックでエージェントが蹴るか（先攻の番かどうかとエージェントが先攻かどうかで決まる）
+        return self.first_kicked != self.agent_first
+
+    def controls(self, kicking):
+        return self.role == "both" or (self.role == "kicker") == kicking
+
+    def observation(self):
+        return np.array((self.round, self.agent_kicking, self.scores[0], self.scores[1], self.last_opponent_area),
+                        dtype=OBS_DTYPE)
+
+    def step(self, action):
+        # (観測, 報酬, 終了, 打ち切り, 情報) を返す
+        if self.done:
+            raise RuntimeError("step() called after the match ended; call reset()")
+        if not 0 <= action < NUM_AREAS:
+            raise ValueError("action must be an area 0-%d" % (NUM_AREAS - 1))
+        info = self.kick(int(action))
+        if not self.done:
+            self.skip_uncontrolled()
+        reward = outcome_reward(*self.scores) if self.done else 0.0
+        return self.observation(), reward, self.done, False, info
+
+    def skip_uncontrolled(self):
+        # エージェントが選ばない場面は一様ランダムに選んで進める
+        while not self.done and not self.controls(self.agent_kicking):
+            self.kick(self.rng.randrange(NUM_AREAS))
+
+    def kick(self, area):
+        kicking = self.agent_kicking
+        own, opponent = self.scores
+        if kicking:
+            opponent_area = self.opponent.choose_save(self.rng, self.round, opponent, own)
+            kick_area, save_area = area, opponent_area
+        else:
+            opponent_area = self.opponent.choose_kick(self.rng, self.round, opponent, own)
+            kick_area, save_area = opponent_area, area
+        super_save = self.rng.random() < self.super_save_chance
+        scored = resolve_kick(kick_area, save_area, super_save)
+        self.scores[0 if kicking else 1] += scored
+        self.opponent.observe(not kicking, opponent_area, area, scored)
+        self.last_opponent_area = opponent_area
+
+        # 先攻・後攻の順に直して勝敗の判定をする
+        first, second = (0, 1) if self.agent_first else (1, 0)
+        second_kicks = self.round if self.first_kicked else self.round - 1
+        self.done = match_over(self.rounds, self.sudden_death, self.round, second_kicks,
+                               self.scores[first], self.scores[second])
+        if self.first_kicked:
+            self.round += 1
+        self.first_kicked = not self.first_kicked
+        return {"kick_area": kick_area, "save_area": save_area, "super_save": super_save, "scored": scored}
+
+class PKVecEnv:
+    # n試合を配列でまとめて進める環境（相手は9エリアの重みで選ぶ、重みなしなら一様）
+    # 終わった試合はその場でリセットし、終わったときの観測はinfo["final_observation"]に入れる
+    def __init__(self, n, rounds=ROUNDS, sudden_death=False, super_save_chance=SUPER_SAVE_CHANCE,
+                 role="both", agent_first=True, opponent_kick_weights=None, opponent_save_weights=None, seed=None):
+        if role not in ROLES:
+            raise ValueError("unknown role: %s (choices: %s)" % (role, ", ".join(ROLES)))
+        self.n = n
+        self.rounds = rounds
+        self.sudden_death = sudden_death
+        self.super_save_chance = super_save_chance
+        self.role = role
+        self.agent_first = agent_first
+        self.opponent_kick_weights = normalize_weights(opponent_kick_weights)
+        self.opponent_save_weights = normalize_weights(opponent_save_weights)
+        self.rng = np.random.default_rng(seed)
+        self.round = np.ones(n, dtype=np.int32)
+        self.first_kicked = np.zeros(n, dtype=bool)
+        self.own_score = np.zeros(n, dtype=np.int32)
+        self.opponent_score = np.zeros(n, dtype=np.int32)
+        self.last_opponent_area = np.full(n, NO_AREA, dtype=np.int32)
+        self.obs = np.zeros((n, OBS_SIZE), dtype=OBS_DTYPE)  # 観測（stepのたびに上書きする）
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.reset_where(np.ones(self.n, dtype=bool))
+        return self.observation(), {}
+
+    def reset_where(self, mask):
+        self.round[mask] = 1
+        self.first_kicked[mask] = False
+        self.own_score[mask] = 0
+        self.opponent_score[mask] = 0
+        self.last_opponent_area[mask] = NO_AREA
+        if self.role != "both":
+            # エージェントが選ばない場面から始まる試合は先に進めておく（終わることはない）
+            self.skip_uncontrolled(mask)
+
+    def agent_kicking(self):
+        return self.first_kicked != self.agent_first
+
+    def observation(self):
+        obs = self.obs
+        obs[:, OBS_ROUND] = self.round
+        obs[:, OBS_KICKING] = self.agent_kicking()
+        obs[:, OBS_OWN_SCORE] = self.own_score
+        obs[:, OBS_OPPONENT_SCORE] = self.opponent_score
+        obs[:, OBS_LAST_OPPONENT_AREA] = self.last_opponent_area
+        return obs
+
+    def step(self, actions):
+        # actionsはn個のエリア。(観測, 報酬, 終了, 打ち切り, 情報) を返す
+        actions = np.asarray(actions)
+        if actions.shape != (self.n,):
+            raise ValueError("actions must have shape (%d,)" % self.n)
+        done = self.kick(actions, np.ones(self.n, dtype=bool))
+        if self.role != "both":
+            done |= self.skip_uncontrolled(~done)
+
+        rewards = np.zeros(self.n, dtype=np.float32)
+        info = {}
+        if done.any():
+            rewards[done] = np.sign(self.own_score[done] - self.opponent_score[done])
+            info["final_observation"] = self.observation()[done].copy()
+            self.reset_where(done)
+        return self.observation(), rewards, done, np.zeros(self.n, dtype=bool), info
+
+    def skip_uncontrolled(self, mask):
+        # エージェントが選ばない場面を一様ランダムに選んで進め、その間に終わった試合を返す
+        # （キッカーとキーパーの場面は交互に来るので、エージェントの番まで1キック進めればよい）
+        kicking = self.agent_kicking()
+        uncontrolled = mask & (~kicking if self.role == "kicker" else kicking)
+        if not uncontrolled.any():
+            return np.zeros(self.n, dtype=bool)
+        return self.kick(self.rng.integers(0, NUM_AREAS, self.n), uncontrolled)
+
+    def kick(self, areas, mask):
+        # maskの試合だけ1キック進め、勝敗が決まった試合をTrueにして返す
+        kicking = self.agent_kicking()
+        opponent_kicks = choose_areas(self.rng, self.opponent_kick_weights, self.n)
+        opponent_saves = choose_areas(self.rng, self.opponent_save_weights, self.n)
+        opponent_areas = np.where(kicking, opponent_saves, opponent_kicks)
+        super_save = self.rng.random(self.n) < self.super_save_chance
+        scored = (areas != opponent_areas) & ~super_save & mask
+        self.own_score += scored & kicking
+        self.opponent_score += scored & ~kicking
+        self.last_opponent_area = np.where(mask, opponent_areas, self.last_opponent_area)
+
+        # 先攻・後攻の順に直して、勝敗が決まったかを判定する（match_overを配列で行う）
+        if self.agent_first:
+            first_score, second_score = self.own_score, self.opponent_score
+        else:
+            first_score, second_score = self.opponent_score, self.own_score
+        first_kicked = self.first_kicked
+        target = np.maximum(self.round, self.rounds)
+        first_left = target - self.round
+        second_left = target - self.round + ~first_kicked
+        done = (first_score + first_left < second_score) | (second_score + second_left < first_score)
+        finished = (first_left == 0) & (second_left == 0)
+        if self.sudden_death:
+            finished &= first_score != second_score
+        done = (done | finished) & mask
+
+        self.round += mask & first_kicked
+        self.first_kicked = np.where(mask, ~first_kicked, first_kicked)
+        return done
+
+def benchmark(n, steps, seed=0, **options):
+    # 一様ランダムな行動で配列版を回したときの1秒あたりのステップ数と試合数
+    env = PKVecEnv(n, seed=seed, **options)
+    env.reset()
+    rng = np.random.default_rng(seed + 1)
+    actions = rng.integers(0, NUM_AREAS, (steps, n))
+    episodes = 0
+    total_reward = 0.0
+    start = time.perf_counter()
+    for i in range(steps):
+        _, rewards, done, _, _ = env.step(actions[i])
+        episodes += int(np.count_nonzero(done))
+        total_reward += float(rewards.sum())
+    elapsed = time.perf_counter() - start
+    return n * steps / elapsed, episodes / elapsed, total_reward / max(episodes, 1)
+
+def benchmark_single(steps, seed=0, **options):
+    env = PKEnv(seed=seed, **options)
+    rng = random.Random(seed + 1)
+    episodes = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, _, done, _, _ = env.step(rng.randrange(NUM_AREAS))
+        if done:
+            episodes += 1
+            env.reset()
+    elapsed = time.perf_counter() - start
+    return steps / elapsed, episodes / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="強化学習用の環境の速度を一様ランダムな行動で計測する")
+    parser.add_argument("--envs", type=int, default=4096, help="配列版でまとめて進める試合数")
+    parser.add_argument("--steps", type=int, default=1000, help="配列版のstep()の呼び出し回数")
+    parser.add_argument("--single-steps", type=int, default=100_000, help="1試合ずつの版のステップ数")
+    parser.add_argument("--rounds", type=parse_rounds, default=ROUNDS, help="1試合のラウンド数")
+    parser.add_argument("--sudden-death", action="store_true", help="同点ならサドンデスで決着をつける")
+    parser.add_argument("--role", choices=ROLES, default="both", help="エージェントが選ぶ場面")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    args = parser.parse_args()
+
+    options = {"rounds": args.rounds, "sudden_death": args.sudden_death, "role": args.role}
+    steps_per_second, episodes_per_second, mean_reward = benchmark(args.envs, args.steps, args.seed, **options)
+    print("vectorized: %.0f steps/s (%.1fM steps/min), %.0f matches/s, mean reward %.4f" % (
+        steps_per_second, steps_per_second * 60 / 1e6, episodes_per_second, mean_reward))
+    steps_per_second, episodes_per_second = benchmark_single(args.single_steps, args.seed, **options)
+    print("single:     %.0f steps/s (%.1fM steps/min), %.0f matches/s" % (
+        steps_per_second, steps_per_second * 60 / 1e6, episodes_per_second))
+
+if __name__ == "__main__":
+    main()
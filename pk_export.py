@@ -0,0 +1,238 @@
+import argparse
+import os
+import pickle
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# ウィンドウを出さずに描く（ワーカープロセスにも引き継がれる）
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # 生フレームを標準出力に流すときに混ざらないように
+
+import pygame
+
+from pk_engine import KICK_ANIMATION_TICKS, TICK_RATE, Action
+from pk_game import TICK_MS, PKGame, parse_size
+from pk_replay import Replay
+
+# リプレイを動画用の連番PNGまたは生のRGBフレームに書き出す（画面のキャプチャなしでハイライトを作る）
+# 1tickを1フレームとして、ゲームと同じ描画（render_state）で描く。演出の時計はフレーム番号から決めるので、
+# どのワーカーが描いても同じ絵になる
+# フレームの範囲を小さなタスクに分けて複数プロセスで描き、結果は順番どおりに受け取る。
+# 各タスクの開始フレームの状態は親プロセスが1回の再生で取り出して渡すので、ワーカーは自分の範囲だけを進める。
+# 描き終わって書き出し待ちのタスクは一定数までに抑える（生フレームでもメモリを使い切らない）
+#
+# 生フレームは ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 60 -i out.rgb out.mp4 のように変換できる
+
+CHUNK_FRAMES = 30            # 1タスクで描くフレーム数（800x600の生フレームで約43MB）
+PENDING_PER_WORKER = 2       # ワーカー1つあたりの書き出し待ちのタスク数の上限
+HIGHLIGHT_LEAD = TICK_RATE // 2   # ハイライトでキックの前に含めるフレーム数
+HIGHLIGHT_TAIL = TICK_RATE        # ハイライトで判定の後に含めるフレーム数（結果メッセージ）
+PNG_NAME = "frame_%06d.png"  # 連番PNGのファイル名
+PNG_LEVEL = 1                # PNGの圧縮レベル（ゲーム画面は単色の面が多いので1でも十分小さい）
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+class KickLog:
+    # 試合エンジンのオブザーバー: 判定が出たフレームと内容を記録する（ハイライト用）
+    def __init__(self):
+        self.frame = 0
+        self.kicks = []  # (フレーム, 蹴った側, 三角飛びか, ゴールか)
+
+    def match_started(self, engine):
+        pass
+
+    def kick_finished(self, engine, side, kick_area, save_area, super_save, scored):
+        self.kicks.append((self.frame, side, super_save, scored))
+
+    def match_finished(self, engine):
+        pass
+
+def frame_inputs(replay):
+    # フレーム番号 -> そのフレームの入力のリスト
+    inputs = {}
+    frame = 0
+    for delta, action in replay.records:
+        frame += delta
+        if action != Action.NONE:
+            inputs.setdefault(frame, []).append(Action(action))
+    return inputs
+
+def replay_frames(engine, inputs, start, stop):
+    # engineがstartフレームの状態にあるとして、フレームごとに、ゲームの画面と同じ状態
+    # （frame tick進めて、それより前の入力を適用した状態）でフレーム番号を返してから、
+    # そのフレームの入力を適用して1tick進める
+    for frame in range(start, stop):
+        yield frame
+        for action in inputs.get(frame, ()):
+            engine.apply(action)
+        engine.step()
+
+def highlight_ranges(replay, inputs):
+    # ゴールと三角飛びのセーブのキックを含むフレームの範囲（重なる範囲はまとめる）
+    engine = replay.new_engine()
+    log = KickLog()
+    engine.observers.append(log)
+    for log.frame in replay_frames(engine, inputs, 0, replay.frames):
+        pass
+    ranges = []
+    for frame, side, super_save, scored in log.kicks:
+        if not (scored or super_save):
+            continue
+        start = max(0, frame - KICK_ANIMATION_TICKS - HIGHLIGHT_LEAD)
+        stop = min(replay.frames, frame + HIGHLIGHT_TAIL)
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], stop))
+        else:
+            ranges.append((start, stop))
+    return ranges
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def write_png(surface, path, level=PNG_LEVEL):
+    # RGBのPNGを書き出す（pygame.image.saveは圧縮が重く描画の10倍以上かかるので、低い圧縮レベルで自前で書く）
+    width, height = surface.get_size()
+    pixels = pygame.image.tostring(surface, "RGB")
+    stride = width * 3
+    # 各行の先頭にフィルターの種類（0: なし）を付ける
+    rows = b"".join(b"\x00" + pixels[y * stride:(y + 1) * stride] for y in range(height))
+    with open(path, "wb") as f:
+        f.write(PNG_SIGNATURE)
+        f.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(png_chunk(b"IDAT", zlib.compress(rows, level)))
+        f.write(png_chunk(b"IEND", b""))
+
+def build_tasks(ranges, chunk_frames=CHUNK_FRAMES):
+    # (書き出し先の通し番号, 開始フレーム, 終了フレーム) のタスクに分ける
+    tasks = []
+    index = 0
+    for start, stop in ranges:
+        for chunk_start in range(start, stop, chunk_frames):
+            chunk_stop = min(stop, chunk_start + chunk_frames)
+            tasks.append((index, chunk_start, chunk_stop))
+            index += chunk_stop - chunk_start
+    return tasks
+
+def snapshot_tasks(replay, inputs, tasks):
+    # 1回の再生で各タスクの開始フレームの状態を取り出し、
+    # (通し番号, 開始フレーム, 終了フレーム, エンジンの状態, AI) のタスクにする
+    # AIの学習状態はget_state()で保存しない戦略もあるので、その時点のオブジェクトを丸ごと複製して渡す
+    engine = replay.new_engine()
+    frames = replay_frames(engine, inputs, 0, replay.frames)
+    for index, start, stop in tasks:
+        for frame in frames:
+            if frame == start:
+                break
+        yield index, start, stop, engine.snapshot(), pickle.dumps(engine.ai)
+
+# ワーカープロセスごとに1つだけ作る描画の状態
+worker = None
+
+class FrameRenderer:
+    def __init__(self, path, size, png_dir):
+        self.replay = Replay.load(path)
+        self.inputs = frame_inputs(self.replay)
+        self.engine = self.replay.new_engine()
+        self.size = size
+        self.png_dir = png_dir
+        self.now = 0  # 演出の時計（ミリ秒、フレーム番号から決める）
+        self.game = PKGame(offscreen=True, rounds=self.replay.rounds, time_source=lambda: self.now)
+        self.scaled = pygame.Surface(size).convert() if size else None
+
+    def render(self, index, start, stop, snapshot, ai):
+        # startの状態から進めてstart〜stopのフレームを描く（連番PNGなら書き出したフレーム数、生フレームならそのバイト列を返す）
+        engine = self.engine
+        engine.restore(snapshot)
+        engine.ai = pickle.loads(ai)
+        raw = []
+        for frame in replay_frames(engine, self.inputs, start, stop):
+            self.now = int(frame * TICK_MS)
+            surface = self.game.render_state(engine.session)
+            if self.scaled:
+                surface = pygame.transform.smoothscale(surface, self.size, self.scaled)
+            if self.png_dir:
+                write_png(surface, os.path.join(self.png_dir, PNG_NAME % (index + frame - start)))
+            else:
+                raw.append(pygame.image.tostring(surface, "RGB"))
+        return stop - start if self.png_dir else b"".join(raw)
+
+def init_worker(path, size, png_dir):
+    global worker
+    worker = FrameRenderer(path, size, png_dir)
+
+def render_task(task):
+    return worker.render(*task)
+
+def export(path, png_dir=None, raw=None, size=None, highlights=False, workers=None, chunk_frames=CHUNK_FRAMES):
+    # 連番PNG（png_dir）か生フレーム（rawは書き込み先のバイナリファイル）に書き出し、
+    # (書き出したフレーム数, 書き出したフレームの範囲) を返す
+    replay = Replay.load(path)
+    inputs = frame_inputs(replay)
+    ranges = highlight_ranges(replay, inputs) if highlights else [(0, replay.frames)]
+    tasks = snapshot_tasks(replay, inputs, build_tasks(ranges, chunk_frames))
+    if png_dir:
+        os.makedirs(png_dir, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * PENDING_PER_WORKER
+    frames = 0
+    pending = deque()  # 順番どおりに受け取るタスクの (フレーム数, Future)
+
+    def write_next():
+        nonlocal frames
+        count, future = pending.popleft()
+        result = future.result()
+        if raw is not None:
+            raw.write(result)
+        frames += count
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(path, size, png_dir)) as executor:
+        for task in tasks:
+            # 書き出し待ちが上限に達したら、先頭のタスクを書き出してから次を投入する
+            if len(pending) >= max_pending:
+                write_next()
+            pending.append((task[2] - task[1], executor.submit(render_task, task)))
+        while pending:
+            write_next()
+    return frames, ranges
+
+def main():
+    parser = argparse.ArgumentParser(description="リプレイを連番PNGまたは生のRGBフレームに書き出す（動画やハイライトの作成用）")
+    parser.add_argument("replay", help="リプレイファイル")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("-o", "--out", help="連番PNGを書き出すディレクトリ（%s）" % PNG_NAME)
+    output.add_argument("--raw", help="生のRGBフレーム（rgb24）を続けて書き出すファイル（-で標準出力）")
+    parser.add_argument("--size", type=parse_size, help="書き出す画像の大きさ（例: 400x300、省略すると800x600）")
+    parser.add_argument("--highlights", action="store_true", help="ゴールと三角飛びのセーブの場面だけを書き出す")
+    parser.add_argument("--workers", type=int, help="描画するプロセス数（省略するとCPUの数）")
+    parser.add_argument("--chunk", type=int, default=CHUNK_FRAMES, help="1タスクで描くフレーム数")
+    args = parser.parse_args()
+
+    # 生フレームを標準出力に流すときは、報告を標準エラーに出す
+    log = sys.stderr if args.raw == "-" else sys.stdout
+    start = time.perf_counter()
+    if args.raw == "-":
+        frames, ranges = export(args.replay, raw=sys.stdout.buffer, size=args.size, highlights=args.highlights,
+                                workers=args.workers, chunk_frames=args.chunk)
+    elif args.raw:
+        with open(args.raw, "wb") as f:
+            frames, ranges = export(args.replay, raw=f, size=args.size, highlights=args.highlights,
+                                    workers=args.workers, chunk_frames=args.chunk)
+    else:
+        frames, ranges = export(args.replay, png_dir=args.out, size=args.size, highlights=args.highlights,
+                                workers=args.workers, chunk_frames=args.chunk)
+    elapsed = time.perf_counter() - start
+
+    if args.highlights:
+        print("highlights: " + (", ".join("%d-%d" % r for r in ranges) or "none"), file=log)
+    seconds = frames / TICK_RATE
+    print("frames: %d (%.1fs of play)  elapsed: %.2fs  fps: %.0f  %.1fx real time" % (
+        frames, seconds, elapsed, frames / max(elapsed, 1e-9), seconds / max(elapsed, 1e-9)), file=log)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,28 @@
 import pygame
+import argparse
 import sys
 import random
 import math
-from enum import Enum
+from collections import OrderedDict
+from pk_animation import BLINK_CYCLE_MS, BLINK_SWITCH_MS, AnimationClock
+from pk_ai import STRATEGIES, SearchStrategy, create_strategy, load_profile, save_profile
+from pk_profiler import FrameProfiler
+from pk_history import DEFAULT_PLAYER, HistoryWriter, MatchHistory
+from pk_replay import MatchRecorder, parse_seed
+from pk_search import SearchTable
+from pk_trajectory import CURVES, BallPath, dive_trail, path_rect
+from pk_engine import Action, GameState, MatchEngine, ROUNDS, TICK_RATE, parse_rounds
 
 # 画面の設定
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-FPS = 60
+FPS = 60                     # 既定の表示のフレームレート
+REFRESH_RATES = (30, 60, 120, 144)  # 想定している表示のフレームレート（0は可変リフレッシュ）
+TICK_MS = 1000 / TICK_RATE   # ゲームの状態を進める間隔（表示のフレームレートとは独立）
+MAX_FRAME_MS = 250           # 1フレームで追いつく時間の上限（長く止まった後に早送りしすぎないように）
+
+# ウィンドウへの拡大表示の設定（描画は常にSCREEN_WIDTH x SCREEN_HEIGHTの論理解像度で行う）
+SCALE_MODES = ("nearest", "smooth")  # nearest: 整数倍のドット拡大、smooth: なめらかな拡大
 
 # 色の定義 - ISS Deluxe風のカラーパレット
 WHITE = (255, 255, 255)
@@ -34,340 +49,547 @@ GOLD = (248, 216, 96)        # 金色
 YELLOW = (248, 216, 32)      # 黄色（ライン用）
 SCOREBOARD_BG = (16, 16, 64) # スコアボード背景
 
-# ゴールエリアの定義
-class GoalArea(Enum):
-    TOP_LEFT = 0
-    TOP_CENTER = 1
-    TOP_RIGHT = 2
-    MIDDLE_LEFT = 3
-    MIDDLE_CENTER = 4
-    MIDDLE_RIGHT = 5
-    BOTTOM_LEFT = 6
-    BOTTOM_CENTER = 7
-    BOTTOM_RIGHT = 8
+# スタジアム背景の設定
+SKY_HEIGHT = 80              # 空の高さ
+STAND_HEIGHT = 60            # 観客席の高さ
+CROWD_SHIMMER = True         # 観客席のちらつき演出（Falseで固定の観客席）
+CROWD_FRAMES = 8             # 事前生成する観客レイヤーの枚数
+CROWD_REFRESH_MS = 50        # 観客レイヤーを切り替える間隔（ミリ秒）
+CROWD_SEED = 2023            # 観客の模様を決める乱数シード
+
+# ゴールスプライトの設定
+GOAL_PALETTE = (NET_WHITE, GOAL_GRAY, GOAL_POST)  # ネット、ライン、ポストの色
+GOAL_CACHE_SIZE = 8          # キャッシュしておくゴールスプライトの最大数
+GOAL_WIDTH = 400             # 画面上のゴールの幅
+GOAL_HEIGHT = 200            # 画面上のゴールの高さ
+GOAL_Y = 150                 # 画面上のゴールの上端
+
+# キックのアニメーションの設定（軌道はpk_trajectoryで事前計算する）
+KICK_BALL_START = (SCREEN_WIDTH // 2, SCREEN_HEIGHT - 110)  # プレイヤーのキックの開始位置
+SHOT_BALL_START = (SCREEN_WIDTH // 2, SCREEN_HEIGHT - 60)   # AIのキックの開始位置（遠くから）
+DIVE_START = (SCREEN_WIDTH // 2, GOAL_Y + GOAL_HEIGHT + 30)  # プレイヤーのキーパーの立ち位置
+
+# スプライトアトラスの設定（キャラクターとボールを事前に描画しておく）
+ATLAS_CHARACTERS = (         # (ユニフォームの色, キーパーのポーズか)
+    (PLAYER_BLUE, False),
+    (PLAYER_BLUE, True),
+    (KEEPER_RED, False),
+    (KEEPER_RED, True),
+)
+CHARACTER_CELL = (64, 72)    # キャラクター1体分のセルの大きさ
+CHARACTER_ANCHOR = (32, 36)  # セル内の足元基準点（draw_iss_characterのx, y）
+BALL_CELL = (24, 28)         # ボール（影を含む）のセルの大きさ
+BALL_ANCHOR = (12, 12)       # セル内のボールの中心
+
+# テキスト描画の設定
+FONT_SIZES = (24, 28, 30, 36, 40, 48, 50, 60)  # 起動時に読み込むフォントサイズ
+TEXT_CACHE_SIZE = 256        # キャッシュしておく描画済みテキストの最大数
 
-# ゲームの状態
-class GameState(Enum):
-    MENU = 0
-    PLAYER_KICKING = 1
-    AI_GOALKEEPING = 2
-    AI_KICKING = 3
-    PLAYER_GOALKEEPING = 4
-    RESULT = 5
+# メニューの操作説明
+MENU_INSTRUCTION = "Use arrow keys to aim/save, SPACE to confirm"
+
+# スコアボードの結果マークの帯（プレイヤーとAIの2行、1ラウンド1マス）
+SCORE_MARK_WIDTH = 25        # 1ラウンド分の幅
+SCORE_ROW_HEIGHT = 25        # プレイヤーの行からAIの行までの間隔
+SCORE_STRIP_HEIGHT = 50      # 帯の高さ（2行分）
+SCORE_MARK_MARGIN = 5        # 帯の右端からパネルの枠までの余白
+
+# キー操作とエンジンの操作の対応
+KEY_ACTIONS = {
+    pygame.K_UP: Action.UP,
+    pygame.K_DOWN: Action.DOWN,
+    pygame.K_LEFT: Action.LEFT,
+    pygame.K_RIGHT: Action.RIGHT,
+    pygame.K_SPACE: Action.CONFIRM,
+}
+
+# 描画済みSurfaceのLRUキャッシュ（上限を超えたら最も古いものから破棄）
+class SurfaceCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.hits = 0    # キャッシュヒット数
+        self.misses = 0  # キャッシュミス数
+    
+    def get(self, key):
+        surface = self.items.get(key)
+        if surface is not None:
+            self.items.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+        return surface
+    
+    def put(self, key, surface):
+        self.items[key] = surface
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+    
+    def __len__(self):
+        return len(self.items)
 
 class PKGame:
-    def __init__(self):
+    def __init__(self, crowd_shimmer=CROWD_SHIMMER, dirty_rects=False, ai=None, profile_path=None,
+                 seed=None, record_path=None, profiler=False, profiler_export=None,
+                 window_size=None, fullscreen=False, scale_mode="nearest",
+                 ball_curve="linear", ball_lift=0, ball_swerve=0, hz=FPS, idle=False, time_source=None,
+                 rounds=ROUNDS, sudden_death=False, history_path=None, player_name=DEFAULT_PLAYER,
+                 offscreen=False):
         pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Soccer Penalty Kick Game")
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont(None, 36)
         
-        # ゲーム変数の初期化
-        self.reset_game()
+        # 描画先は論理解像度の画面（ウィンドウが同じ大きさならウィンドウに直接描く）
+        self.scale_mode = scale_mode
+        self.viewports = {}       # ウィンドウの大きさ -> 論理画面を拡大して表示する領域
+        self.backbuffer = None    # 拡大表示するときの描画先
+        if window_size is None:
+            window_size = (0, 0) if fullscreen else (SCREEN_WIDTH, SCREEN_HEIGHT)
+        if offscreen:
+            # ウィンドウを表示せずに描く（frame_arrayやpk_observeで画面を配列として取り出す用）
+            pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.HIDDEN)
+        else:
+            pygame.display.set_mode(window_size, pygame.FULLSCREEN if fullscreen else pygame.RESIZABLE)
+        self.clock = pygame.time.Clock()
+        self.hz = hz  # 表示のフレームレートの上限（0なら制限せずに描けるだけ描く）
+        self.idle = idle  # メニューと結果画面では入力か点滅の切り替わりまで描画を止める
+        
+        # 演出の時計（描画のたびに1回だけ時刻を読む。time_sourceを渡すと決まった時刻で描ける）
+        # 待機モードではボールの上下や星の動きを止める（観客席のちらつきも止める）
+        self.animation = AnimationClock(time_source or pygame.time.get_ticks, still=idle)
+        self.flash = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))  # メニューのフラッシュ（使い回す）
+        self.flash.fill(WHITE)
+        
+        # フォントは起動時に一度だけ読み込む
+        self.fonts = {size: pygame.font.SysFont(None, size) for size in FONT_SIZES}
+        self.font = self.fonts[36]
+        
+        # 描画キャッシュ
+        self.crowd_shimmer = crowd_shimmer and not idle
+        self.field_layers = {}  # 画面サイズ -> (背景レイヤー, 観客レイヤーのリスト)
+        self.goal_sprites = SurfaceCache(GOAL_CACHE_SIZE)  # (幅, 高さ, 配色) -> ゴールのスプライト
+        self.text_cache = SurfaceCache(TEXT_CACHE_SIZE)    # (文字列, サイズ, 色, AA) -> 描画済みテキスト
+        # メニューの操作説明の半透明の背景（毎フレーム作らずに使い回す）
+        instruction_text = self.render_text(MENU_INSTRUCTION, 36, WHITE)
+        self.instruction_bg = pygame.Surface((instruction_text.get_width() + 20, instruction_text.get_height() + 10))
+        self.instruction_bg.fill(BLACK)
+        self.instruction_bg.set_alpha(200)
+        self.score_strip = pygame.Surface((max(rounds, 8) * SCORE_MARK_WIDTH, SCORE_STRIP_HEIGHT))  # 結果マークの帯
+        self.score_strip.fill(BLACK)
+        self.score_strip_results = 0  # 帯に描いてあるキックの結果（GameSession.resultsと同じ形式）
+        self.build_sprite_atlas()
+        self.build_ball_paths(ball_curve, ball_lift, ball_swerve)
+        
+        # ダーティ矩形モード（変化した領域だけを画面に転送する）
+        self.dirty_rects = dirty_rects
+        self.dirty = []             # 今フレームで変化した領域
+        self.prev_dirty = []        # 前フレームで変化した領域（古い絵を消すために再転送する）
+        self.full_redraw = True     # 次のフレームは画面全体を転送する
+        self.last_drawn_state = None
+        self.flash_active = False   # メニューのフラッシュを描いたフレームか
+        self.setup_output()
+        
+        # ゲームの状態はエンジンが持ち、このクラスは描画と入力だけを担当する
+        # シードを固定しておくと、入力の記録から試合を再現できる
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.engine = MatchEngine(seed=seed, ai=ai, rounds=rounds, sudden_death=sudden_death)
+        self.session = self.engine.session  # 描画で参照する試合の状態
+        self.frame = 0  # 経過tick数（エンジンを進めた回数、リプレイの記録もこの単位）
+        
+        # AIの学習状態（前回のプレイヤーの癖）を読み込む
+        self.profile_path = profile_path
+        if profile_path:
+            load_profile(self.engine.ai, profile_path)
+        
+        # 入力の記録（リプレイ用）
+        self.recorder = MatchRecorder(record_path, seed, self.engine.ai, self.engine) if record_path else None
+        
+        # 試合の履歴（書き込みは別スレッドでまとめて行うので、試合の終わりでもフレームは止まらない）
+        self.history = None
+        if history_path:
+            self.history = HistoryWriter(history_path)
+            self.engine.observers.append(MatchHistory(self.history, player_name))
+        
+        # フレーム時間の計測（F3キーでオーバーレイの表示を切り替える）
+        self.profiler = None
+        self.show_profiler = False
+        self.profiler_export = profiler_export
+        if profiler or profiler_export:
+            self.enable_profiler(show=profiler)
     
     def reset_game(self):
-        self.state = GameState.MENU
-        self.round = 1
-        self.player_score = 0
-        self.ai_score = 0
-        self.player_results = [None, None, None, None, None]  # 各ラウンドの結果 (True=ゴール, False=失敗)
-        self.ai_results = [None, None, None, None, None]      # 各ラウンドの結果 (True=ゴール, False=失敗)
-        self.selected_area = GoalArea.MIDDLE_CENTER
-        self.ai_selected_area = None
-        self.result_message = ""
-        self.animation_timer = 0
-        self.show_sankaku_tobi = False  # 三角飛びメッセージの表示フラグ
-        self.super_save = False         # 三角飛び発動フラグ
+        self.engine.reset()
     
     def run(self):
+        # 状態は固定間隔（TICK_MS）で進め、描画は表示のフレームレートで行う
+        # フレームが遅れてもゲームの進み方は変わらず、1フレームで複数tick進めて追いつく
         running = True
+        accumulator = 0.0
+        self.clock.tick()
         while running:
-            # イベント処理
-            for event in pygame.event.get():
+            # フレームレート制御（前のフレームからの経過時間を受け取る）
+            accumulator += min(self.clock.tick(self.hz), MAX_FRAME_MS)
+            
+            if self.profiler:
+                self.profiler.begin_frame()
+            
+            # イベント処理（待機モードで入力がなければ、次に見た目が変わるまで眠る）
+            events = pygame.event.get()
+            if self.idle and not events:
+                events = self.wait_while_idle()
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                 self.handle_event(event)
             
             # 状態更新
-            self.update()
+            while accumulator >= TICK_MS:
+                self.update()
+                accumulator -= TICK_MS
             
-            # 描画
-            self.draw()
+            # 描画（次のtickまでの経過割合で動きを補間する）
+            self.draw(accumulator / TICK_MS)
             
-            # フレームレート制御
-            self.clock.tick(FPS)
+            if self.profiler:
+                self.profiler.end_frame()
+        
+        # 計測結果を書き出す
+        if self.profiler and self.profiler_export:
+            self.profiler.export(self.profiler_export)
+        
+        # 入力の記録を書き出す
+        if self.recorder:
+            self.recorder.close(self.frame, self.engine)
+        
+        # AIの学習状態を次回のために保存
+        if self.profile_path:
+            save_profile(self.engine.ai, self.profile_path)
+        
+        # 書き込み待ちの試合の履歴を書き切る
+        if self.history:
+            self.history.close()
         
         pygame.quit()
         sys.exit()
     
+    def idle_timeout(self):
+        # 待機画面で次に見た目が変わるまでのミリ秒（毎フレーム描き直す必要があるときはNone）
+        if self.session.state not in (GameState.MENU, GameState.RESULT) or self.show_profiler:
+            return None
+        
+        # メニューのフラッシュ中と直後は毎フレーム描く
+        if self.session.state == GameState.MENU and self.flash_active:
+            return None
+        timeout = self.animation.next_change(flash=self.session.state == GameState.MENU)
+        return timeout or None
+    
+    def wait_while_idle(self):
+        # 入力が来るか、次の切り替わりの時刻まで待つ（その間はCPUを使わない）
+        # 連続した動きは待機モードでは止めているので、この時刻以外に見た目は変わらない
+        timeout = self.idle_timeout()
+        if timeout is None:
+            return []
+        event = pygame.event.wait(timeout)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
+    
     def handle_event(self, event):
+        if event.type == pygame.VIDEORESIZE:
+            self.setup_output()
+            return
+        
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.toggle_profiler()
+            return
+        
         if event.type == pygame.KEYDOWN:
-            if self.state == GameState.MENU:
-                if event.key == pygame.K_SPACE:
-                    self.state = GameState.PLAYER_KICKING
-            
-            elif self.state == GameState.PLAYER_KICKING:
-                # キッカーとしての操作
-                if event.key == pygame.K_UP:
-                    if self.selected_area in [GoalArea.MIDDLE_LEFT, GoalArea.MIDDLE_CENTER, GoalArea.MIDDLE_RIGHT]:
-                        self.selected_area = GoalArea(self.selected_area.value - 3)
-                    elif self.selected_area in [GoalArea.BOTTOM_LEFT, GoalArea.BOTTOM_CENTER, GoalArea.BOTTOM_RIGHT]:
-                        self.selected_area = GoalArea(self.selected_area.value - 3)
-                elif event.key == pygame.K_DOWN:
-                    if self.selected_area in [GoalArea.TOP_LEFT, GoalArea.TOP_CENTER, GoalArea.TOP_RIGHT]:
-                        self.selected_area = GoalArea(self.selected_area.value + 3)
-                    elif self.selected_area in [GoalArea.MIDDLE_LEFT, GoalArea.MIDDLE_CENTER, GoalArea.MIDDLE_RIGHT]:
-                        self.selected_area = GoalArea(self.selected_area.value + 3)
-                elif event.key == pygame.K_LEFT:
-                    if self.selected_area in [GoalArea.TOP_CENTER, GoalArea.MIDDLE_CENTER, GoalArea.BOTTOM_CENTER]:
-                        self.selected_area = GoalArea(self.selected_area.value - 1)
-                    elif self.selected_area in [GoalArea.TOP_RIGHT, GoalArea.MIDDLE_RIGHT, GoalArea.BOTTOM_RIGHT]:
-                        self.selected_area = GoalArea(self.selected_area.value - 1)
-                elif event.key == pygame.K_RIGHT:
-                    if self.selected_area in [GoalArea.TOP_LEFT, GoalArea.MIDDLE_LEFT, GoalArea.BOTTOM_LEFT]:
-                        self.selected_area = GoalArea(self.selected_area.value + 1)
-                    elif self.selected_area in [GoalArea.TOP_CENTER, GoalArea.MIDDLE_CENTER, GoalArea.BOTTOM_CENTER]:
-                        self.selected_area = GoalArea(self.selected_area.value + 1)
-                elif event.key == pygame.K_SPACE:
-                    # AIのゴールキーパーの動きを決定
-                    self.ai_selected_area = GoalArea(random.randint(0, 8))
-                    self.state = GameState.AI_GOALKEEPING
-                    self.animation_timer = 0
-            
-            elif self.state == GameState.PLAYER_GOALKEEPING:
-                # ゴールキーパーとしての操作
-                if event.key == pygame.K_UP:
-                    if self.selected_area in [GoalArea.MIDDLE_LEFT, GoalArea.MIDDLE_CENTER, GoalArea.MIDDLE_RIGHT]:
-                        self.selected_area = GoalArea(self.selected_area.value - 3)
-                    elif self.selected_area in [GoalArea.BOTTOM_LEFT, GoalArea.BOTTOM_CENTER, GoalArea.BOTTOM_RIGHT]:
-                        self.selected_area = GoalArea(self.selected_area.value - 3)
-                elif event.key == pygame.K_DOWN:
-                    if self.selected_area in [GoalArea.TOP_LEFT, GoalArea.TOP_CENTER, GoalArea.TOP_RIGHT]:
-                        self.selected_area = GoalArea(self.selected_area.value + 3)
-                    elif self.selected_area in [GoalArea.MIDDLE_LEFT, GoalArea.MIDDLE_CENTER, GoalArea.MIDDLE_RIGHT]:
-                        self.selected_area = GoalArea(self.selected_area.value + 3)
-                elif event.key == pygame.K_LEFT:
-                    if self.selected_area in [GoalArea.TOP_CENTER, GoalArea.MIDDLE_CENTER, GoalArea.BOTTOM_CENTER]:
-                        self.selected_area = GoalArea(self.selected_area.value - 1)
-                    elif self.selected_area in [GoalArea.TOP_RIGHT, GoalArea.MIDDLE_RIGHT, GoalArea.BOTTOM_RIGHT]:
-                        self.selected_area = GoalArea(self.selected_area.value - 1)
-                elif event.key == pygame.K_RIGHT:
-                    if self.selected_area in [GoalArea.TOP_LEFT, GoalArea.MIDDLE_LEFT, GoalArea.BOTTOM_LEFT]:
-                        self.selected_area = GoalArea(self.selected_area.value + 1)
-                    elif self.selected_area in [GoalArea.TOP_CENTER, GoalArea.MIDDLE_CENTER, GoalArea.BOTTOM_CENTER]:
-                        self.selected_area = GoalArea(self.selected_area.value + 1)
-                elif event.key == pygame.K_SPACE:
-                    # AIのキッカーの動きを決定
-                    self.ai_selected_area = GoalArea(random.randint(0, 8))
-                    self.state = GameState.AI_KICKING
-                    self.animation_timer = 0
-            
-            elif self.state == GameState.RESULT:
-                if event.key == pygame.K_SPACE:
-                    self.reset_game()
+            action = KEY_ACTIONS.get(event.key)
+            if action is not None:
+                self.engine.apply(action)
+                if self.recorder:
+                    self.recorder.record(self.frame, action)
     
     def update(self):
-        if self.state == GameState.AI_GOALKEEPING:
-            # キック直後に三角飛び判定を行う
-            if self.animation_timer == 0:
-                # 10%の確率で必ずセーブする特殊能力
-                self.super_save = random.random() < 0.1
-                
-                # 特殊能力が発動した場合、キーパーの位置をキッカーが選んだ位置に強制移動
-                if self.super_save and self.selected_area != self.ai_selected_area:
-                    self.ai_selected_area = self.selected_area
-                    self.show_sankaku_tobi = True
-                else:
-                    self.show_sankaku_tobi = False
-            
-            self.animation_timer += 1
-            if self.animation_timer > 60:  # 1秒間のアニメーション
-                # 判定結果を適用
-                if hasattr(self, 'super_save') and self.super_save and self.show_sankaku_tobi:
-                    # 三角飛び発動時は必ずセーブ
-                    self.result_message = "SAVED!"
-                    self.player_results[self.round - 1] = False  # 失敗を記録
-                else:
-                    # 通常の判定
-                    if self.selected_area == self.ai_selected_area:
-                        # セーブ
-                        self.result_message = "SAVED!"
-                        self.player_results[self.round - 1] = False  # 失敗を記録
-                    else:
-                        # ゴール
-                        self.player_score += 1
-                        self.result_message = "GOAL!"
-                        self.player_results[self.round - 1] = True  # 成功を記録
-                
-                # 次のフェーズへ
-                self.animation_timer = 0
-                self.state = GameState.PLAYER_GOALKEEPING
-                self.selected_area = GoalArea.MIDDLE_CENTER
-        
-        elif self.state == GameState.AI_KICKING:
-            self.animation_timer += 1
-            if self.animation_timer > 60:  # 1秒間のアニメーション
-                # 10%の確率で必ずセーブする特殊能力
-                super_save = random.random() < 0.1
-                
-                # キック直後に三角飛び判定を行う
-                if self.animation_timer == 0:
-                    # 10%の確率で必ずセーブする特殊能力
-                    self.super_save = random.random() < 0.1
-                    
-                    # 特殊能力が発動した場合、キーパーの位置をキッカーが選んだ位置に強制移動
-                    if self.super_save and self.selected_area != self.ai_selected_area:
-                        self.selected_area = self.ai_selected_area
-                        self.show_sankaku_tobi = True
-                    else:
-                        self.show_sankaku_tobi = False
-                
-                if self.animation_timer > 60:  # 1秒間のアニメーション
-                    # 判定結果を適用
-                    if hasattr(self, 'super_save') and self.super_save and self.show_sankaku_tobi:
-                        # 三角飛び発動時は必ずセーブ
-                        self.result_message = "NICE SAVE!"
-                        self.ai_results[self.round - 1] = False  # AIの失敗を記録
-                    else:
-                        # 通常の判定
-                        if self.selected_area == self.ai_selected_area:
-                            # セーブ
-                            self.result_message = "NICE SAVE!"
-                            self.ai_results[self.round - 1] = False  # AIの失敗を記録
-                        else:
-                            # ゴール
-                            self.ai_score += 1
-                            self.result_message = "GOAL CONCEDED!"
-                            self.ai_results[self.round - 1] = True  # AIの成功を記録
-                
-                # 次のラウンドへ
-                self.animation_timer = 0
-                self.round += 1
-                
-                if self.round > 5:
-                    self.result_message = ""  # 結果メッセージをクリア
-                    self.state = GameState.RESULT
-                else:
-                    self.state = GameState.PLAYER_KICKING
-                    self.selected_area = GoalArea.MIDDLE_CENTER
+        self.engine.step()
+        self.frame += 1
+    
+    def enable_profiler(self, show=True):
+        if self.profiler is None:
+            self.profiler = FrameProfiler()
+            self.profiler.attach(self)
+        self.show_profiler = show
+    
+    def toggle_profiler(self):
+        if not self.show_profiler:
+            self.enable_profiler()
+        elif self.profiler_export:
+            # 書き出し用に計測は続ける
+            self.show_profiler = False
+        else:
+            # 計測をやめて元のメソッドに戻す
+            self.profiler.detach(self)
+            self.profiler = None
+            self.show_profiler = False
+            self.full_redraw = True
+    
+    def draw(self, alpha=0.0):
+        self.render_frame(alpha)
+        
+        # フレーム時間のオーバーレイ
+        if self.profiler and self.show_profiler:
+            self.mark_dirty(self.profiler.draw_overlay(self.screen, self.fonts[24]))
+        
+        self.present()
+    
+    def render_state(self, session=None, alpha=0.0):
+        # 1フレームを描いて描画先のSurfaceを返す（画面への転送はしない）
+        # sessionを渡すとエンジンの状態の代わりにその状態を描く（スナップショットから戻した状態など）
+        current = self.session
+        if session is not None:
+            self.session = session
+        try:
+            self.render_frame(alpha)
+        finally:
+            self.session = current
+            self.dirty = []
+            self.full_redraw = True  # 次に画面へ転送するときは全体を送り直す
+        return self.screen
     
-    def draw(self):
+    def frame_array(self, session=None, alpha=0.0, out=None):
+        # 論理解像度の1フレームをRGBの配列（高さ, 幅, 3）で返す
+        return surface_array(self.render_state(session, alpha), out)
+    
+    def render_frame(self, alpha=0.0):
+        # 1フレーム分をself.screenに描く（画面への転送はしない）
         # 背景は各ビュー関数内で描画するため、ここではクリアしない
         
-        if self.state == GameState.MENU:
+        # このフレームの演出はすべてこの時刻で描く
+        self.animation.tick()
+        
+        # 画面が切り替わったフレームは全体を転送する
+        if self.session.state != self.last_drawn_state:
+            self.full_redraw = True
+            self.last_drawn_state = self.session.state
+        
+        if self.session.state == GameState.MENU:
             self.draw_menu()
-        elif self.state in [GameState.PLAYER_KICKING, GameState.AI_GOALKEEPING]:
-            self.draw_kicking_view()
-        elif self.state in [GameState.PLAYER_GOALKEEPING, GameState.AI_KICKING]:
-            self.draw_goalkeeping_view()
-        elif self.state == GameState.RESULT:
+        elif self.session.state in [GameState.PLAYER_KICKING, GameState.AI_GOALKEEPING]:
+            self.draw_kicking_view(alpha)
+        elif self.session.state in [GameState.PLAYER_GOALKEEPING, GameState.AI_KICKING]:
+            self.draw_goalkeeping_view(alpha)
+        elif self.session.state == GameState.RESULT:
             self.draw_result()
         
         # メニュー画面以外でスコアボードを表示
-        if self.state != GameState.MENU and self.state != GameState.RESULT:
-            # ISS風のスコアボード
-            score_panel_width = 300
-            score_panel_height = 60
-            
-            # スコアボードの背景（黒）
-            pygame.draw.rect(self.screen, BLACK, (10, 10, score_panel_width, score_panel_height))
-            pygame.draw.rect(self.screen, WHITE, (10, 10, score_panel_width, score_panel_height), 1)
-            
-            # ISS風のチーム表示
-            team_font = pygame.font.SysFont(None, 30)
-            player_text = team_font.render("PLAYER", True, WHITE)
-            ai_text = team_font.render("AI", True, WHITE)  # CPUからAIに変更
-            
-            # テキスト配置は各結果表示部分で行うため、ここでは削除
-            
-            # 結果マーク表示（アルファベット）
-            result_font = pygame.font.SysFont(None, 28)
-            circle = "O"  # ゴール成功
-            cross = "X"   # ゴール失敗
-            
-            # プレイヤーの結果表示 - 1行目
-            self.screen.blit(player_text, (20, 15))
-            for i in range(5):
-                x_pos = 20 + player_text.get_width() + 10 + i * 25
-                if i < self.round:
-                    if self.player_results[i] == True:
-                        result_mark = result_font.render(circle, True, GREEN)
-                    elif self.player_results[i] == False:
-                        result_mark = result_font.render(cross, True, RED)
-                    else:
-                        continue  # 結果がまだない場合はスキップ
-                    self.screen.blit(result_mark, (x_pos, 15))
-            
-            # AIの結果表示 - 2行目
-            self.screen.blit(ai_text, (20, 40))
-            for i in range(5):
-                x_pos = 20 + player_text.get_width() + 10 + i * 25
-                if i < self.round:
-                    if self.ai_results[i] == True:
-                        result_mark = result_font.render(circle, True, GREEN)
-                    elif self.ai_results[i] == False:
-                        result_mark = result_font.render(cross, True, RED)
-                    else:
-                        continue  # 結果がまだない場合はスキップ
-                    self.screen.blit(result_mark, (x_pos, 40))
-            
-            # ラウンド表示は不要
+        if self.session.state != GameState.MENU and self.session.state != GameState.RESULT:
+            self.draw_scoreboard()
         
         # 結果メッセージを表示（ゴールやセーブの結果）
-        if self.result_message and self.state != GameState.MENU:
-            # ISS風のメッセージボックス
-            message_width = 300
-            message_height = 60
-            message_x = SCREEN_WIDTH // 2 - message_width // 2
-            message_y = 80
-            
-            # メッセージの背景（黒）
-            pygame.draw.rect(self.screen, BLACK, (message_x, message_y, message_width, message_height))
-            
-            # メッセージの枠（色分け）
-            if "GOAL" in self.result_message:
-                border_color = BLUE  # ゴール時は青
-            else:
-                border_color = RED   # セーブ時は赤
-            
-            pygame.draw.rect(self.screen, border_color, (message_x, message_y, message_width, message_height), 2)
-            
+        if self.session.result_message and self.session.state != GameState.MENU:
             # 結果メッセージ（ISS風の点滅効果）
-            blink_rate = (pygame.time.get_ticks() % 400) / 400.0
-            if blink_rate > 0.5:
+            if self.animation.blink(400, 200):
                 message_color = YELLOW
             else:
                 message_color = WHITE
-            
-            result_text = self.font.render(self.result_message, True, message_color)
-            self.screen.blit(result_text, (message_x + message_width // 2 - result_text.get_width() // 2, 
-                                         message_y + message_height // 2 - result_text.get_height() // 2))
-            
-            # ISS風のアクションアイコン
-            icon_size = 40
-            if "GOAL" in self.result_message:
-                # ゴールアイコン（ボール）
-                pygame.draw.circle(self.screen, WHITE, (message_x - 30, message_y + message_height // 2), icon_size // 2)
-                pygame.draw.circle(self.screen, BLACK, (message_x - 30, message_y + message_height // 2), icon_size // 2, 1)
-            else:
-                # セーブアイコン（グローブ）- プレイヤーの色に合わせて青色に
-                pygame.draw.circle(self.screen, PLAYER_BLUE, (message_x - 30, message_y + message_height // 2), icon_size // 2)
-                pygame.draw.circle(self.screen, WHITE, (message_x - 30, message_y + message_height // 2), icon_size // 2, 2)
+            self.draw_result_message(self.session.result_message, message_color)
         
         # 三角飛びメッセージは各ビューで表示するため、ここでは削除
+    
+    def draw_result_message(self, message, message_color):
+        # ISS風のメッセージボックス
+        message_width = 300
+        message_height = 60
+        message_x = SCREEN_WIDTH // 2 - message_width // 2
+        message_y = 80
+        
+        # メッセージの背景（黒）
+        pygame.draw.rect(self.screen, BLACK, (message_x, message_y, message_width, message_height))
+        self.mark_dirty((message_x - 50, message_y, message_width + 50, message_height))
+        
+        # メッセージの枠（色分け）
+        if "GOAL" in message:
+            border_color = BLUE  # ゴール時は青
+        else:
+            border_color = RED   # セーブ時は赤
+        
+        pygame.draw.rect(self.screen, border_color, (message_x, message_y, message_width, message_height), 2)
+        
+        # 結果メッセージ
+        result_text = self.render_text(message, 36, message_color)
+        self.screen.blit(result_text, (message_x + message_width // 2 - result_text.get_width() // 2, 
+                                     message_y + message_height // 2 - result_text.get_height() // 2))
         
-        pygame.display.flip()
+        # ISS風のアクションアイコン
+        icon_size = 40
+        if "GOAL" in message:
+            # ゴールアイコン（ボール）
+            pygame.draw.circle(self.screen, WHITE, (message_x - 30, message_y + message_height // 2), icon_size // 2)
+            pygame.draw.circle(self.screen, BLACK, (message_x - 30, message_y + message_height // 2), icon_size // 2, 1)
+        else:
+            # セーブアイコン（グローブ）- プレイヤーの色に合わせて青色に
+            pygame.draw.circle(self.screen, PLAYER_BLUE, (message_x - 30, message_y + message_height // 2), icon_size // 2)
+            pygame.draw.circle(self.screen, WHITE, (message_x - 30, message_y + message_height // 2), icon_size // 2, 2)
+    
+    def draw_scoreboard(self):
+        # 結果マークは帯に描き足しておき、直近のラウンドの部分だけを転送する
+        # （ラウンド数が増えても1フレームの手間は変わらない）
+        marks_x, visible = self.draw_scoreboard_panel()
+        self.update_score_strip()
+        first = max(0, self.session.rounds_played - visible)  # 収まらないときは古いラウンドから隠す
+        self.screen.blit(self.score_strip, (marks_x, 15),
+                         (first * SCORE_MARK_WIDTH, 0, visible * SCORE_MARK_WIDTH, SCORE_STRIP_HEIGHT))
+    
+    def draw_scoreboard_panel(self):
+        # ISS風のスコアボード（結果マークを並べる位置と表示できるラウンド数を返す）
+        score_panel_width = 300
+        score_panel_height = 60
+        
+        # スコアボードの背景（黒）
+        pygame.draw.rect(self.screen, BLACK, (10, 10, score_panel_width, score_panel_height))
+        self.mark_dirty((10, 10, score_panel_width, score_panel_height))
+        pygame.draw.rect(self.screen, WHITE, (10, 10, score_panel_width, score_panel_height), 1)
+        
+        # ISS風のチーム表示
+        player_text = self.render_text("PLAYER", 30, WHITE)
+        ai_text = self.render_text("AI", 30, WHITE)  # CPUからAIに変更
+        self.screen.blit(player_text, (20, 15))  # プレイヤー - 1行目
+        self.screen.blit(ai_text, (20, 40))      # AI - 2行目
+        
+        marks_x = 20 + player_text.get_width() + 10
+        visible = max(1, (10 + score_panel_width - SCORE_MARK_MARGIN - marks_x) // SCORE_MARK_WIDTH)
+        return marks_x, visible
+    
+    def update_score_strip(self):
+        # 前のフレームから増えたキックの結果だけを帯に描き足す
+        results = self.session.results
+        changed = results ^ self.score_strip_results
+        if not changed:
+            return
+        if changed & self.score_strip_results:
+            # 結果が消えた（新しい試合）ので帯を作り直す
+            self.score_strip.fill(BLACK)
+            changed = results
+        needed = (results.bit_length() + 3) // 4
+        if needed * SCORE_MARK_WIDTH > self.score_strip.get_width():
+            # 帯が足りなければ倍の長さにする（サドンデスが長引いた場合）
+            strip = pygame.Surface((self.score_strip.get_width() * 2, SCORE_STRIP_HEIGHT))
+            strip.fill(BLACK)
+            strip.blit(self.score_strip, (0, 0))
+            self.score_strip = strip
+        
+        # 結果マーク表示（アルファベット）
+        circle = self.render_text("O", 28, GREEN)  # ゴール成功
+        cross = self.render_text("X", 28, RED)     # ゴール失敗
+        while changed:
+            kick = ((changed & -changed).bit_length() - 1) // 2  # 1キック2ビット
+            changed &= ~(3 << (kick * 2))
+            round_index, side = divmod(kick, 2)
+            result = self.session.result(side, round_index)
+            if result is None:
+                continue
+            self.score_strip.blit(circle if result else cross,
+                                  (round_index * SCORE_MARK_WIDTH, side * SCORE_ROW_HEIGHT))
+        self.score_strip_results = results
+    
+    def mark_dirty(self, rect):
+        # ダーティ矩形モードのときだけ変化した領域を記録する
+        if self.dirty_rects:
+            self.dirty.append(pygame.Rect(rect))
+    
+    def setup_output(self):
+        # ウィンドウの大きさに合わせて描画先と拡大表示の領域を決める
+        self.window = pygame.display.get_surface()
+        size = self.window.get_size()
+        if size == (SCREEN_WIDTH, SCREEN_HEIGHT):
+            self.screen = self.window
+        else:
+            if self.backbuffer is None:
+                self.backbuffer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            self.screen = self.backbuffer
+            
+            viewport = self.viewports.get(size)
+            if viewport is None:
+                viewport = self.viewports[size] = self.compute_viewport(size)
+            self.viewport = viewport
+            self.scaled_view = self.window.subsurface(viewport)  # 拡大した絵を直接書き込む領域
+            self.window.fill(BLACK)  # 縦横比が合わない部分は黒帯にする
+        self.full_redraw = True
+    
+    def compute_viewport(self, size):
+        # 縦横比を保ったまま中央に表示する領域（nearestで収まる場合は整数倍にしてドットをそろえる）
+        width, height = size
+        ratio = min(width / SCREEN_WIDTH, height / SCREEN_HEIGHT)
+        if self.scale_mode == "nearest" and ratio >= 1:
+            ratio = int(ratio)
+        view_width = max(1, int(SCREEN_WIDTH * ratio))
+        view_height = max(1, int(SCREEN_HEIGHT * ratio))
+        return pygame.Rect((width - view_width) // 2, (height - view_height) // 2, view_width, view_height)
+    
+    def scale_to_window(self, rects=None):
+        # 論理画面をウィンドウに拡大する（rectsを指定した場合はその領域だけ）
+        scale = pygame.transform.smoothscale if self.scale_mode == "smooth" else pygame.transform.scale
+        viewport = self.viewport
+        if rects is None:
+            scale(self.screen, viewport.size, self.scaled_view)
+            return [viewport]
+        
+        scale_x = viewport.width / SCREEN_WIDTH
+        scale_y = viewport.height / SCREEN_HEIGHT
+        bounds = self.screen.get_rect()
+        updated = []
+        for rect in rects:
+            if self.scale_mode == "smooth":
+                rect = rect.inflate(2, 2)  # 周囲の画素も補間に使うので境目が出ないように広げる
+            rect = rect.clip(bounds)
+            if rect.width == 0 or rect.height == 0:
+                continue
+            left = int(rect.left * scale_x)
+            top = int(rect.top * scale_y)
+            right = min(viewport.width, math.ceil(rect.right * scale_x))
+            bottom = min(viewport.height, math.ceil(rect.bottom * scale_y))
+            target = pygame.Rect(left, top, right - left, bottom - top)
+            scale(self.screen.subsurface(rect), target.size, self.scaled_view.subsurface(target))
+            updated.append(target.move(viewport.topleft))
+        return updated
+    
+    def present(self):
+        # 描画したフレームを画面に転送する
+        full = not self.dirty_rects or self.full_redraw
+        if full:
+            if self.screen is not self.window:
+                self.scale_to_window()
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            # 前フレームの領域も転送して、移動した要素の古い絵を消す
+            rects = self.prev_dirty + self.dirty
+            if self.screen is not self.window:
+                rects = self.scale_to_window(rects)
+            pygame.display.update(rects)
+        self.prev_dirty = self.dirty
+        self.dirty = []
+    
+    def render_text(self, text, size, color, antialias=True):
+        # 同じ文字列・サイズ・色の組み合わせは一度だけラスタライズする
+        key = (text, size, color, antialias)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            surface = self.fonts[size].render(text, antialias, color)
+            self.text_cache.put(key, surface)
+        return surface
     
     def draw_menu(self):
         # フィールドを描画（背景として）
         self.draw_field()
         
         # ゴールを描画（装飾として）
-        goal_width = 400
-        goal_height = 200
+        goal_width = GOAL_WIDTH
+        goal_height = GOAL_HEIGHT
         goal_x = SCREEN_WIDTH // 2 - goal_width // 2
-        goal_y = 150
+        goal_y = GOAL_Y
         self.draw_goal(goal_x, goal_y, goal_width, goal_height)
         
         # ISS風のタイトル画面
@@ -392,8 +614,7 @@ class PKGame:
         pygame.draw.rect(self.screen, WHITE, (panel_x + 50, logo_y, panel_width - 100, 80), 2)
         
         # タイトルテキスト（ISS風の大きな文字）
-        title_font = pygame.font.SysFont(None, 60)
-        title_text = title_font.render("PENALTY KICK", True, WHITE)
+        title_text = self.render_text("PENALTY KICK", 60, WHITE)
         self.screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, logo_y + 20))
         
         # ISS風のメニュー選択肢
@@ -404,24 +625,20 @@ class PKGame:
         pygame.draw.rect(self.screen, WHITE, (panel_x + 150, menu_y, panel_width - 300, 40), 1)
         
         # メニュー項目（点滅効果）
-        blink_rate = (pygame.time.get_ticks() % 800) / 800.0
-        if blink_rate > 0.4:
-            start_text = self.font.render("START GAME", True, YELLOW)
+        if self.animation.blink(BLINK_CYCLE_MS, BLINK_SWITCH_MS):
+            start_text = self.render_text("START GAME", 36, YELLOW)
         else:
-            start_text = self.font.render("START GAME", True, WHITE)
+            start_text = self.render_text("START GAME", 36, WHITE)
         self.screen.blit(start_text, (SCREEN_WIDTH // 2 - start_text.get_width() // 2, menu_y + 10))
+        self.mark_dirty((panel_x + 150, menu_y, panel_width - 300, 40))
         
         # 操作説明 - キャラクターと重複しないように位置を調整
         instruction_y = menu_y + 120  # 位置を下に移動
-        instruction_text = self.font.render("Use arrow keys to aim/save, SPACE to confirm", True, WHITE)
+        instruction_text = self.render_text(MENU_INSTRUCTION, 36, WHITE)
         
         # 説明テキストの背景を追加して読みやすくする
-        text_width = instruction_text.get_width() + 20
-        text_height = instruction_text.get_height() + 10
-        text_bg = pygame.Surface((text_width, text_height))
-        text_bg.fill(BLACK)
-        text_bg.set_alpha(200)
-        self.screen.blit(text_bg, (SCREEN_WIDTH // 2 - text_width // 2, instruction_y - 5))
+        text_width = self.instruction_bg.get_width()
+        self.screen.blit(self.instruction_bg, (SCREEN_WIDTH // 2 - text_width // 2, instruction_y - 5))
         
         # テキストを表示
         self.screen.blit(instruction_text, (SCREEN_WIDTH // 2 - instruction_text.get_width() // 2, instruction_y))
@@ -438,26 +655,68 @@ class PKGame:
         self.draw_iss_character(keeper_x, keeper_y, KEEPER_RED, True)
         
         # ボールのアニメーション（ISS風）
-        ball_y = panel_y + panel_height - 80 + math.sin(pygame.time.get_ticks() / 300) * 15
+        ball_y = panel_y + panel_height - 80 + self.animation.ball_bob()
         self.draw_iss_ball(SCREEN_WIDTH // 2, int(ball_y))
         
         # ISS風の装飾（フラッシュ効果）
-        flash_time = pygame.time.get_ticks() % 5000
-        if flash_time < 100:
-            flash = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-            flash.fill(WHITE)
-            flash.set_alpha(100 - flash_time)
-            self.screen.blit(flash, (0, 0))
+        flash_alpha = self.animation.flash_alpha()
+        if flash_alpha:
+            self.flash.set_alpha(flash_alpha)
+            self.screen.blit(self.flash, (0, 0))
+            self.full_redraw = True
+            self.flash_active = True
+        elif self.flash_active:
+            # フラッシュ直後のフレームは全体を元に戻す（フレームレートに関係なく1回）
+            self.full_redraw = True
+            self.flash_active = False
         
         # ISS風のコピーライト表示
-        copyright_text = self.font.render("© 2023 SOCCER GAME", True, WHITE)
+        copyright_text = self.render_text("© 2023 SOCCER GAME", 36, WHITE)
         self.screen.blit(copyright_text, (SCREEN_WIDTH // 2 - copyright_text.get_width() // 2, SCREEN_HEIGHT - 30))
     
     def draw_field(self):
-        # ISS Deluxe風のフィールドを描画
+        # ISS Deluxe風のフィールドを描画（解像度ごとに事前描画したレイヤーを貼るだけ）
+        background, crowd_layers = self.get_field_layers(self.screen.get_size())
+        self.screen.blit(background, (0, 0))
+        
+        # 観客席のちらつき（シマー）- 事前生成したレイヤーを一定間隔で切り替える
+        if self.crowd_shimmer:
+            frame = self.animation.cycle_frame(CROWD_REFRESH_MS, len(crowd_layers))
+            self.screen.blit(crowd_layers[frame], (0, SKY_HEIGHT))
+            self.mark_dirty((0, SKY_HEIGHT, self.screen.get_width(), STAND_HEIGHT))
+    
+    def get_field_layers(self, size):
+        # 背景レイヤーは解像度ごとに一度だけ生成してキャッシュする
+        layers = self.field_layers.get(size)
+        if layers is None:
+            width, height = size
+            crowd_layers = [self.render_crowd_layer(width, CROWD_SEED + i) for i in range(CROWD_FRAMES)]
+            background = self.render_field_layer(width, height, crowd_layers[0])
+            layers = (background, crowd_layers)
+            self.field_layers[size] = layers
+        return layers
+    
+    def render_crowd_layer(self, width, seed):
+        # スタジアムの観客席（背景）
+        layer = pygame.Surface((width, STAND_HEIGHT)).convert()
+        # 観客席の背景
+        layer.fill((64, 64, 80))
+        
+        # 観客の表現（ドット状のパターン）- シード固定で毎回同じ模様になる
+        rng = random.Random(seed)
+        for y in range(0, STAND_HEIGHT, 4):
+            for x in range(0, width, 6):
+                # ランダムな色で観客を表現
+                if rng.random() > 0.7:
+                    color = rng.choice([(255, 255, 255), (200, 200, 200), (255, 200, 150), (150, 150, 200)])
+                    pygame.draw.rect(layer, color, (x, y, 2, 2))
+        return layer
+    
+    def render_field_layer(self, width, height, crowd_layer):
+        surface = pygame.Surface((width, height)).convert()
         
         # 空を描画（上部）
-        sky_height = 80
+        sky_height = SKY_HEIGHT
         for y in range(0, sky_height):
             # 空のグラデーション（より鮮やかに）
             gradient_factor = y / sky_height
@@ -466,68 +725,73 @@ class PKGame:
                 int(176 + gradient_factor * 32),
                 int(248)
             )
-            pygame.draw.line(self.screen, sky_color, (0, y), (SCREEN_WIDTH, y))
+            pygame.draw.line(surface, sky_color, (0, y), (width, y))
         
         # スタジアムの観客席（背景）
-        stand_height = 60
-        stand_y = sky_height
-        # 観客席の背景
-        pygame.draw.rect(self.screen, (64, 64, 80), (0, stand_y, SCREEN_WIDTH, stand_height))
-        
-        # 観客の表現（ドット状のパターン）
-        for y in range(stand_y, stand_y + stand_height, 4):
-            for x in range(0, SCREEN_WIDTH, 6):
-                # ランダムな色で観客を表現
-                if random.random() > 0.7:
-                    color = random.choice([(255, 255, 255), (200, 200, 200), (255, 200, 150), (150, 150, 200)])
-                    pygame.draw.rect(self.screen, color, (x, y, 2, 2))
+        surface.blit(crowd_layer, (0, sky_height))
         
         # 芝生の背景を塗りつぶし
-        pitch_y = sky_height + stand_height
-        pygame.draw.rect(self.screen, PITCH_GREEN, (0, pitch_y, SCREEN_WIDTH, SCREEN_HEIGHT - pitch_y))
+        pitch_y = sky_height + STAND_HEIGHT
+        pygame.draw.rect(surface, PITCH_GREEN, (0, pitch_y, width, height - pitch_y))
         
         # ISS風の芝生パターン（横縞模様）
         stripe_count = 12
-        stripe_height = (SCREEN_HEIGHT - pitch_y) // stripe_count
+        stripe_height = (height - pitch_y) // stripe_count
         for i in range(stripe_count):
             y = pitch_y + i * stripe_height
             if i % 2 == 0:
-                pygame.draw.rect(self.screen, PITCH_DARK, (0, y, SCREEN_WIDTH, stripe_height))
+                pygame.draw.rect(surface, PITCH_DARK, (0, y, width, stripe_height))
         
         # ペナルティーエリアを描画
         penalty_width = 500
         penalty_height = 240
-        penalty_x = SCREEN_WIDTH // 2 - penalty_width // 2
+        penalty_x = width // 2 - penalty_width // 2
         penalty_y = 180
         
         # ペナルティーエリアの白線
-        pygame.draw.rect(self.screen, YELLOW, (penalty_x, penalty_y, penalty_width, penalty_height), 2)
+        pygame.draw.rect(surface, YELLOW, (penalty_x, penalty_y, penalty_width, penalty_height), 2)
         
         # ゴールエリア（小さい四角形）
         goal_area_width = 200
         goal_area_height = 80
-        goal_area_x = SCREEN_WIDTH // 2 - goal_area_width // 2
+        goal_area_x = width // 2 - goal_area_width // 2
         goal_area_y = penalty_y
-        pygame.draw.rect(self.screen, YELLOW, (goal_area_x, goal_area_y, goal_area_width, goal_area_height), 2)
+        pygame.draw.rect(surface, YELLOW, (goal_area_x, goal_area_y, goal_area_width, goal_area_height), 2)
         
         # ペナルティースポット
-        spot_x = SCREEN_WIDTH // 2
+        spot_x = width // 2
         spot_y = penalty_y + 180
-        pygame.draw.circle(self.screen, YELLOW, (spot_x, spot_y), 4)
+        pygame.draw.circle(surface, YELLOW, (spot_x, spot_y), 4)
         
         # センターライン
-        pygame.draw.line(self.screen, YELLOW, (0, SCREEN_HEIGHT - 180), (SCREEN_WIDTH, SCREEN_HEIGHT - 180), 2)
+        pygame.draw.line(surface, YELLOW, (0, height - 180), (width, height - 180), 2)
         
         # センターサークル（部分的に表示）
-        pygame.draw.arc(self.screen, YELLOW, 
-                       (SCREEN_WIDTH // 2 - 70, SCREEN_HEIGHT - 250, 140, 140),
+        pygame.draw.arc(surface, YELLOW, 
+                       (width // 2 - 70, height - 250, 140, 140),
                        math.pi, 2 * math.pi, 2)
         
         # センターマーク
-        pygame.draw.circle(self.screen, YELLOW, (SCREEN_WIDTH // 2, SCREEN_HEIGHT - 180), 4)
+        pygame.draw.circle(surface, YELLOW, (width // 2, height - 180), 4)
+        return surface
     
     def draw_goal(self, goal_x, goal_y, goal_width, goal_height):
+        # ゴールは形状と配色ごとに一度だけ描画し、以降はスプライトを貼るだけ
+        key = (goal_width, goal_height, GOAL_PALETTE)
+        sprite = self.goal_sprites.get(key)
+        if sprite is None:
+            sprite = self.render_goal_sprite(goal_width, goal_height, GOAL_PALETTE)
+            self.goal_sprites.put(key, sprite)
+        self.screen.blit(sprite, (goal_x, goal_y))
+    
+    def render_goal_sprite(self, goal_width, goal_height, palette):
         # ISS Deluxe風のゴールを描画
+        net_color, line_color, post_color = palette
+        
+        # ポストの下端の線まで収まるように1ピクセル余裕を持たせる
+        surface = pygame.Surface((goal_width + 1, goal_height + 1), pygame.SRCALPHA)
+        goal_x = 0
+        goal_y = 0
         
         # ゴールの奥行き表現（3D効果）
         depth = 30
@@ -539,7 +803,7 @@ class PKGame:
         back_y = goal_y + 5
         
         # ゴールの背面（ネット用の背景）
-        pygame.draw.rect(self.screen, NET_WHITE, (back_x, back_y, back_width, back_height))
+        pygame.draw.rect(surface, net_color, (back_x, back_y, back_width, back_height))
         
         # ネットの描画（ISS風の斜めパターン）
         net_spacing_h = 15  # 横方向の間隔
@@ -547,11 +811,11 @@ class PKGame:
         
         # 縦線
         for x in range(back_x, back_x + back_width + 1, net_spacing_h):
-            pygame.draw.line(self.screen, GOAL_GRAY, (x, back_y), (x, back_y + back_height), 1)
+            pygame.draw.line(surface, line_color, (x, back_y), (x, back_y + back_height), 1)
         
         # 横線
         for y in range(back_y, back_y + back_height + 1, net_spacing_v):
-            pygame.draw.line(self.screen, GOAL_GRAY, (back_x, y), (back_x + back_width, y), 1)
+            pygame.draw.line(surface, line_color, (back_x, y), (back_x + back_width, y), 1)
         
         # 斜め線（ISS風の特徴的なネットパターン）
         for i in range(0, back_width + back_height, net_spacing_h * 2):
@@ -561,20 +825,20 @@ class PKGame:
             end_x = min(back_x + i, back_x + back_width)
             end_y = max(back_y, back_y + i - back_width)
             if start_x < back_x + back_width and start_y > back_y:
-                pygame.draw.line(self.screen, GOAL_GRAY, (start_x, start_y), (end_x, end_y), 1)
+                pygame.draw.line(surface, line_color, (start_x, start_y), (end_x, end_y), 1)
         
         # ゴールの枠（白い太いライン）
         post_thickness = 6
         
         # 左のポスト
-        pygame.draw.rect(self.screen, GOAL_POST, (goal_x, goal_y, post_thickness, goal_height))
+        pygame.draw.rect(surface, post_color, (goal_x, goal_y, post_thickness, goal_height))
         # 右のポスト
-        pygame.draw.rect(self.screen, GOAL_POST, (goal_x + goal_width - post_thickness, goal_y, post_thickness, goal_height))
+        pygame.draw.rect(surface, post_color, (goal_x + goal_width - post_thickness, goal_y, post_thickness, goal_height))
         # 上のバー
-        pygame.draw.rect(self.screen, GOAL_POST, (goal_x, goal_y, goal_width, post_thickness))
+        pygame.draw.rect(surface, post_color, (goal_x, goal_y, goal_width, post_thickness))
         
         # 奥行きの表現（左ポスト）
-        pygame.draw.polygon(self.screen, GOAL_GRAY, [
+        pygame.draw.polygon(surface, line_color, [
             (goal_x + post_thickness, goal_y),  # 上端の右
             (back_x, back_y),                   # 背面の左上
             (back_x, back_y + back_height),     # 背面の左下
@@ -582,7 +846,7 @@ class PKGame:
         ])
         
         # 奥行きの表現（右ポスト）
-        pygame.draw.polygon(self.screen, GOAL_GRAY, [
+        pygame.draw.polygon(surface, line_color, [
             (goal_x + goal_width - post_thickness, goal_y),  # 上端の左
             (back_x + back_width, back_y),                   # 背面の右上
             (back_x + back_width, back_y + back_height),     # 背面の右下
@@ -590,7 +854,7 @@ class PKGame:
         ])
         
         # 奥行きの表現（上バー）
-        pygame.draw.polygon(self.screen, GOAL_GRAY, [
+        pygame.draw.polygon(surface, line_color, [
             (goal_x + post_thickness, goal_y + post_thickness),  # 左端の下
             (goal_x + goal_width - post_thickness, goal_y + post_thickness),  # 右端の下
             (back_x + back_width, back_y),  # 背面の右上
@@ -599,26 +863,93 @@ class PKGame:
         
         # ゴールのグリッド線（エリア区分用）
         # 縦線
-        pygame.draw.line(self.screen, GOAL_GRAY, (goal_x + goal_width // 3, goal_y), 
+        pygame.draw.line(surface, line_color, (goal_x + goal_width // 3, goal_y), 
                         (back_x + back_width // 3, back_y), 1)
-        pygame.draw.line(self.screen, GOAL_GRAY, (goal_x + 2 * goal_width // 3, goal_y), 
+        pygame.draw.line(surface, line_color, (goal_x + 2 * goal_width // 3, goal_y), 
                         (back_x + 2 * back_width // 3, back_y), 1)
-        pygame.draw.line(self.screen, GOAL_GRAY, (back_x + back_width // 3, back_y), 
+        pygame.draw.line(surface, line_color, (back_x + back_width // 3, back_y), 
                         (back_x + back_width // 3, back_y + back_height), 1)
-        pygame.draw.line(self.screen, GOAL_GRAY, (back_x + 2 * back_width // 3, back_y), 
+        pygame.draw.line(surface, line_color, (back_x + 2 * back_width // 3, back_y), 
                         (back_x + 2 * back_width // 3, back_y + back_height), 1)
         
         # 横線
-        pygame.draw.line(self.screen, GOAL_GRAY, (goal_x, goal_y + goal_height // 3), 
+        pygame.draw.line(surface, line_color, (goal_x, goal_y + goal_height // 3), 
                         (back_x, back_y + back_height // 3), 1)
-        pygame.draw.line(self.screen, GOAL_GRAY, (goal_x, goal_y + 2 * goal_height // 3), 
+        pygame.draw.line(surface, line_color, (goal_x, goal_y + 2 * goal_height // 3), 
                         (back_x, back_y + 2 * back_height // 3), 1)
-        pygame.draw.line(self.screen, GOAL_GRAY, (back_x, back_y + back_height // 3), 
+        pygame.draw.line(surface, line_color, (back_x, back_y + back_height // 3), 
                         (back_x + back_width, back_y + back_height // 3), 1)
-        pygame.draw.line(self.screen, GOAL_GRAY, (back_x, back_y + 2 * back_height // 3), 
+        pygame.draw.line(surface, line_color, (back_x, back_y + 2 * back_height // 3), 
                         (back_x + back_width, back_y + 2 * back_height // 3), 1)
+        return surface
+    
+    def build_sprite_atlas(self):
+        # キャラクター（色とポーズの組み合わせ）とボールを1枚のSurfaceに並べて一度だけ描画する
+        cell_width, cell_height = CHARACTER_CELL
+        width = cell_width * len(ATLAS_CHARACTERS) + BALL_CELL[0]
+        height = max(cell_height, BALL_CELL[1])
+        atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+        
+        rects = {}
+        for i, (color, is_keeper) in enumerate(ATLAS_CHARACTERS):
+            cell = pygame.Rect(i * cell_width, 0, cell_width, cell_height)
+            self.render_iss_character(atlas, cell.x + CHARACTER_ANCHOR[0], cell.y + CHARACTER_ANCHOR[1], color, is_keeper)
+            rects[(color, is_keeper)] = cell
+        
+        ball_cell = pygame.Rect(cell_width * len(ATLAS_CHARACTERS), 0, BALL_CELL[0], BALL_CELL[1])
+        self.render_iss_ball(atlas, ball_cell.x + BALL_ANCHOR[0], ball_cell.y + BALL_ANCHOR[1])
+        
+        self.sprite_atlas = atlas.convert_alpha()
+        self.character_rects = rects  # (色, キーパーか) -> アトラス内の位置
+        self.ball_rect = ball_cell
+    
+    def build_ball_paths(self, curve, lift, swerve):
+        # 9エリアの中心に向かうボールの軌道とダイビングの軌跡を起動時に一度だけ計算する
+        area_width = GOAL_WIDTH // 3
+        area_height = GOAL_HEIGHT // 3
+        goal_x = SCREEN_WIDTH // 2 - GOAL_WIDTH // 2
+        targets = [(goal_x + (area % 3) * area_width + area_width // 2,
+                    GOAL_Y + (area // 3) * area_height + area_height // 2) for area in range(9)]
+        self.kick_path = BallPath(KICK_BALL_START, targets, curve=curve, lift=lift, swerve=swerve)
+        self.shot_path = BallPath(SHOT_BALL_START, targets, curve=curve, lift=lift, swerve=swerve)
+        self.dive_trails = []  # [エリア] -> (軌跡の点, 更新領域)
+        for target in targets:
+            trail = dive_trail(DIVE_START, target)
+            self.dive_trails.append((trail, path_rect((DIVE_START,) + trail)))
+    
+    def draw_ball_path(self, path, area, alpha=0.0):
+        # 事前計算した表からボールと軌跡を描画する
+        position, trail, rect = path.lookup(area, self.session.animation_timer, alpha)
+        self.mark_dirty(rect)
+        
+        # ISS風のボールの軌跡（白い点線）
+        for point in trail:
+            pygame.draw.circle(self.screen, WHITE, point, 2)
+        
+        # ボールを描画（ISS風）
+        self.draw_iss_ball(*position)
     
     def draw_iss_character(self, x, y, color, is_keeper=False):
+        # ISS Deluxe風のキャラクター（アトラスから1回のblitで描画）
+        left = x - CHARACTER_ANCHOR[0]
+        top = y - CHARACTER_ANCHOR[1]
+        self.mark_dirty((left, top) + CHARACTER_CELL)
+        
+        area = self.character_rects.get((color, is_keeper))
+        if area is None:
+            # アトラスにない色はその場で描画する
+            self.render_iss_character(self.screen, x, y, color, is_keeper)
+        else:
+            self.screen.blit(self.sprite_atlas, (left, top), area)
+    
+    def draw_iss_ball(self, x, y):
+        # ISS Deluxe風のボール（アトラスから1回のblitで描画）
+        left = x - BALL_ANCHOR[0]
+        top = y - BALL_ANCHOR[1]
+        self.mark_dirty((left, top) + BALL_CELL)
+        self.screen.blit(self.sprite_atlas, (left, top), self.ball_rect)
+    
+    def render_iss_character(self, surface, x, y, color, is_keeper=False):
         # ISS Deluxe風のキャラクター
         
         # 影（楕円）
@@ -627,30 +958,30 @@ class PKGame:
         shadow_y = y + 25
         shadow = pygame.Surface((shadow_width, shadow_height), pygame.SRCALPHA)
         pygame.draw.ellipse(shadow, (0, 0, 0, 100), (0, 0, shadow_width, shadow_height))
-        self.screen.blit(shadow, (x - shadow_width // 2, shadow_y))
+        surface.blit(shadow, (x - shadow_width // 2, shadow_y))
         
         # 頭（ISS風の特徴的な形状）
         head_size = 12
-        pygame.draw.circle(self.screen, SKIN_COLOR, (x, y - 22), head_size)
+        pygame.draw.circle(surface, SKIN_COLOR, (x, y - 22), head_size)
         
         # 髪の毛（黒）
         hair_color = BLACK
-        pygame.draw.arc(self.screen, hair_color, 
+        pygame.draw.arc(surface, hair_color, 
                       (x - head_size, y - 22 - head_size, head_size * 2, head_size * 2),
                       math.pi * 0.7, math.pi * 2.3, 3)
         
         # 顔のディテール
         eye_color = BLACK
         # 目（点）
-        pygame.draw.circle(self.screen, eye_color, (x - 4, y - 22), 2)
-        pygame.draw.circle(self.screen, eye_color, (x + 4, y - 22), 2)
+        pygame.draw.circle(surface, eye_color, (x - 4, y - 22), 2)
+        pygame.draw.circle(surface, eye_color, (x + 4, y - 22), 2)
         
         # 体（ISS風の特徴的なフォルム）
         body_width = 24
         body_height = 30
         
         # 胴体（ユニフォーム）- 渡された色をそのまま使用
-        pygame.draw.polygon(self.screen, color, [
+        pygame.draw.polygon(surface, color, [
             (x - body_width // 2, y - 10),  # 左肩
             (x + body_width // 2, y - 10),  # 右肩
             (x + body_width // 3, y + body_height // 2),  # 右腰
@@ -659,11 +990,11 @@ class PKGame:
         
         # ユニフォームの詳細（番号や模様）
         detail_color = WHITE
-        pygame.draw.line(self.screen, detail_color, (x - 5, y), (x + 5, y), 2)
+        pygame.draw.line(surface, detail_color, (x - 5, y), (x + 5, y), 2)
         
         # 短パン
         shorts_color = WHITE if color == PLAYER_BLUE else BLACK
-        pygame.draw.polygon(self.screen, shorts_color, [
+        pygame.draw.polygon(surface, shorts_color, [
             (x - body_width // 3, y + body_height // 2),  # 左腰
             (x + body_width // 3, y + body_height // 2),  # 右腰
             (x + body_width // 4, y + body_height // 2 + 10),  # 右太もも
@@ -673,48 +1004,48 @@ class PKGame:
         # 足（ISS風の特徴的な細い足）
         leg_color = BLACK
         # 左足
-        pygame.draw.line(self.screen, leg_color, 
+        pygame.draw.line(surface, leg_color, 
                        (x - body_width // 6, y + body_height // 2 + 10), 
                        (x - body_width // 4, y + body_height), 3)
         # 右足
-        pygame.draw.line(self.screen, leg_color, 
+        pygame.draw.line(surface, leg_color, 
                        (x + body_width // 6, y + body_height // 2 + 10), 
                        (x + body_width // 4, y + body_height), 3)
         
         # 靴（ISS風の特徴的な形状）
         shoe_color = BLACK
         # 左靴
-        pygame.draw.line(self.screen, shoe_color, 
+        pygame.draw.line(surface, shoe_color, 
                        (x - body_width // 4, y + body_height), 
                        (x - body_width // 4 - 5, y + body_height), 4)
         # 右靴
-        pygame.draw.line(self.screen, shoe_color, 
+        pygame.draw.line(surface, shoe_color, 
                        (x + body_width // 4, y + body_height), 
                        (x + body_width // 4 + 5, y + body_height), 4)
         
         # キーパーの場合は手を広げる
         if is_keeper:
             # 左手
-            pygame.draw.line(self.screen, color, 
+            pygame.draw.line(surface, color, 
                            (x - body_width // 2, y - 5), 
                            (x - body_width, y - 15), 3)
             # 右手
-            pygame.draw.line(self.screen, color, 
+            pygame.draw.line(surface, color, 
                            (x + body_width // 2, y - 5), 
                            (x + body_width, y - 15), 3)
             # グローブ（ISS風の大きめのグローブ）
-            pygame.draw.circle(self.screen, WHITE, (x - body_width, y - 15), 6)
-            pygame.draw.circle(self.screen, WHITE, (x + body_width, y - 15), 6)
+            pygame.draw.circle(surface, WHITE, (x - body_width, y - 15), 6)
+            pygame.draw.circle(surface, WHITE, (x + body_width, y - 15), 6)
         else:
             # 通常の腕
-            pygame.draw.line(self.screen, color, 
+            pygame.draw.line(surface, color, 
                            (x - body_width // 2, y - 5), 
                            (x - body_width // 2 - 10, y + 5), 3)
-            pygame.draw.line(self.screen, color, 
+            pygame.draw.line(surface, color, 
                            (x + body_width // 2, y - 5), 
                            (x + body_width // 2 + 10, y + 5), 3)
     
-    def draw_iss_ball(self, x, y):
+    def render_iss_ball(self, surface, x, y):
         # ISS Deluxe風のボール
         ball_radius = 10
         
@@ -723,13 +1054,13 @@ class PKGame:
         shadow_height = ball_radius * 0.5
         shadow = pygame.Surface((int(shadow_width), int(shadow_height)), pygame.SRCALPHA)
         pygame.draw.ellipse(shadow, (0, 0, 0, 100), (0, 0, int(shadow_width), int(shadow_height)))
-        self.screen.blit(shadow, (x - shadow_width // 2, y + ball_radius))
+        surface.blit(shadow, (x - shadow_width // 2, y + ball_radius))
         
         # ボールの本体（白）
-        pygame.draw.circle(self.screen, BALL_WHITE, (x, y), ball_radius)
+        pygame.draw.circle(surface, BALL_WHITE, (x, y), ball_radius)
         
         # ISS風の特徴的な黒い六角形パターン
-        pygame.draw.polygon(self.screen, BLACK, [
+        pygame.draw.polygon(surface, BLACK, [
             (x, y - ball_radius + 3),
             (x + ball_radius - 3, y - ball_radius // 2),
             (x + ball_radius - 3, y + ball_radius // 2),
@@ -739,55 +1070,135 @@ class PKGame:
         ], 2)
         
         # 内側の模様
-        pygame.draw.line(self.screen, BLACK, 
+        pygame.draw.line(surface, BLACK, 
                        (x - ball_radius // 2, y), 
                        (x + ball_radius // 2, y), 1)
-        pygame.draw.line(self.screen, BLACK, 
+        pygame.draw.line(surface, BLACK, 
                        (x, y - ball_radius // 2), 
                        (x, y + ball_radius // 2), 1)
         
         # ハイライト（光の反射）
-        pygame.draw.circle(self.screen, WHITE, (x - ball_radius // 2, y - ball_radius // 2), 3)
+        pygame.draw.circle(surface, WHITE, (x - ball_radius // 2, y - ball_radius // 2), 3)
+    
+    def draw_turn_panel(self, label):
+        # 現在のターン表示（画面上部右側）
+        pygame.draw.rect(self.screen, BLACK, (SCREEN_WIDTH - 310, 10, 300, 40))
+        pygame.draw.rect(self.screen, WHITE, (SCREEN_WIDTH - 310, 10, 300, 40), 2)
+        
+        # チーム表示（青と赤で色分け）
+        turn_text = self.render_text(label, 36, PLAYER_BLUE)
+        self.screen.blit(turn_text, (SCREEN_WIDTH - 310 + (300 - turn_text.get_width()) // 2, 20))
+    
+    def draw_team_labels(self):
+        blue_text = self.render_text("BLUE: YOU", 24, PLAYER_BLUE)
+        red_text = self.render_text("RED: AI", 24, KEEPER_RED)
+        self.screen.blit(blue_text, (20, 90))
+        self.screen.blit(red_text, (20, 110))
+    
+    def draw_command_window(self, instruction):
+        # 画面下部の指示とメーターの枠（メーターの位置を返す）
+        command_height = 70
+        command_y = SCREEN_HEIGHT - command_height - 10
+        
+        # コマンドウィンドウの背景
+        pygame.draw.rect(self.screen, SCOREBOARD_BG, 
+                       (10, command_y, SCREEN_WIDTH - 20, command_height))
+        pygame.draw.rect(self.screen, WHITE, 
+                       (10, command_y, SCREEN_WIDTH - 20, command_height), 2)
+        
+        # 指示テキスト
+        instruction_text = self.render_text(instruction, 36, WHITE)
+        self.screen.blit(instruction_text, (SCREEN_WIDTH // 2 - instruction_text.get_width() // 2, command_y + 20))
+        
+        # メーター（ISS風の特徴的な要素）
+        meter_width = 200
+        meter_height = 15
+        meter_x = SCREEN_WIDTH // 2 - meter_width // 2
+        meter_y = command_y + 45
+        
+        # メーターの背景
+        pygame.draw.rect(self.screen, BLACK, (meter_x, meter_y, meter_width, meter_height))
+        self.mark_dirty((meter_x, meter_y, meter_width, meter_height))
+        pygame.draw.rect(self.screen, WHITE, (meter_x, meter_y, meter_width, meter_height), 1)
+        return meter_x, meter_y, meter_width, meter_height
     
-    def draw_kicking_view(self):
+    def draw_sankaku_tobi(self, special_color=None):
+        # 三角飛びの特殊メッセージボックス（色を省略すると点滅する）
+        special_width = 400
+        special_height = 80
+        special_x = SCREEN_WIDTH // 2 - special_width // 2
+        special_y = SCREEN_HEIGHT // 2 - special_height // 2
+        
+        # メッセージの背景（黒）と枠（金色）
+        pygame.draw.rect(self.screen, BLACK, (special_x, special_y, special_width, special_height))
+        self.mark_dirty((special_x, special_y, special_width, special_height))
+        pygame.draw.rect(self.screen, GOLD, (special_x, special_y, special_width, special_height), 4)
+        
+        # 特殊メッセージ（点滅効果）
+        if special_color is None:
+            special_color = RED if self.animation.blink(300, 150) else YELLOW
+        
+        special_text = self.render_text("SA N KA KU TO BI !!!", 48, special_color)
+        self.screen.blit(special_text, (special_x + special_width // 2 - special_text.get_width() // 2, 
+                                      special_y + special_height // 2 - special_text.get_height() // 2))
+    
+    def draw_kicker_setup(self):
+        # キッカーを描画（ISS風）
+        self.draw_iss_character(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 150, PLAYER_BLUE)
+        
+        # ボールを描画（ISS風）
+        self.draw_iss_ball(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 110)
+    
+    def draw_keeper_setup(self):
+        # ゴールキーパーを描画（ISS風）- プレイヤーは青色
+        keeper_x = SCREEN_WIDTH // 2
+        keeper_y = GOAL_Y + GOAL_HEIGHT + 30
+        self.draw_iss_character(keeper_x, keeper_y, PLAYER_BLUE, True)
+        
+        # AIのキッカーを描画（遠くに小さく、ISS風）- AIは赤色
+        kicker_x = SCREEN_WIDTH // 2
+        kicker_y = SCREEN_HEIGHT - 80
+        
+        # 小さいサイズで描画（遠くに見えるように）
+        pygame.draw.circle(self.screen, KEEPER_RED, (kicker_x, kicker_y), 8)  # 体
+        pygame.draw.circle(self.screen, SKIN_COLOR, (kicker_x, kicker_y - 10), 5)  # 頭
+        
+        # ボールを描画（ISS風、小さめ）
+        ball_x = SCREEN_WIDTH // 2
+        ball_y = SCREEN_HEIGHT - 60
+        pygame.draw.circle(self.screen, BALL_WHITE, (ball_x, ball_y), 6)
+        pygame.draw.circle(self.screen, BLACK, (ball_x, ball_y), 6, 1)
+    
+    def draw_kicking_view(self, alpha=0.0):
         # フィールドを描画
         self.draw_field()
         
         # ゴールを描画
-        goal_width = 400
-        goal_height = 200
+        goal_width = GOAL_WIDTH
+        goal_height = GOAL_HEIGHT
         goal_x = SCREEN_WIDTH // 2 - goal_width // 2
-        goal_y = 150
+        goal_y = GOAL_Y
         
         self.draw_goal(goal_x, goal_y, goal_width, goal_height)
         
         # 現在のターン表示（画面上部右側に移動）
-        turn_bg = pygame.Surface((300, 40))
-        turn_bg.fill(BLACK)
-        self.screen.blit(turn_bg, (SCREEN_WIDTH - 310, 10))
-        pygame.draw.rect(self.screen, WHITE, (SCREEN_WIDTH - 310, 10, 300, 40), 2)
-        
-        # チーム表示（青と赤で色分け）
-        turn_text = self.font.render("YOUR TURN - KICKER", True, PLAYER_BLUE)
-        self.screen.blit(turn_text, (SCREEN_WIDTH - 310 + (300 - turn_text.get_width()) // 2, 20))
+        self.draw_turn_panel("YOUR TURN - KICKER")
         
         # チーム表示（小さく）
-        team_font = pygame.font.SysFont(None, 24)
-        blue_text = team_font.render("BLUE: YOU", True, PLAYER_BLUE)
-        red_text = team_font.render("RED: AI", True, KEEPER_RED)
-        self.screen.blit(blue_text, (20, 90))
-        self.screen.blit(red_text, (20, 110))
+        self.draw_team_labels()
         
         # 選択されたエリアをハイライト（ISS風）
         area_width = goal_width // 3
         area_height = goal_height // 3
-        area_x = goal_x + (self.selected_area.value % 3) * area_width
-        area_y = goal_y + (self.selected_area.value // 3) * area_height
+        area_x = goal_x + (self.session.selected_area.value % 3) * area_width
+        area_y = goal_y + (self.session.selected_area.value // 3) * area_height
         
-        if self.state == GameState.PLAYER_KICKING:
+        if self.session.state == GameState.PLAYER_KICKING:
+            # 選択カーソルが動くゴール全体を更新領域にする
+            self.mark_dirty((goal_x, goal_y, goal_width + 1, goal_height + 1))
+            
             # ISS風のターゲットマーカー（点滅する十字線）
-            blink_rate = (pygame.time.get_ticks() % 1000) / 1000.0
-            if blink_rate > 0.5:
+            if self.animation.blink(1000, 500):
                 target_x = area_x + area_width // 2
                 target_y = area_y + area_height // 2
                 target_size = 20
@@ -804,151 +1215,73 @@ class PKGame:
                 pygame.draw.rect(self.screen, YELLOW, 
                                (area_x, area_y, area_width, area_height), 2)
             
-            # ISS風のコマンドウィンドウ
-            command_height = 70
-            command_y = SCREEN_HEIGHT - command_height - 10
-            
-            # コマンドウィンドウの背景
-            pygame.draw.rect(self.screen, SCOREBOARD_BG, 
-                           (10, command_y, SCREEN_WIDTH - 20, command_height))
-            pygame.draw.rect(self.screen, WHITE, 
-                           (10, command_y, SCREEN_WIDTH - 20, command_height), 2)
-            
-            # 指示テキスト
-            instruction_text = self.font.render("Use arrow keys to aim, SPACE to shoot", True, WHITE)
-            self.screen.blit(instruction_text, (SCREEN_WIDTH // 2 - instruction_text.get_width() // 2, command_y + 20))
-            
-            # パワーメーター（ISS風の特徴的な要素）
-            meter_width = 200
-            meter_height = 15
-            meter_x = SCREEN_WIDTH // 2 - meter_width // 2
-            meter_y = command_y + 45
-            
-            # メーターの背景
-            pygame.draw.rect(self.screen, BLACK, (meter_x, meter_y, meter_width, meter_height))
-            pygame.draw.rect(self.screen, WHITE, (meter_x, meter_y, meter_width, meter_height), 1)
+            # ISS風のコマンドウィンドウとパワーメーターの枠
+            meter_x, meter_y, meter_width, meter_height = self.draw_command_window("Use arrow keys to aim, SPACE to shoot")
             
             # メーターの値（時間とともに増減）
-            meter_value = (math.sin(pygame.time.get_ticks() / 500) + 1) / 2  # 0～1の間で変動
+            meter_value = self.animation.kick_meter()  # 0～1の間で変動
             pygame.draw.rect(self.screen, RED, 
                            (meter_x + 2, meter_y + 2, 
                             int((meter_width - 4) * meter_value), meter_height - 4))
             
-            # キッカーを描画（ISS風）
-            self.draw_iss_character(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 150, PLAYER_BLUE)
-            
-            # ボールを描画（ISS風）
-            self.draw_iss_ball(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 110)
+            # キッカーとボールを描画（ISS風）
+            self.draw_kicker_setup()
         
-        elif self.state == GameState.AI_GOALKEEPING:
+        elif self.session.state == GameState.AI_GOALKEEPING:
             # ターン表示を更新（画面右側に配置）
-            turn_bg = pygame.Surface((300, 40))
-            turn_bg.fill(BLACK)
-            self.screen.blit(turn_bg, (SCREEN_WIDTH - 310, 10))
-            pygame.draw.rect(self.screen, WHITE, (SCREEN_WIDTH - 310, 10, 300, 40), 2)
-            
-            turn_text = self.font.render("YOUR SHOT - AI KEEPER", True, PLAYER_BLUE)
-            self.screen.blit(turn_text, (SCREEN_WIDTH - 310 + (300 - turn_text.get_width()) // 2, 20))
+            self.draw_turn_panel("YOUR SHOT - AI KEEPER")
             
             # チーム表示（小さく）
-            team_font = pygame.font.SysFont(None, 24)
-            blue_text = team_font.render("BLUE: YOU", True, PLAYER_BLUE)
-            red_text = team_font.render("RED: AI", True, KEEPER_RED)
-            self.screen.blit(blue_text, (20, 90))
-            self.screen.blit(red_text, (20, 110))
+            self.draw_team_labels()
             
             # AIのセーブ位置をハイライト（ISS風）
-            ai_area_x = goal_x + (self.ai_selected_area.value % 3) * area_width
-            ai_area_y = goal_y + (self.ai_selected_area.value // 3) * area_height
+            ai_area_x = goal_x + (self.session.ai_selected_area.value % 3) * area_width
+            ai_area_y = goal_y + (self.session.ai_selected_area.value // 3) * area_height
             
             # AIのセーブ位置マーカー
             keeper_x = ai_area_x + area_width // 2
             keeper_y = ai_area_y + area_height // 2
             
             # 三角飛びメッセージを表示（キック直後）
-            if hasattr(self, 'show_sankaku_tobi') and self.show_sankaku_tobi:
-                # 特殊メッセージボックス
-                special_width = 400
-                special_height = 80
-                special_x = SCREEN_WIDTH // 2 - special_width // 2
-                special_y = SCREEN_HEIGHT // 2 - special_height // 2
-                
-                # メッセージの背景（黒）と枠（金色）
-                pygame.draw.rect(self.screen, BLACK, (special_x, special_y, special_width, special_height))
-                pygame.draw.rect(self.screen, GOLD, (special_x, special_y, special_width, special_height), 4)
-                
-                # 特殊メッセージ（点滅効果）
-                blink_rate = (pygame.time.get_ticks() % 300) / 300.0
-                if blink_rate > 0.5:
-                    special_color = RED
-                else:
-                    special_color = YELLOW
-                
-                special_font = pygame.font.SysFont(None, 48)
-                special_text = special_font.render("SA N KA KU TO BI !!!", True, special_color)
-                self.screen.blit(special_text, (special_x + special_width // 2 - special_text.get_width() // 2, 
-                                              special_y + special_height // 2 - special_text.get_height() // 2))
+            if self.session.show_sankaku_tobi:
+                self.draw_sankaku_tobi()
             
             # ゴールキーパーを描画（AIのセーブ位置に、ISS風）- AIは赤色
             self.draw_iss_character(keeper_x, keeper_y, KEEPER_RED, True)
             
             # ボールの軌道を描画（ISS風）- プレイヤーが選択したエリアに向かって飛ぶ
-            ball_progress = min(1.0, self.animation_timer / 60)
-            selected_area_x = goal_x + (self.selected_area.value % 3) * area_width
-            selected_area_y = goal_y + (self.selected_area.value // 3) * area_height
-            ball_x = SCREEN_WIDTH // 2 + (selected_area_x + area_width // 2 - SCREEN_WIDTH // 2) * ball_progress
-            ball_y = SCREEN_HEIGHT - 110 + (selected_area_y + area_height // 2 - (SCREEN_HEIGHT - 110)) * ball_progress
-            
-            # ISS風のボールの軌跡（白い点線）
-            if ball_progress > 0.1:
-                for i in range(1, 8):
-                    trail_progress = ball_progress - i * 0.1
-                    if trail_progress > 0:
-                        trail_x = SCREEN_WIDTH // 2 + (selected_area_x + area_width // 2 - SCREEN_WIDTH // 2) * trail_progress
-                        trail_y = SCREEN_HEIGHT - 110 + (selected_area_y + area_height // 2 - (SCREEN_HEIGHT - 110)) * trail_progress
-                        pygame.draw.circle(self.screen, WHITE, (int(trail_x), int(trail_y)), 2)
-            
-            # ボールを描画（ISS風）
-            self.draw_iss_ball(int(ball_x), int(ball_y))
+            self.draw_ball_path(self.kick_path, self.session.selected_area.value, alpha)
     
-    def draw_goalkeeping_view(self):
+    def draw_goalkeeping_view(self, alpha=0.0):
         # フィールドを描画
         self.draw_field()
         
         # ゴールを描画
-        goal_width = 400
-        goal_height = 200
+        goal_width = GOAL_WIDTH
+        goal_height = GOAL_HEIGHT
         goal_x = SCREEN_WIDTH // 2 - goal_width // 2
-        goal_y = 150
+        goal_y = GOAL_Y
         
         self.draw_goal(goal_x, goal_y, goal_width, goal_height)
         
         # 現在のターン表示（画面右側に配置）
-        turn_bg = pygame.Surface((300, 40))
-        turn_bg.fill(BLACK)
-        self.screen.blit(turn_bg, (SCREEN_WIDTH - 310, 10))
-        pygame.draw.rect(self.screen, WHITE, (SCREEN_WIDTH - 310, 10, 300, 40), 2)
-        
-        turn_text = self.font.render("YOUR TURN - KEEPER", True, PLAYER_BLUE)
-        self.screen.blit(turn_text, (SCREEN_WIDTH - 310 + (300 - turn_text.get_width()) // 2, 20))
+        self.draw_turn_panel("YOUR TURN - KEEPER")
         
         # チーム表示（小さく）
-        team_font = pygame.font.SysFont(None, 24)
-        blue_text = team_font.render("BLUE: YOU", True, PLAYER_BLUE)
-        red_text = team_font.render("RED: AI", True, KEEPER_RED)
-        self.screen.blit(blue_text, (20, 90))
-        self.screen.blit(red_text, (20, 110))
+        self.draw_team_labels()
         
         # 選択されたエリアをハイライト
         area_width = goal_width // 3
         area_height = goal_height // 3
-        area_x = goal_x + (self.selected_area.value % 3) * area_width
-        area_y = goal_y + (self.selected_area.value // 3) * area_height
+        area_x = goal_x + (self.session.selected_area.value % 3) * area_width
+        area_y = goal_y + (self.session.selected_area.value // 3) * area_height
         
-        if self.state == GameState.PLAYER_GOALKEEPING:
+        if self.session.state == GameState.PLAYER_GOALKEEPING:
+            # 選択カーソルが動くゴール全体を更新領域にする
+            self.mark_dirty((goal_x, goal_y, goal_width + 1, goal_height + 1))
+            
             # ISS風のセーブポジションマーカー（点滅する十字線）
-            blink_rate = (pygame.time.get_ticks() % 1000) / 1000.0
-            if blink_rate > 0.5:
+            if self.animation.blink(1000, 500):
                 target_x = area_x + area_width // 2
                 target_y = area_y + area_height // 2
                 target_size = 20
@@ -961,141 +1294,52 @@ class PKGame:
                                (target_x, target_y - target_size), 
                                (target_x, target_y + target_size), 2)
             
-            # ISS風のコマンドウィンドウ
-            command_height = 70
-            command_y = SCREEN_HEIGHT - command_height - 10
-            
-            # コマンドウィンドウの背景
-            pygame.draw.rect(self.screen, SCOREBOARD_BG, 
-                           (10, command_y, SCREEN_WIDTH - 20, command_height))
-            pygame.draw.rect(self.screen, WHITE, 
-                           (10, command_y, SCREEN_WIDTH - 20, command_height), 2)
-            
-            # 指示テキスト
-            instruction_text = self.font.render("Use arrow keys to choose dive direction, SPACE to confirm", True, WHITE)
-            self.screen.blit(instruction_text, (SCREEN_WIDTH // 2 - instruction_text.get_width() // 2, command_y + 20))
-            
-            # リアクションタイムメーター（ISS風の特徴的な要素）
-            meter_width = 200
-            meter_height = 15
-            meter_x = SCREEN_WIDTH // 2 - meter_width // 2
-            meter_y = command_y + 45
-            
-            # メーターの背景
-            pygame.draw.rect(self.screen, BLACK, (meter_x, meter_y, meter_width, meter_height))
-            pygame.draw.rect(self.screen, WHITE, (meter_x, meter_y, meter_width, meter_height), 1)
+            # ISS風のコマンドウィンドウとリアクションタイムメーターの枠
+            meter_x, meter_y, meter_width, meter_height = self.draw_command_window("Use arrow keys to choose dive direction, SPACE to confirm")
             
             # メーターの値（時間とともに増減）
-            meter_value = (math.sin(pygame.time.get_ticks() / 300) + 1) / 2  # 0～1の間で変動（速め）
+            meter_value = self.animation.save_meter()  # 0～1の間で変動（速め）
             pygame.draw.rect(self.screen, YELLOW, 
                            (meter_x + 2, meter_y + 2, 
                             int((meter_width - 4) * meter_value), meter_height - 4))
             
-            # ゴールキーパーを描画（ISS風）- プレイヤーは青色
-            keeper_x = SCREEN_WIDTH // 2
-            keeper_y = goal_y + goal_height + 30
-            self.draw_iss_character(keeper_x, keeper_y, PLAYER_BLUE, True)
-            
-            # AIのキッカーを描画（遠くに小さく、ISS風）- AIは赤色
-            kicker_x = SCREEN_WIDTH // 2
-            kicker_y = SCREEN_HEIGHT - 80
-            
-            # 小さいサイズで描画（遠くに見えるように）
-            pygame.draw.circle(self.screen, KEEPER_RED, (kicker_x, kicker_y), 8)  # 体
-            pygame.draw.circle(self.screen, SKIN_COLOR, (kicker_x, kicker_y - 10), 5)  # 頭
-            
-            # ボールを描画（ISS風、小さめ）
-            ball_x = SCREEN_WIDTH // 2
-            ball_y = SCREEN_HEIGHT - 60
-            pygame.draw.circle(self.screen, BALL_WHITE, (ball_x, ball_y), 6)
-            pygame.draw.circle(self.screen, BLACK, (ball_x, ball_y), 6, 1)
+            # キーパーと遠くのAIのキッカーを描画（ISS風）
+            self.draw_keeper_setup()
             
 
         
-        elif self.state == GameState.AI_KICKING:
+        elif self.session.state == GameState.AI_KICKING:
             # ターン表示を更新（画面右側に配置）
-            turn_bg = pygame.Surface((300, 40))
-            turn_bg.fill(BLACK)
-            self.screen.blit(turn_bg, (SCREEN_WIDTH - 310, 10))
-            pygame.draw.rect(self.screen, WHITE, (SCREEN_WIDTH - 310, 10, 300, 40), 2)
-            
-            turn_text = self.font.render("AI SHOT - YOUR SAVE", True, PLAYER_BLUE)
-            self.screen.blit(turn_text, (SCREEN_WIDTH - 310 + (300 - turn_text.get_width()) // 2, 20))
+            self.draw_turn_panel("AI SHOT - YOUR SAVE")
             
             # チーム表示（小さく）
-            team_font = pygame.font.SysFont(None, 24)
-            blue_text = team_font.render("BLUE: YOU", True, PLAYER_BLUE)
-            red_text = team_font.render("RED: AI", True, KEEPER_RED)
-            self.screen.blit(blue_text, (20, 90))
-            self.screen.blit(red_text, (20, 110))
-            
-            # AIのキック位置をマーク（ISS風）
-            ai_area_x = goal_x + (self.ai_selected_area.value % 3) * area_width
-            ai_area_y = goal_y + (self.ai_selected_area.value // 3) * area_height
+            self.draw_team_labels()
             
             # プレイヤーのセーブ位置をマーク（ISS風）
             save_x = area_x + area_width // 2
             save_y = area_y + area_height // 2
             
             # 三角飛びメッセージを表示（キック直後）
-            if hasattr(self, 'show_sankaku_tobi') and self.show_sankaku_tobi:
-                # 特殊メッセージボックス
-                special_width = 400
-                special_height = 80
-                special_x = SCREEN_WIDTH // 2 - special_width // 2
-                special_y = SCREEN_HEIGHT // 2 - special_height // 2
-                
-                # メッセージの背景（黒）と枠（金色）
-                pygame.draw.rect(self.screen, BLACK, (special_x, special_y, special_width, special_height))
-                pygame.draw.rect(self.screen, GOLD, (special_x, special_y, special_width, special_height), 4)
-                
-                # 特殊メッセージ（点滅効果）
-                blink_rate = (pygame.time.get_ticks() % 300) / 300.0
-                if blink_rate > 0.5:
-                    special_color = RED
-                else:
-                    special_color = YELLOW
-                
-                special_font = pygame.font.SysFont(None, 48)
-                special_text = special_font.render("SA N KA KU TO BI !!!", True, special_color)
-                self.screen.blit(special_text, (special_x + special_width // 2 - special_text.get_width() // 2, 
-                                              special_y + special_height // 2 - special_text.get_height() // 2))
+            if self.session.show_sankaku_tobi:
+                self.draw_sankaku_tobi()
             
             # セーブマーカー（点滅する円）
-            blink_rate = (pygame.time.get_ticks() % 500) / 500.0
-            if blink_rate > 0.3:
+            if self.animation.blink(500, 150):
                 pygame.draw.circle(self.screen, YELLOW, (save_x, save_y), 20, 2)
             
             # プレイヤーのゴールキーパーを描画（セーブ位置に、ISS風）- プレイヤーは青色
             self.draw_iss_character(save_x, save_y, PLAYER_BLUE, True)
             
             # ISS風のダイビングエフェクト（動きの表現）
-            if self.animation_timer > 20:
+            if self.session.animation_timer > 20:
                 # ダイビングの軌跡（点線）
-                start_x = SCREEN_WIDTH // 2
-                start_y = goal_y + goal_height + 30
-                for i in range(1, 6):
-                    progress = i / 5.0
-                    trail_x = start_x + (save_x - start_x) * progress
-                    trail_y = start_y + (save_y - start_y) * progress
-                    pygame.draw.circle(self.screen, WHITE, (int(trail_x), int(trail_y)), 2)
+                trail, rect = self.dive_trails[self.session.selected_area.value]
+                self.mark_dirty(rect)
+                for point in trail:
+                    pygame.draw.circle(self.screen, WHITE, point, 2)
             
             # ボールの軌道を描画（ISS風）
-            ball_progress = min(1.0, self.animation_timer / 60)
-            ball_x = SCREEN_WIDTH // 2 + (ai_area_x + area_width // 2 - SCREEN_WIDTH // 2) * ball_progress
-            ball_y = SCREEN_HEIGHT - 60 + (ai_area_y + area_height // 2 - (SCREEN_HEIGHT - 60)) * ball_progress
-            
-            # ISS風のボールの軌跡（白い点線）
-            if ball_progress > 0.1:
-                for i in range(1, 8):
-                    trail_progress = ball_progress - i * 0.1
-                    if trail_progress > 0:
-                        trail_x = SCREEN_WIDTH // 2 + (ai_area_x + area_width // 2 - SCREEN_WIDTH // 2) * trail_progress
-                        trail_y = SCREEN_HEIGHT - 60 + (ai_area_y + area_height // 2 - (SCREEN_HEIGHT - 60)) * trail_progress
-                        pygame.draw.circle(self.screen, WHITE, (int(trail_x), int(trail_y)), 2)
-            
-            # ボールを描画（ISS風）
-            self.draw_iss_ball(int(ball_x), int(ball_y))
+            self.draw_ball_path(self.shot_path, self.session.ai_selected_area.value, alpha)
     
     def draw_pixel_trophy(self, x, y):
         pixel_size = 8
@@ -1137,22 +1381,18 @@ class PKGame:
         pygame.draw.line(self.screen, highlight_color, (x - 25, y + 10), (x + 25, y + 10), 2)
         
         # キラキラエフェクト（スーパーファミコン風の装飾）
-        star_time = pygame.time.get_ticks() / 200
-        for i in range(3):
-            star_x = x + math.cos(star_time + i * 2) * 15
-            star_y = y - 30 + math.sin(star_time + i) * 10
-            star_size = 2 + math.sin(star_time * 2 + i) * 1
-            pygame.draw.circle(self.screen, WHITE, (int(star_x), int(star_y)), int(star_size))
+        for offset_x, offset_y, star_size in self.animation.sparkles():
+            pygame.draw.circle(self.screen, WHITE, (int(x + offset_x), int(y - 30 + offset_y)), star_size)
     
     def draw_result(self):
         # フィールドを描画（背景として）
         self.draw_field()
         
         # ゴールを描画（装飾として）
-        goal_width = 400
-        goal_height = 200
+        goal_width = GOAL_WIDTH
+        goal_height = GOAL_HEIGHT
         goal_x = SCREEN_WIDTH // 2 - goal_width // 2
-        goal_y = 150
+        goal_y = GOAL_Y
         self.draw_goal(goal_x, goal_y, goal_width, goal_height)
         
         # ISS風の結果画面
@@ -1168,9 +1408,9 @@ class PKGame:
         
         # 上部の結果バナー
         banner_height = 80
-        if self.player_score > self.ai_score:
+        if self.session.player_score > self.session.ai_score:
             banner_color = BLUE  # 勝利時は青
-        elif self.player_score < self.ai_score:
+        elif self.session.player_score < self.session.ai_score:
             banner_color = RED   # 敗北時は赤
         else:
             banner_color = YELLOW  # 引き分け時は黄色
@@ -1179,19 +1419,16 @@ class PKGame:
         pygame.draw.rect(self.screen, WHITE, (panel_x, panel_y, panel_width, banner_height), 2)
         
         # 結果テキスト（ISS風の大きな文字）
-        result_font = pygame.font.SysFont(None, 60)
-        if self.player_score > self.ai_score:
-            result_text = result_font.render("YOU WIN!", True, WHITE)
+        if self.session.player_score > self.session.ai_score:
+            result_text = self.render_text("YOU WIN!", 60, WHITE)
             # ISS風の勝利演出（トロフィーと星）
             self.draw_snes_trophy(SCREEN_WIDTH // 2, panel_y + banner_height + 60)
+            self.mark_dirty((SCREEN_WIDTH // 2 - 112, panel_y + banner_height + 60 - 112, 224, 224))
             
             # 星のエフェクト
-            star_time = pygame.time.get_ticks() / 200
-            for i in range(8):
-                angle = star_time / 10 + i * math.pi / 4
-                distance = 80 + math.sin(star_time / 5 + i) * 20
-                star_x = SCREEN_WIDTH // 2 + math.cos(angle) * distance
-                star_y = panel_y + banner_height + 60 + math.sin(angle) * distance
+            for offset_x, offset_y in self.animation.result_stars():
+                star_x = SCREEN_WIDTH // 2 + offset_x
+                star_y = panel_y + banner_height + 60 + offset_y
                 pygame.draw.polygon(self.screen, YELLOW, [
                     (star_x, star_y - 10),
                     (star_x + 3, star_y - 3),
@@ -1204,10 +1441,10 @@ class PKGame:
                     (star_x - 10, star_y - 3),
                     (star_x - 3, star_y - 3)
                 ])
-        elif self.player_score < self.ai_score:
-            result_text = result_font.render("AI WINS!", True, WHITE)
+        elif self.session.player_score < self.session.ai_score:
+            result_text = self.render_text("AI WINS!", 60, WHITE)
         else:
-            result_text = result_font.render("DRAW", True, WHITE)
+            result_text = self.render_text("DRAW", 60, WHITE)
         
         self.screen.blit(result_text, (SCREEN_WIDTH // 2 - result_text.get_width() // 2, panel_y + banner_height // 2 - result_text.get_height() // 2))
         
@@ -1220,14 +1457,12 @@ class PKGame:
         pygame.draw.rect(self.screen, WHITE, (panel_x + 100, score_y, panel_width - 200, score_height), 2)
         
         # チーム名と得点
-        team_font = pygame.font.SysFont(None, 40)
-        player_text = team_font.render("PLAYER", True, WHITE)
-        vs_text = team_font.render("VS", True, YELLOW)
-        ai_text = team_font.render("AI", True, WHITE)  # CPUからAIに変更
+        player_text = self.render_text("PLAYER", 40, WHITE)
+        vs_text = self.render_text("VS", 40, YELLOW)
+        ai_text = self.render_text("AI", 40, WHITE)  # CPUからAIに変更
         
-        score_font = pygame.font.SysFont(None, 50)
-        player_score_text = score_font.render(str(self.player_score), True, YELLOW)
-        ai_score_text = score_font.render(str(self.ai_score), True, YELLOW)
+        player_score_text = self.render_text(str(self.session.player_score), 50, YELLOW)
+        ai_score_text = self.render_text(str(self.session.ai_score), 50, YELLOW)
         
         # テキスト配置 - 等間隔に配置
         score_box_width = panel_width - 200
@@ -1251,14 +1486,87 @@ class PKGame:
         restart_y = panel_y + panel_height - 60
         
         # 点滅効果
-        blink_rate = (pygame.time.get_ticks() % 800) / 800.0
-        if blink_rate > 0.4:
-            restart_text = self.font.render("PRESS SPACE TO CONTINUE", True, YELLOW)
+        if self.animation.blink(BLINK_CYCLE_MS, BLINK_SWITCH_MS):
+            restart_text = self.render_text("PRESS SPACE TO CONTINUE", 36, YELLOW)
         else:
-            restart_text = self.font.render("PRESS SPACE TO CONTINUE", True, WHITE)
+            restart_text = self.render_text("PRESS SPACE TO CONTINUE", 36, WHITE)
         
         self.screen.blit(restart_text, (SCREEN_WIDTH // 2 - restart_text.get_width() // 2, restart_y))
+        self.mark_dirty((SCREEN_WIDTH // 2 - restart_text.get_width() // 2, restart_y, restart_text.get_width(), restart_text.get_height()))
+
+def surface_array(surface, out=None):
+    # SurfaceをRGBの配列（高さ, 幅, 3、uint8）に写す（outを渡すとその配列に書き込んで使い回す）
+    # pixels3dは画素を直接参照する（幅, 高さ, 3）のビューなので、転置してから1回だけコピーする
+    pixels = pygame.surfarray.pixels3d(surface)
+    try:
+        if out is None:
+            return pixels.transpose(1, 0, 2).copy()
+        out[...] = pixels.transpose(1, 0, 2)
+        return out
+    finally:
+        del pixels  # 参照が残るとSurfaceがロックされたままになる
+
+def parse_size(value):
+    # "1920x1080" 形式のウィンドウサイズ
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("size must be WIDTHxHEIGHT: %s" % value) from None
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("size must be positive: %s" % value)
+    return width, height
 
 if __name__ == "__main__":
-    game = PKGame()
+    parser = argparse.ArgumentParser(description="サッカーPKゲーム")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="変化した領域だけを画面に転送する（高解像度ディスプレイ向け）")
+    parser.add_argument("--ai", choices=sorted(STRATEGIES), default="random",
+                        help="AIの戦略")
+    parser.add_argument("--profile", help="AIの学習状態を保存するファイル（adaptive用）")
+    parser.add_argument("--table", help="pk_search.py --save で書き出した勝率の表（search用、起動時に計算し直さない）")
+    parser.add_argument("--seed", type=parse_seed, help="乱数シード（同じシードと入力なら同じ試合になる）")
+    parser.add_argument("--record", help="入力を記録するリプレイファイル")
+    parser.add_argument("--profiler", action="store_true", help="フレーム時間のオーバーレイを表示する（F3キーで切り替え）")
+    parser.add_argument("--profiler-export", help="終了時に段階ごとの時間のヒストグラムを書き出すファイル（.json/.csv）")
+    parser.add_argument("--ball-curve", choices=CURVES, default="linear",
+                        help="ボールの軌道（linear: 直線、ease: 減速、arc: 山なり）")
+    parser.add_argument("--ball-lift", type=int, default=0, help="arcのときの山の高さ（ピクセル）")
+    parser.add_argument("--ball-swerve", type=int, default=0, help="ボールの横方向のカーブの大きさ（ピクセル）")
+    parser.add_argument("--hz", type=int, default=FPS,
+                        help="表示のフレームレート（%s など、0で可変リフレッシュ。ゲームの速さは変わらない）"
+                             % "/".join(map(str, REFRESH_RATES)))
+    parser.add_argument("--idle", action="store_true",
+                        help="メニューと結果画面では入力か点滅の切り替わりまで描画を止める（待機中の省電力、ボールや観客席の動きは止まる）")
+    parser.add_argument("--size", type=parse_size,
+                        help="ウィンドウの大きさ（例: 1920x1080、描画は800x600で行い拡大表示する）")
+    parser.add_argument("--fullscreen", action="store_true", help="フルスクリーンで表示する")
+    parser.add_argument("--scale", choices=SCALE_MODES, default="nearest",
+                        help="拡大方法（nearest: 整数倍のドット拡大、smooth: なめらかな拡大）")
+    parser.add_argument("--history", help="試合の履歴を記録するSQLiteファイル（pk_history.pyでランキングを表示）")
+    parser.add_argument("--player", default=DEFAULT_PLAYER, help="履歴に記録するプレイヤー名")
+    parser.add_argument("--rounds", type=parse_rounds, default=ROUNDS, help="1試合のラウンド数")
+    parser.add_argument("--sudden-death", action="store_true",
+                        help="規定のラウンドで同点ならサドンデス（1ラウンドずつ決着がつくまで）")
+    args = parser.parse_args()
+    
+    if args.table:
+        # 読み込んだ表をそのまま使う（既定の表は計算しない）
+        if args.ai != "search":
+            parser.error("--table requires --ai search")
+        table = SearchTable.load(args.table)
+        if not table.matches(args.rounds, sudden_death=args.sudden_death):
+            parser.error("table was built for different rules (%d rounds%s, goal chances %s)" % (
+                table.rounds, " with sudden death" if table.sudden_death else "",
+                sorted({chance for row in table.matrix for chance in row})))
+        ai = SearchStrategy(table)
+    else:
+        ai = create_strategy(args.ai)
+    
+    game = PKGame(dirty_rects=args.dirty_rects, ai=ai, profile_path=args.profile,
+                  seed=args.seed, record_path=args.record,
+                  profiler=args.profiler, profiler_export=args.profiler_export,
+                  window_size=args.size, fullscreen=args.fullscreen, scale_mode=args.scale,
+                  ball_curve=args.ball_curve, ball_lift=args.ball_lift, ball_swerve=args.ball_swerve,
+                  hz=args.hz, idle=args.idle, rounds=args.rounds, sudden_death=args.sudden_death,
+                  history_path=args.history, player_name=args.player)
     game.run()
\ No newline at end of file
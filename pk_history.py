@@ -0,0 +1,291 @@
+import argparse
+import os
+import pathlib
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from pk_engine import NUM_AREAS, PLAYER_SIDE
+
+# 試合の履歴の保存（SQLite、pygameに依存しない）
+# 試合が終わるとキックごとの選択・三角飛び・結果を1件の記録にまとめてキューに積むだけで、
+# ディスクへの書き込みは別スレッドが複数の試合をまとめて1トランザクションで行う（描画のループは待たない）
+# 通算成績（standings）も同じトランザクションで足し込んでおき、ランキングは索引の先頭から読むだけにする
+
+BATCH_SIZE = 256             # 1トランザクションでまとめて書く試合数の上限
+FLUSH_INTERVAL = 1.0         # 試合が少ないときに書き込むまで待つ最大の秒数
+DEFAULT_PLAYER = "PLAYER"    # --playerを指定しないときのプレイヤー名
+LEADERBOARD_SIZE = 10
+LEADERBOARD_MIN_MATCHES = 1  # ランキングに載るのに必要な試合数
+
+OUTCOME_WIN = 1
+OUTCOME_DRAW = 0
+OUTCOME_LOSS = -1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    opponent TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    rounds INTEGER NOT NULL,
+    sudden_death INTEGER NOT NULL,
+    player_score INTEGER NOT NULL,
+    ai_score INTEGER NOT NULL,
+    outcome INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kicks (
+    match_id INTEGER NOT NULL REFERENCES matches(id),
+    kick INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    side INTEGER NOT NULL,
+    kick_area INTEGER NOT NULL,
+    save_area INTEGER NOT NULL,
+    super_save INTEGER NOT NULL,
+    scored INTEGER NOT NULL,
+    PRIMARY KEY (match_id, kick)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS standings (
+    player_id INTEGER PRIMARY KEY REFERENCES players(id),
+    played INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    goals_for INTEGER NOT NULL,
+    goals_against INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_by_player ON matches (player_id, finished_at);
+CREATE INDEX IF NOT EXISTS standings_by_rank ON standings (wins DESC, played);
+"""
+
+def connect(path):
+    # WALにしておくと、書き込み中でもランキングの読み出しを待たせない
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+def connect_readonly(path):
+    # 表示用に読み出し専用で開く（パスを間違えても空のデータベースを作らない）
+    return sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+
+def match_outcome(player_score, ai_score):
+    if player_score > ai_score:
+        return OUTCOME_WIN
+    return OUTCOME_DRAW if player_score == ai_score else OUTCOME_LOSS
+
+class HistoryWriter:
+    # キューに積まれた試合の記録を、別スレッドでまとめて書き込む
+    # 記録は (プレイヤー名, 相手, 開始時刻, 終了時刻, ラウンド数, サドンデス, プレイヤー得点, AI得点, キックのリスト)
+    def __init__(self, path, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()
+        self.written = 0
+        self.batches = 0
+        self.error = None  # 最初の書き込みエラー（以降の記録は捨てる）
+        connect(path).close()  # テーブルの作成やファイルの誤りはここで気づけるようにする
+        self.thread = threading.Thread(target=self.run, name="pk-history", daemon=True)
+        self.thread.start()
+
+    def put(self, record):
+        # 描画のループから呼ばれる（キューに積むだけで待たない）
+        if self.error is None:
+            self.queue.put(record)
+
+    def close(self):
+        # 残りを書き切ってからスレッドを止める（書き込みのエラーは起きた時点で警告済み）
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        connection = connect(self.path)
+        player_ids = {}
+        try:
+            while True:
+                record = self.queue.get()
+                if record is None:
+                    break
+                batch = [record]
+                stop = self.collect(batch)
+                self.write(connection, player_ids, batch)
+                if stop:
+                    break
+        except sqlite3.Error as e:
+            # ゲームは止めずに、以降の履歴の記録だけをやめる
+            self.error = e
+            print("warning: match history is no longer recorded to %s: %s" % (self.path, e), file=sys.stderr)
+        finally:
+            connection.close()
+
+    def collect(self, batch):
+        # 最初の1件からflush_intervalの間に届いた記録をbatch_sizeまでまとめる（終了の合図ならTrue）
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                record = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                return False
+            if record is None:
+                return True
+            batch.append(record)
+        return False
+
+    def write(self, connection, player_ids, batch):
+        with connection:
+            kicks = []
+            standings = {}  # プレイヤーID -> このバッチでの [試合, 勝ち, 引き分け, 負け, 得点, 失点]
+            for name, opponent, started_at, finished_at, rounds, sudden_death, player_score, ai_score, match_kicks in batch:
+                player_id = player_ids.get(name)
+                if player_id is None:
+                    connection.execute("INSERT OR IGNORE INTO players (name) VALUES (?)", (name,))
+                    player_id = connection.execute("SELECT id FROM players WHERE name = ?", (name,)).fetchone()[0]
+                    player_ids[name] = player_id
+                outcome = match_outcome(player_score, ai_score)
+                match_id = connection.execute(
+                    "INSERT INTO matches (player_id, opponent, started_at, finished_at, rounds, sudden_death,"
+                    " player_score, ai_score, outcome) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (player_id, opponent, started_at, finished_at, rounds, sudden_death,
+                     player_score, ai_score, outcome)).lastrowid
+                kicks.extend((match_id, index) + kick for index, kick in enumerate(match_kicks))
+                row = standings.setdefault(player_id, [0, 0, 0, 0, 0, 0])
+                row[0] += 1
+                row[1 if outcome == OUTCOME_WIN else 2 if outcome == OUTCOME_DRAW else 3] += 1
+                row[4] += player_score
+                row[5] += ai_score
+            connection.executemany("INSERT INTO kicks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", kicks)
+            connection.executemany(
+                "INSERT INTO standings VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (player_id) DO UPDATE SET"
+                " played = played + excluded.played, wins = wins + excluded.wins,"
+                " draws = draws + excluded.draws, losses = losses + excluded.losses,"
+                " goals_for = goals_for + excluded.goals_for, goals_against = goals_against + excluded.goals_against",
+                [(player_id,) + tuple(row) for player_id, row in standings.items()])
+        self.written += len(batch)
+        self.batches += 1
+
+class MatchHistory:
+    # MatchEngineのobserversに登録して、試合の経過を記録にまとめる
+    def __init__(self, writer, player=DEFAULT_PLAYER):
+        self.writer = writer
+        self.player = player
+        self.started_at = None
+        self.kicks = []  # (ラウンド, 蹴った側, キックのエリア, セーブのエリア, 三角飛び, ゴール)
+
+    def match_started(self, engine):
+        self.started_at = time.time()
+        self.kicks = []
+
+    def kick_finished(self, engine, side, kick_area, save_area, super_save, scored):
+        self.kicks.append((engine.session.round, side, kick_area.value, save_area.value, int(super_save), int(scored)))
+
+    def match_finished(self, engine):
+        session = engine.session
+        if self.started_at is None:
+            return  # 途中から記録を始めた試合は残さない
+        self.writer.put((self.player, engine.ai.name, self.started_at, time.time(), session.rounds,
+                         int(session.sudden_death), session.player_score, session.ai_score, self.kicks))
+        self.started_at = None
+        self.kicks = []
+
+def leaderboard(connection, limit=LEADERBOARD_SIZE, min_matches=LEADERBOARD_MIN_MATCHES):
+    # 勝ち数の多い順（同じなら試合数の少ない順、得失点差の順）。standings_by_rankの索引を先頭から読む
+    return connection.execute(
+        "SELECT players.name, played, wins, draws, losses, goals_for, goals_against"
+        " FROM standings JOIN players ON players.id = standings.player_id"
+        " WHERE played >= ?"
+        " ORDER BY wins DESC, played, goals_for - goals_against DESC, players.name"
+        " LIMIT ?", (min_matches, limit)).fetchall()
+
+def player_stats(connection, name):
+    # プレイヤーの通算成績とエリアごとのキック・セーブの傾向（該当しなければNone）
+    row = connection.execute("SELECT id FROM players WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        return None
+    player_id = row[0]
+    played, wins, draws, losses, goals_for, goals_against = connection.execute(
+        "SELECT played, wins, draws, losses, goals_for, goals_against FROM standings WHERE player_id = ?",
+        (player_id,)).fetchone()
+    last_played = connection.execute(
+        "SELECT MAX(finished_at) FROM matches WHERE player_id = ?", (player_id,)).fetchone()[0]
+
+    # キックはmatch_idの主キーで引く（試合はmatches_by_playerの索引で絞る）
+    kicks = [[0, 0] for _ in range(NUM_AREAS)]   # エリアごとの [蹴った数, ゴール数]
+    saves = [[0, 0] for _ in range(NUM_AREAS)]   # エリアごとの [飛んだ数, セーブ数]
+    super_saves = 0
+    for side, kick_area, save_area, super_save, scored in connection.execute(
+            "SELECT side, kick_area, save_area, super_save, scored FROM kicks"
+            " WHERE match_id IN (SELECT id FROM matches WHERE player_id = ?)", (player_id,)):
+        if side == PLAYER_SIDE:
+            kicks[kick_area][0] += 1
+            kicks[kick_area][1] += scored
+        else:
+            saves[save_area][0] += 1
+            saves[save_area][1] += 1 - scored
+            super_saves += super_save
+    return {
+        "name": name,
+        "played": played, "wins": wins, "draws": draws, "losses": losses,
+        "goals_for": goals_for, "goals_against": goals_against,
+        "last_played": last_played,
+        "kicks": kicks, "saves": saves, "super_saves": super_saves,
+    }
+
+def format_leaderboard(rows):
+    lines = ["%-4s %-16s %7s %6s %6s %6s %6s %8s" % (
+        "rank", "player", "played", "won", "drawn", "lost", "for", "against")]
+    for rank, (name, played, wins, draws, losses, goals_for, goals_against) in enumerate(rows, 1):
+        lines.append("%-4d %-16s %7d %6d %6d %6d %6d %8d" % (
+            rank, name, played, wins, draws, losses, goals_for, goals_against))
+    return "\n".join(lines)
+
+def format_player(stats):
+    lines = [
+        "%s: played %d  won %d  drawn %d  lost %d  goals %d-%d" % (
+            stats["name"], stats["played"], stats["wins"], stats["draws"], stats["losses"],
+            stats["goals_for"], stats["goals_against"]),
+        "last played: %s" % time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stats["last_played"])),
+        "",
+        "%-6s %14s %14s" % ("area", "kicks (goals)", "dives (saves)"),
+    ]
+    for area in range(NUM_AREAS):
+        lines.append("%-6d %14s %14s" % (area + 1, "%d (%d)" % tuple(stats["kicks"][area]),
+                                         "%d (%d)" % tuple(stats["saves"][area])))
+    lines.append("super saves: %d" % stats["super_saves"])
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="試合の履歴からランキングとプレイヤーの成績を表示する")
+    parser.add_argument("path", help="履歴のデータベース（pk_game.py --historyで記録したもの）")
+    parser.add_argument("--player", help="このプレイヤーの成績を表示する（省略するとランキング）")
+    parser.add_argument("--limit", type=int, default=LEADERBOARD_SIZE, help="ランキングに表示する人数")
+    parser.add_argument("--min-matches", type=int, default=LEADERBOARD_MIN_MATCHES, help="ランキングに載る最少の試合数")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        parser.error("no such history database: %s" % args.path)
+    connection = connect_readonly(args.path)
+    try:
+        if args.player:
+            stats = player_stats(connection, args.player)
+            if stats is None:
+                parser.error("no matches for %s" % args.player)
+            print(format_player(stats))
+        else:
+            print(format_leaderboard(leaderboard(connection, args.limit, args.min_matches)))
+    except sqlite3.Error as e:
+        parser.error("cannot read history from %s: %s" % (args.path, e))
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    main()
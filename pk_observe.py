@@ -0,0 +1,245 @@
+import argparse
+import os
+import random
+import time
+
+import pygame
+
+from pk_engine import Action, GameState, MatchEngine
+from pk_game import (BALL_ANCHOR, CHARACTER_ANCHOR, GOAL_HEIGHT, GOAL_WIDTH, GOAL_Y, GREEN, KEEPER_RED,
+                     PLAYER_BLUE, RED, SCORE_MARK_WIDTH, SCORE_ROW_HEIGHT, SCREEN_HEIGHT, SCREEN_WIDTH, WHITE,
+                     YELLOW, PKGame, parse_size, surface_array)
+
+# 低解像度の観測画像（800x600で描いてから縮小せず、縮小済みのレイヤーを直接組み立てる）
+# 試合中の画面は「背景（フィールド、ゴール、パネル、立ち位置の決まったキャラクター）」を
+# ビューごとに一度だけ論理解像度で描いて縮小しておき、毎フレームはカーソル・キャラクター・ボール・
+# 結果マーク・メッセージを縮小済みのスプライトで重ねるだけにする
+# メーターや点滅などの時刻だけで変わる演出は観測に含めない（同じ状態なら同じ画像になる）
+# メニューと結果画面はめったに出ないので、論理解像度で描いてから縮小する
+
+OBSERVATION_SIZE = (84, 84)  # 既定の観測画像の大きさ（幅, 高さ）
+
+# ビューごとの背景に描く文字（pk_gameの各ビューと同じ）
+TURN_LABELS = {
+    GameState.PLAYER_KICKING: "YOUR TURN - KICKER",
+    GameState.AI_GOALKEEPING: "YOUR SHOT - AI KEEPER",
+    GameState.PLAYER_GOALKEEPING: "YOUR TURN - KEEPER",
+    GameState.AI_KICKING: "AI SHOT - YOUR SAVE",
+}
+INSTRUCTIONS = {
+    GameState.PLAYER_KICKING: "Use arrow keys to aim, SPACE to shoot",
+    GameState.PLAYER_GOALKEEPING: "Use arrow keys to choose dive direction, SPACE to confirm",
+}
+
+# 点滅する要素は点灯している側の色で描く
+MESSAGE_COLOR = YELLOW       # 結果メッセージの文字色
+SANKAKU_COLOR = RED          # 三角飛びメッセージの文字色
+
+class ObservationRenderer:
+    # game（PKGame）の描画キャッシュを使って、size（幅, 高さ）の観測画像を描く
+    def __init__(self, game, size=OBSERVATION_SIZE):
+        self.game = game
+        self.size = size
+        self.scale_x = size[0] / SCREEN_WIDTH
+        self.scale_y = size[1] / SCREEN_HEIGHT
+        self.surface = pygame.Surface(size).convert()
+        self.line_width = max(1, round(2 * min(self.scale_x, self.scale_y)))   # 2ピクセルの線の縮小後の太さ
+        self.dot_radius = max(1, round(2 * min(self.scale_x, self.scale_y)))   # 軌跡の点の縮小後の半径
+
+        # ゴールの9エリア（論理解像度の座標）
+        area_width = GOAL_WIDTH // 3
+        area_height = GOAL_HEIGHT // 3
+        goal_x = SCREEN_WIDTH // 2 - GOAL_WIDTH // 2
+        self.area_rects = [pygame.Rect(goal_x + (area % 3) * area_width, GOAL_Y + (area // 3) * area_height,
+                                       area_width, area_height) for area in range(9)]
+
+        # 縮小済みのレイヤー
+        self.backgrounds = {state: self.build_background(state) for state in TURN_LABELS}
+        self.characters = {key: self.scale_surface(game.sprite_atlas.subsurface(rect))
+                           for key, rect in game.character_rects.items()}
+        self.ball = self.scale_surface(game.sprite_atlas.subsurface(game.ball_rect))
+        self.marks = (self.scale_surface(game.render_text("X", 28, RED)),
+                      self.scale_surface(game.render_text("O", 28, GREEN)))
+        self.sankaku = self.build_overlay(lambda: game.draw_sankaku_tobi(SANKAKU_COLOR))
+        self.messages = {}  # 結果メッセージ -> 縮小済みのメッセージボックス
+
+    def point(self, x, y):
+        # 論理解像度の座標を観測画像の座標にする
+        return int(x * self.scale_x), int(y * self.scale_y)
+
+    def scale_surface(self, surface):
+        width, height = surface.get_size()
+        size = (max(1, round(width * self.scale_x)), max(1, round(height * self.scale_y)))
+        return pygame.transform.smoothscale(surface, size)
+
+    def draw_offscreen(self, surface, draw):
+        # ゲームの描画関数をsurfaceに向けて呼ぶ（ダーティ矩形の記録は残さない）
+        game = self.game
+        screen, dirty_rects = game.screen, game.dirty_rects
+        game.screen, game.dirty_rects = surface, False
+        try:
+            return draw()
+        finally:
+            game.screen, game.dirty_rects = screen, dirty_rects
+
+    def build_background(self, state):
+        game = self.game
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+
+        def draw():
+            # 観客席はちらつかせない
+            background, _ = game.get_field_layers((SCREEN_WIDTH, SCREEN_HEIGHT))
+            surface.blit(background, (0, 0))
+            game.draw_goal(SCREEN_WIDTH // 2 - GOAL_WIDTH // 2, GOAL_Y, GOAL_WIDTH, GOAL_HEIGHT)
+            game.draw_turn_panel(TURN_LABELS[state])
+            game.draw_team_labels()
+            if state in INSTRUCTIONS:
+                game.draw_command_window(INSTRUCTIONS[state])
+            if state == GameState.PLAYER_KICKING:
+                game.draw_kicker_setup()
+            elif state == GameState.PLAYER_GOALKEEPING:
+                game.draw_keeper_setup()
+            return game.draw_scoreboard_panel()
+
+        self.marks_x, self.visible_rounds = self.draw_offscreen(surface, draw)
+        return pygame.transform.smoothscale(surface, self.size)
+
+    def build_overlay(self, draw):
+        # 透明な画面に描いて縮小し、描かれた部分だけを (スプライト, 位置) で返す
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.draw_offscreen(surface, draw)
+        scaled = pygame.transform.smoothscale(surface, self.size)
+        bounds = scaled.get_bounding_rect()
+        return scaled.subsurface(bounds).copy(), bounds.topleft
+
+    def render(self, session=None, alpha=0.0):
+        # sessionの状態を観測画像に描いてSurfaceを返す（省略するとゲームの現在の状態）
+        if session is None:
+            session = self.game.session
+        state = session.state
+        surface = self.surface
+        if state not in self.backgrounds:
+            pygame.transform.smoothscale(self.game.render_state(session, alpha), self.size, surface)
+            return surface
+
+        surface.blit(self.backgrounds[state], (0, 0))
+        if state == GameState.PLAYER_KICKING:
+            self.draw_cursor(session.selected_area.value, frame=True)
+        elif state == GameState.PLAYER_GOALKEEPING:
+            self.draw_cursor(session.selected_area.value)
+        elif state == GameState.AI_GOALKEEPING:
+            if session.show_sankaku_tobi:
+                surface.blit(*self.sankaku)
+            self.draw_character(self.area_rects[session.ai_selected_area.value].center, KEEPER_RED)
+            self.draw_ball(self.game.kick_path, session.selected_area.value, session, alpha)
+        else:
+            if session.show_sankaku_tobi:
+                surface.blit(*self.sankaku)
+            save = self.area_rects[session.selected_area.value].center
+            pygame.draw.circle(surface, YELLOW, self.point(*save),
+                               max(1, round(20 * min(self.scale_x, self.scale_y))), self.line_width)
+            self.draw_character(save, PLAYER_BLUE)
+            if session.animation_timer > 20:
+                for point in self.game.dive_trails[session.selected_area.value][0]:
+                    pygame.draw.circle(surface, WHITE, self.point(*point), self.dot_radius)
+            self.draw_ball(self.game.shot_path, session.ai_selected_area.value, session, alpha)
+
+        self.draw_marks(session)
+        if session.result_message:
+            self.draw_message(session.result_message)
+        return surface
+
+    def array(self, session=None, alpha=0.0, out=None):
+        # 観測画像をRGBの配列（高さ, 幅, 3）で返す
+        return surface_array(self.render(session, alpha), out)
+
+    def draw_cursor(self, area, frame=False):
+        # 選択中のエリアの十字線（frame=Trueならエリアの枠も）
+        rect = self.area_rects[area]
+        x, y = rect.center
+        pygame.draw.line(self.surface, YELLOW, self.point(x - 20, y), self.point(x + 20, y), self.line_width)
+        pygame.draw.line(self.surface, YELLOW, self.point(x, y - 20), self.point(x, y + 20), self.line_width)
+        if frame:
+            left, top = self.point(*rect.topleft)
+            right, bottom = self.point(*rect.bottomright)
+            pygame.draw.rect(self.surface, YELLOW, (left, top, right - left, bottom - top), self.line_width)
+
+    def draw_character(self, position, color):
+        x, y = position
+        self.surface.blit(self.characters[(color, True)],
+                          self.point(x - CHARACTER_ANCHOR[0], y - CHARACTER_ANCHOR[1]))
+
+    def draw_ball(self, path, area, session, alpha):
+        position, trail, _ = path.lookup(area, session.animation_timer, alpha)
+        for point in trail:
+            pygame.draw.circle(self.surface, WHITE, self.point(*point), self.dot_radius)
+        x, y = position
+        self.surface.blit(self.ball, self.point(x - BALL_ANCHOR[0], y - BALL_ANCHOR[1]))
+
+    def draw_marks(self, session):
+        # スコアボードの結果マーク（直近のラウンドだけ、pk_gameのスコアボードと同じ並び）
+        first = max(0, session.rounds_played - self.visible_rounds)
+        for round_index in range(first, min(session.rounds_played, first + self.visible_rounds)):
+            x = self.marks_x + (round_index - first) * SCORE_MARK_WIDTH
+            for side in (0, 1):
+                result = session.result(side, round_index)
+                if result is not None:
+                    self.surface.blit(self.marks[result], self.point(x, 15 + side * SCORE_ROW_HEIGHT))
+
+    def draw_message(self, message):
+        overlay = self.messages.get(message)
+        if overlay is None:
+            overlay = self.messages[message] = self.build_overlay(
+                lambda: self.game.draw_result_message(message, MESSAGE_COLOR))
+        self.surface.blit(*overlay)
+
+def play_frames(engine, rng, frames):
+    # ランダムに操作しながらエンジンを進め、1tickごとに状態を返す（ベンチマーク用）
+    for _ in range(frames):
+        state = engine.session.state
+        if state in (GameState.MENU, GameState.RESULT):
+            engine.apply(Action.CONFIRM)
+        elif not engine.is_animating and rng.random() < 0.1:
+            engine.apply(rng.choice((Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT, Action.CONFIRM)))
+        engine.step()
+        yield engine.session
+
+def main():
+    parser = argparse.ArgumentParser(description="低解像度の観測画像（RGB配列）の描画速度を計測する")
+    parser.add_argument("--size", type=parse_size, default=OBSERVATION_SIZE, help="観測画像の大きさ（例: 84x84, 160x120）")
+    parser.add_argument("-n", "--frames", type=int, default=20000, help="描画するフレーム数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--compare", action="store_true", help="800x600で描いてから縮小する方法も計測する")
+    parser.add_argument("--save", help="最後の観測画像を書き出すPNGファイル")
+    args = parser.parse_args()
+
+    # ベンチマークはディスプレイのない環境でも動くように、ダミーのドライバーで描く
+    # （ライブラリとして使うときは呼び出し側のドライバーを変えない）
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    game = PKGame(seed=args.seed, offscreen=True)
+    start = time.perf_counter()
+    renderer = ObservationRenderer(game, args.size)
+    print("size: %dx%d  setup: %.1fms" % (args.size + ((time.perf_counter() - start) * 1000,)))
+
+    methods = [("cached layers", lambda session, out: renderer.array(session, out=out))]
+    if args.compare:
+        scaled = pygame.Surface(args.size).convert()
+        methods.append(("full render + scale", lambda session, out: surface_array(
+            pygame.transform.smoothscale(game.render_state(session), args.size, scaled), out)))
+
+    for name, render in methods:
+        engine = MatchEngine(seed=args.seed)
+        out = None
+        start = time.perf_counter()
+        for session in play_frames(engine, random.Random(args.seed), args.frames):
+            out = render(session, out)
+        elapsed = time.perf_counter() - start
+        print("%-20s frames: %d  elapsed: %.2fs  fps: %.0f" % (name, args.frames, elapsed, args.frames / elapsed))
+
+    if args.save:
+        pygame.image.save(renderer.surface, args.save)
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import csv
+import json
+import time
+from bisect import bisect_left
+from collections import deque
+
+import pygame
+
+# フレーム時間の計測（描画・更新の各段階の時間を集計し、画面上にグラフを重ねて表示する）
+# 計測はインスタンスのメソッドを差し替えて行うので、無効なときは元のメソッドがそのまま呼ばれる
+
+# 計測する段階（PKGameのメソッド名）
+PROFILE_STAGES = (
+    "update", "draw_field", "draw_goal", "draw_iss_character", "draw_iss_ball", "draw_scoreboard",
+)
+FRAME_STAGE = "frame"        # 1フレーム全体（イベント処理から画面転送まで）
+FRAME_BUDGET_MS = 1000 / 60  # 60FPSで1フレームに使える時間
+PROFILE_HISTORY = 240        # グラフに表示するフレーム数
+HISTOGRAM_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, FRAME_BUDGET_MS, 33.3, 66.7)  # 上限値（ms）
+
+# オーバーレイの設定
+OVERLAY_ROW_HEIGHT = 22
+OVERLAY_GRAPH_WIDTH = PROFILE_HISTORY
+OVERLAY_LABEL_WIDTH = 220
+OVERLAY_BACKGROUND = (0, 0, 0, 170)
+OVERLAY_BUDGET_COLOR = (248, 216, 32)
+OVERLAY_GRAPH_COLOR = (96, 232, 96)
+OVERLAY_OVER_BUDGET_COLOR = (232, 32, 32)
+
+class StageStats:
+    def __init__(self, history):
+        self.history = deque([0.0] * history, maxlen=history)  # 直近フレームの時間（ms）
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)   # フレームごとの時間の分布
+        self.frame_total = 0.0   # 現在のフレームでの合計時間（秒）
+        self.total = 0.0         # 全体の合計時間（秒）
+        self.calls = 0
+        self.frames = 0
+        self.max_ms = 0.0
+
+    def commit_frame(self):
+        ms = self.frame_total * 1000
+        self.frame_total = 0.0
+        self.history.append(ms)
+        self.histogram[bisect_left(HISTOGRAM_BUCKETS_MS, ms)] += 1
+        self.frames += 1
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+class FrameProfiler:
+    def __init__(self, stages=PROFILE_STAGES, history=PROFILE_HISTORY):
+        self.stages = tuple(stages)
+        self.stats = {stage: StageStats(history) for stage in self.stages + (FRAME_STAGE,)}
+        self.frame_start = None
+        self.overlay = None  # オーバーレイの背景（一度だけ作る）
+
+    def attach(self, game):
+        # ゲームの各段階のメソッドを計測用のラッパーに差し替える
+        for stage in self.stages:
+            method = getattr(type(game), stage).__get__(game)
+            setattr(game, stage, self.wrap(self.stats[stage], method))
+
+    def detach(self, game):
+        # インスタンスに置いたラッパーを消して、クラスのメソッドに戻す
+        for stage in self.stages:
+            game.__dict__.pop(stage, None)
+
+    def wrap(self, stats, method):
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                stats.frame_total += elapsed
+                stats.total += elapsed
+                stats.calls += 1
+        return timed
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        # フレームごとの時間を履歴とヒストグラムに反映する
+        if self.frame_start is not None:
+            elapsed = time.perf_counter() - self.frame_start
+            frame = self.stats[FRAME_STAGE]
+            frame.frame_total = elapsed
+            frame.total += elapsed
+            frame.calls += 1
+            self.frame_start = None
+        for stats in self.stats.values():
+            stats.commit_frame()
+
+    def draw_overlay(self, surface, font):
+        # 各段階の直近の時間をグラフで表示する（縦軸は1フレームの予算）
+        rows = self.stages + (FRAME_STAGE,)
+        width = OVERLAY_LABEL_WIDTH + OVERLAY_GRAPH_WIDTH + 10
+        height = OVERLAY_ROW_HEIGHT * len(rows) + 10
+        if self.overlay is None:
+            self.overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.overlay.fill(OVERLAY_BACKGROUND)
+
+        for row, stage in enumerate(rows):
+            stats = self.stats[stage]
+            top = 5 + row * OVERLAY_ROW_HEIGHT
+            bottom = top + OVERLAY_ROW_HEIGHT - 4
+            average = sum(stats.history) / len(stats.history)
+            label = font.render(stage, True, (255, 255, 255))
+            value = font.render("%.2f ms" % average, True, (255, 255, 255))
+            text_y = top + (OVERLAY_ROW_HEIGHT - label.get_height()) // 2
+            self.overlay.blit(label, (5, text_y))
+            self.overlay.blit(value, (OVERLAY_LABEL_WIDTH - 8 - value.get_width(), text_y))
+
+            # 予算ライン（この段階が1フレームを使い切る高さ）
+            left = OVERLAY_LABEL_WIDTH
+            pygame.draw.line(self.overlay, OVERLAY_BUDGET_COLOR, (left, top), (left + OVERLAY_GRAPH_WIDTH, top))
+            scale = (bottom - top) / FRAME_BUDGET_MS
+            for x, ms in enumerate(stats.history):
+                color = OVERLAY_OVER_BUDGET_COLOR if ms > FRAME_BUDGET_MS else OVERLAY_GRAPH_COLOR
+                bar = min(bottom - top, int(ms * scale))
+                if bar > 0:
+                    pygame.draw.line(self.overlay, color, (left + x, bottom), (left + x, bottom - bar))
+
+        position = (surface.get_width() - width - 10, surface.get_height() - height - 10)
+        surface.blit(self.overlay, position)
+        return pygame.Rect(position, (width, height))
+
+    def summary(self):
+        # 段階ごとの集計とヒストグラム
+        result = {}
+        for stage, stats in self.stats.items():
+            bounds = list(HISTOGRAM_BUCKETS_MS) + [None]
+            result[stage] = {
+                "frames": stats.frames,
+                "calls": stats.calls,
+                "total_ms": stats.total * 1000,
+                "mean_ms_per_frame": stats.total * 1000 / stats.frames if stats.frames else 0.0,
+                "max_ms": stats.max_ms,
+                "histogram": [{"le_ms": bound, "count": count} for bound, count in zip(bounds, stats.histogram)],
+            }
+        return result
+
+    def export(self, path):
+        # 拡張子が .csv ならCSV、それ以外はJSONで書き出す
+        summary = self.summary()
+        if path.endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["stage", "le_ms", "count"])
+                for stage, row in summary.items():
+                    for bucket in row["histogram"]:
+                        writer.writerow([stage, "inf" if bucket["le_ms"] is None else bucket["le_ms"], bucket["count"]])
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
@@ -0,0 +1,165 @@
+import argparse
+import glob
+import json
+import struct
+import sys
+import time
+
+from pk_ai import create_strategy
+from pk_engine import ROUNDS, Action, MatchEngine
+
+# 試合の記録と再生（乱数シードとフレームごとの入力だけを記録し、エンジンで決定的に再現する）
+
+REPLAY_MAGIC = b"PKR1"
+REPLAY_VERSION = 2                   # 2: ヘッダーの後に試合のルールを追加（1は5ラウンドを最後まで蹴る）
+HEADER = struct.Struct("<4sBQHI")    # マジック, バージョン, シード, 戦略名の長さ, 学習状態の長さ
+RULES = struct.Struct("<HB")         # ラウンド数, フラグ
+RULE_SUDDEN_DEATH = 1                # フラグ: サドンデス
+RULE_PLAY_OUT = 2                    # フラグ: 勝敗が決まっても規定のラウンド数まで蹴る
+RECORD = struct.Struct("<HB")        # 前の入力からのフレーム差分, 操作
+FOOTER = struct.Struct("<IHHI")      # 総フレーム数, プレイヤー得点, AI得点, 最終状態の要約値
+MAX_DELTA = 0xFFFF                   # 1レコードで表せるフレーム差分の上限
+MAX_SEED = 2 ** 64 - 1               # 記録できるシードの上限（ヘッダーの符号なし64ビット）
+
+class ReplayError(Exception):
+    pass
+
+def parse_seed(value):
+    # コマンドラインの --seed（リプレイのヘッダーに書ける 0〜MAX_SEED の整数）
+    try:
+        seed = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("seed must be an integer: %s" % value) from None
+    if not 0 <= seed <= MAX_SEED:
+        raise argparse.ArgumentTypeError("seed must be between 0 and %d: %s" % (MAX_SEED, value))
+    return seed
+
+class MatchRecorder:
+    def __init__(self, path, seed, ai, engine):
+        # 書き出せないシードは試合の終わりではなく記録の開始時に弾く
+        if not 0 <= seed <= MAX_SEED:
+            raise ValueError("seed must be between 0 and %d to be recorded: %d" % (MAX_SEED, seed))
+        self.path = path
+        self.seed = seed
+        self.ai_name = ai.name
+        session = engine.session
+        self.rules = (session.rounds, (RULE_SUDDEN_DEATH if session.sudden_death else 0)
+                      | (RULE_PLAY_OUT if engine.play_out else 0))
+        # 記録開始時の学習状態（再生時の判断を一致させるため、この時点の内容で固定する）
+        state = ai.get_state()
+        self.ai_state = json.dumps(state).encode() if state is not None else b""
+        self.records = bytearray()
+        self.last_frame = 0
+
+    def record(self, frame, action):
+        # 入力をフレーム差分つきで追記する（差分が大きいときは空の操作で埋める）
+        delta = frame - self.last_frame
+        while delta > MAX_DELTA:
+            self.records += RECORD.pack(MAX_DELTA, Action.NONE)
+            delta -= MAX_DELTA
+        self.records += RECORD.pack(delta, action)
+        self.last_frame = frame
+
+    def close(self, frames, engine):
+        # 最後にまとめてファイルへ書き出す
+        name = self.ai_name.encode()
+        state = self.ai_state
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, len(name), len(state)))
+            f.write(RULES.pack(*self.rules))
+            f.write(name)
+            f.write(state)
+            f.write(self.records)
+            f.write(FOOTER.pack(frames, engine.session.player_score, engine.session.ai_score, engine.fingerprint()))
+
+class Replay:
+    def __init__(self, seed, rules, ai_name, ai_state, records, frames, player_score, ai_score, fingerprint):
+        self.seed = seed
+        self.rounds, flags = rules
+        self.sudden_death = bool(flags & RULE_SUDDEN_DEATH)
+        self.play_out = bool(flags & RULE_PLAY_OUT)
+        self.ai_name = ai_name
+        self.ai_state = ai_state
+        self.records = records        # (フレーム差分, 操作) のタプルの列
+        self.frames = frames
+        self.player_score = player_score
+        self.ai_score = ai_score
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size + FOOTER.size:
+            raise ReplayError("%s: file is too short" % path)
+        magic, version, seed, name_length, state_length = HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version not in (1, REPLAY_VERSION):
+            raise ReplayError("%s: not a replay file" % path)
+        offset = HEADER.size
+        if version == 1:
+            rules = (ROUNDS, RULE_PLAY_OUT)
+        else:
+            rules = RULES.unpack_from(data, offset)
+            offset += RULES.size
+        ai_name = data[offset:offset + name_length].decode()
+        offset += name_length
+        ai_state = json.loads(data[offset:offset + state_length]) if state_length else None
+        offset += state_length
+        body = data[offset:len(data) - FOOTER.size]
+        if len(body) % RECORD.size:
+            raise ReplayError("%s: truncated input records" % path)
+        records = list(RECORD.iter_unpack(body))
+        return cls(seed, rules, ai_name, ai_state, records, *FOOTER.unpack_from(data, len(data) - FOOTER.size))
+
+    def new_engine(self):
+        ai = create_strategy(self.ai_name)
+        if self.ai_state is not None:
+            ai.set_state(self.ai_state)
+        return MatchEngine(seed=self.seed, ai=ai, rounds=self.rounds,
+                           sudden_death=self.sudden_death, play_out=self.play_out)
+
+    def play(self):
+        # 描画なしで最後まで再生する（入力のないフレームはまとめて進める）
+        engine = self.new_engine()
+        frame = 0
+        for delta, action in self.records:
+            engine.advance(delta)
+            frame += delta
+            if action != Action.NONE:
+                engine.apply(Action(action))
+        engine.advance(self.frames - frame)
+        return engine
+
+    def verify(self):
+        # 再生結果が記録時の最終状態と一致するか
+        engine = self.play()
+        return (engine.session.player_score == self.player_score and engine.session.ai_score == self.ai_score
+                and engine.fingerprint() == self.fingerprint)
+
+def main():
+    parser = argparse.ArgumentParser(description="記録した試合を描画なしで再生し、記録時と同じ結果になるか確認する")
+    parser.add_argument("paths", nargs="+", help="リプレイファイル（ワイルドカード可）")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不一致のファイルだけを表示する")
+    args = parser.parse_args()
+
+    paths = [path for pattern in args.paths for path in (sorted(glob.glob(pattern)) or [pattern])]
+    failures = 0
+    start = time.perf_counter()
+    for path in paths:
+        try:
+            ok = Replay.load(path).verify()
+        except (OSError, ReplayError, ValueError) as e:
+            print("ERROR %s: %s" % (path, e))
+            failures += 1
+            continue
+        if not ok:
+            failures += 1
+        if not ok or not args.quiet:
+            print("%s %s" % ("OK      " if ok else "MISMATCH", path))
+    elapsed = time.perf_counter() - start
+
+    print("%d replays, %d failed, %.0f replays/s" % (len(paths), failures, len(paths) / max(elapsed, 1e-9)))
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
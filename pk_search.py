@@ -0,0 +1,186 @@
+import argparse
+import json
+import time
+from functools import lru_cache
+
+from pk_engine import NUM_AREAS, ROUNDS, SUPER_SAVE_CHANCE, parse_rounds
+
+# PK戦のゲーム木の探索（pygameに依存しない）
+# 1回のキックは9x9の同時手番ゲーム（キッカーとキーパーが同時にエリアを選ぶ）で、
+# 試合全体は (ラウンド, 手番, 先攻の得点, 後攻の得点) ごとの勝率を後ろから順に求めて表にしておく
+#
+# キックの利得は「ゴールしたときの勝率」と「外したときの勝率」をゴールの確率で混ぜたものなので、
+# ゴールの確率について線形になる。そのため各局面の均衡の混合戦略は局面によらず同じで、
+# 9x9のゲームを1回解けば、あとは勝率の表を作るだけでよい
+# サドンデスの局面はラウンドによらず同じ形なので、表には入れずに式で求める
+
+SOLVER_ITERATIONS = 1000     # 9x9のゲームを解くときの反復回数
+DRAW_VALUE = 0.5             # 引き分けの価値（勝ち=1, 負け=0）
+
+def goal_matrix(super_save_chance=SUPER_SAVE_CHANCE):
+    # [キックのエリア][ダイブのエリア] -> ゴールの確率
+    return [[0.0 if kick == save else 1 - super_save_chance for save in range(NUM_AREAS)]
+            for kick in range(NUM_AREAS)]
+
+def regret_strategy(regrets):
+    # 正の後悔に比例した混合戦略（後悔がなければ一様）
+    total = sum(regrets)
+    if total <= 0:
+        return [1 / len(regrets)] * len(regrets)
+    return [regret / total for regret in regrets]
+
+def solve_matrix_game(matrix, iterations=SOLVER_ITERATIONS):
+    # 行（キッカー）はゴールの確率を最大に、列（キーパー）は最小にしたい2人零和ゲームの均衡を求める
+    # 後悔最小化（regret matching+、交互に更新して後半ほど重く平均する）で混合戦略を近似する
+    rows = len(matrix)
+    cols = len(matrix[0])
+    row_regrets = [0.0] * rows
+    col_regrets = [0.0] * cols
+    row_sums = [0.0] * rows
+    col_sums = [0.0] * cols
+    col_mix = regret_strategy(col_regrets)
+    for t in range(1, iterations + 1):
+        # キッカーの更新（キーパーの現在の混合戦略に対する各エリアの利得）
+        row_mix = regret_strategy(row_regrets)
+        payoffs = [sum(matrix[r][c] * col_mix[c] for c in range(cols)) for r in range(rows)]
+        expected = sum(row_mix[r] * payoffs[r] for r in range(rows))
+        for r in range(rows):
+            row_regrets[r] = max(0.0, row_regrets[r] + payoffs[r] - expected)
+        row_mix = regret_strategy(row_regrets)
+
+        # キーパーの更新（ゴールの確率が低いほどよい）
+        payoffs = [sum(matrix[r][c] * row_mix[r] for r in range(rows)) for c in range(cols)]
+        expected = sum(col_mix[c] * payoffs[c] for c in range(cols))
+        for c in range(cols):
+            col_regrets[c] = max(0.0, col_regrets[c] + expected - payoffs[c])
+        col_mix = regret_strategy(col_regrets)
+
+        for r in range(rows):
+            row_sums[r] += t * row_mix[r]
+        for c in range(cols):
+            col_sums[c] += t * col_mix[c]
+
+    row_total = sum(row_sums)
+    col_total = sum(col_sums)
+    kick_mix = [weight / row_total for weight in row_sums]
+    save_mix = [weight / col_total for weight in col_sums]
+    value = sum(kick_mix[r] * save_mix[c] * matrix[r][c] for r in range(rows) for c in range(cols))
+    return kick_mix, save_mix, value
+
+class SearchTable:
+    # 局面ごとの先攻の勝率（引き分けは0.5）の表（置換表）
+    def __init__(self, rounds=ROUNDS, super_save_chance=SUPER_SAVE_CHANCE, matrix=None, sudden_death=False):
+        self.rounds = rounds
+        self.sudden_death = sudden_death
+        self.matrix = matrix if matrix is not None else goal_matrix(super_save_chance)
+        self.kick_mix, self.save_mix, self.goal_chance = solve_matrix_game(self.matrix)
+        self.values = {}  # (ラウンド, 手番, 先攻の得点, 後攻の得点) -> 先攻の勝率
+        self.build()
+
+    def build(self):
+        # 最終ラウンドの後攻のキックから逆順に埋める（手番0=先攻のキック, 1=後攻のキック）
+        p = self.goal_chance
+        for round in range(self.rounds, 0, -1):
+            for phase in (1, 0):
+                # ラウンドの開始時は双方round-1本まで、後攻のキックの前は先攻だけround本まで蹴っている
+                for first in range(round + phase):
+                    for second in range(round):
+                        if phase == 0:
+                            goal = self.value(round, 1, first + 1, second)
+                            miss = self.value(round, 1, first, second)
+                        else:
+                            goal = self.value(round + 1, 0, first, second + 1)
+                            miss = self.value(round + 1, 0, first, second)
+                        self.values[(round, phase, first, second)] = p * goal + (1 - p) * miss
+
+    def value(self, round, phase, first, second):
+        if round > self.rounds:
+            if self.sudden_death:
+                return self.sudden_death_value(phase, first - second)
+            if first > second:
+                return 1.0
+            return DRAW_VALUE if first == second else 0.0
+        return self.values[(round, phase, first, second)]
+
+    def sudden_death_value(self, phase, lead):
+        # サドンデスのラウンドでの先攻の勝率（leadは先攻のリード）
+        # 同点でラウンドを始めたときの勝率sは s = p(1-p) + (p^2 + (1-p)^2) s を解いて 0.5（p=0, 1なら決着しないので引き分け）
+        p = self.goal_chance
+        tied = 0.5 if 0 < p < 1 else DRAW_VALUE
+        if phase == 0:
+            if lead:
+                return 1.0 if lead > 0 else 0.0
+            return tied
+        # 後攻のキックの前（先攻が決めていればlead=1、外していればlead=0）
+        if lead > 1:
+            return 1.0
+        if lead < 0:
+            return 0.0
+        if lead == 1:
+            return p * tied + (1 - p)
+        return (1 - p) * tied
+
+    def save(self, path):
+        rows = [list(key) + [value] for key, value in sorted(self.values.items())]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"rounds": self.rounds, "sudden_death": self.sudden_death, "matrix": self.matrix, "kick_mix": self.kick_mix,
+                       "save_mix": self.save_mix, "goal_chance": self.goal_chance, "values": rows}, f)
+
+    @classmethod
+    def load(cls, path):
+        # 保存しておいた表を読み込む（起動時に計算し直さない）
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        table = cls.__new__(cls)
+        table.rounds = data["rounds"]
+        table.sudden_death = data.get("sudden_death", False)
+        table.matrix = data["matrix"]
+        table.kick_mix = data["kick_mix"]
+        table.save_mix = data["save_mix"]
+        table.goal_chance = data["goal_chance"]
+        table.values = {tuple(row[:4]): row[4] for row in data["values"]}
+        return table
+
+    def matches(self, rounds=ROUNDS, super_save_chance=SUPER_SAVE_CHANCE, sudden_death=False):
+        # 読み込んだ表が今のルール（ラウンド数、サドンデス、ゴールの確率）で作られたものか
+        return ((self.rounds, self.sudden_death) == (rounds, sudden_death)
+                and self.matrix == goal_matrix(super_save_chance))
+
+@lru_cache(maxsize=None)
+def default_table(rounds=ROUNDS, super_save_chance=SUPER_SAVE_CHANCE, sudden_death=False):
+    # ルールごとにプロセスで一度だけ作る（トーナメントのワーカーでも使い回す）
+    return SearchTable(rounds, super_save_chance, sudden_death=sudden_death)
+
+def format_table(table):
+    lines = [
+        "goal chance at equilibrium: %.4f" % table.goal_chance,
+        "kick mix: " + " ".join("%.3f" % p for p in table.kick_mix),
+        "save mix: " + " ".join("%.3f" % p for p in table.save_mix),
+        "",
+        "first kicker's win chance before each round (rows: first score, cols: second score)",
+    ]
+    for round in range(1, table.rounds + 1):
+        lines.append("round %d" % round)
+        for first in range(round):
+            lines.append("  %d: " % first + " ".join(
+                "%.3f" % table.value(round, 0, first, second) for second in range(round)))
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="PK戦の均衡戦略と局面ごとの勝率の表を計算する")
+    parser.add_argument("--rounds", type=parse_rounds, default=ROUNDS, help="ラウンド数")
+    parser.add_argument("--super-save", type=float, default=SUPER_SAVE_CHANCE, help="三角飛びの発動確率")
+    parser.add_argument("--sudden-death", action="store_true", help="同点ならサドンデスで決着をつける")
+    parser.add_argument("--save", help="計算した表を書き出すJSONファイル")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = SearchTable(args.rounds, args.super_save, sudden_death=args.sudden_death)
+    elapsed = time.perf_counter() - start
+    print(format_table(table))
+    print("states: %d  elapsed: %.3fs" % (len(table.values), elapsed))
+    if args.save:
+        table.save(args.save)
+
+if __name__ == "__main__":
+    main()
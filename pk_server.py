@@ -0,0 +1,377 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from pk_ai import STRATEGIES, create_strategy
+from pk_engine import NUM_AREAS, ROUNDS, SUPER_SAVE_CHANCE, GoalArea, match_over, parse_rounds, resolve_kick
+
+# 2人対戦のサーバー（asyncio、1プロセスで多数の試合を同時に進める。pygameに依存しない）
+# 接続した順に2人ずつ組み合わせ、キックごとに双方のエリアの選択を受け取って判定する
+# 選択はサーバーが預かり、両方がそろってから判定と一緒に公開する（相手の選択を先に知ることはできない）
+#
+# 通信は1行1メッセージの短いテキスト
+#   サーバー → クライアント
+#     MATCH <side> <rounds> <sudden_death>                       対戦相手が決まった（side 0=先攻, 1=後攻）
+#     TURN <round> <KICK|SAVE>                                   エリアを選ぶ番（キッカーかキーパーか）
+#     REVEAL <kick> <save> <super_save> <scored> <score0> <score1>  双方の選択と判定（スコアは先攻, 後攻の順）
+#     END <score0> <score1>                                      試合終了（サーバーが接続を閉じる）
+#     ABORT                                                      相手が切断した
+#     ERROR <reason>                                             不正なメッセージ（サーバーが接続を閉じる）
+#   クライアント → サーバー
+#     PICK <area>                                                選んだエリア（GoalAreaの値 0〜8）
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7777
+PICK_TIMEOUT = 60            # 試合中に選択を待つ秒数（超えたら切断扱い）
+SWEEP_INTERVAL = 5           # 時間切れの試合を探す間隔（秒、読み込みごとにタイマーを作らない）
+MAX_LINE = 64                # 1行の最大長（これより長いメッセージは不正）
+BACKLOG = 4096               # 同時に受け付けを待てる接続数
+
+class ProtocolError(Exception):
+    pass
+
+class Connection:
+    __slots__ = ("reader", "writer", "match", "side")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.match = None
+        self.side = None
+
+    def send(self, line):
+        # 小さなメッセージなので書き込みはバッファに積むだけにする（送信は読み込みの合間に進む）
+        if not self.writer.is_closing():
+            self.writer.write(line.encode() + b"\n")
+
+    def close(self):
+        if not self.writer.is_closing():
+            self.writer.close()
+
+class ServerMatch:
+    # 1試合分の状態（選択を受け取るたびに進める。ルールは試合エンジンと同じ関数を使う）
+    def __init__(self, players, rng, rounds=ROUNDS, sudden_death=False, super_save_chance=SUPER_SAVE_CHANCE,
+                 on_finish=None):
+        self.players = players       # [先攻, 後攻]
+        self.rng = rng
+        self.rounds = rounds
+        self.sudden_death = sudden_death
+        self.super_save_chance = super_save_chance
+        self.on_finish = on_finish
+        self.round = 1
+        self.kicker = 0              # 今のキックを蹴る側
+        self.scores = [0, 0]
+        self.picks = [None, None]    # 公開前の選択（両方がそろうまで誰にも送らない）
+        self.over = False
+        self.turn_started = 0.0      # 今のキックの選択を待ち始めた時刻（時間切れの判定用）
+
+    def start(self):
+        for side, player in enumerate(self.players):
+            player.match = self
+            player.side = side
+            player.send("MATCH %d %d %d" % (side, self.rounds, self.sudden_death))
+        self.start_turn()
+
+    def start_turn(self):
+        self.turn_started = time.monotonic()
+        for side, player in enumerate(self.players):
+            player.send("TURN %d %s" % (self.round, "KICK" if side == self.kicker else "SAVE"))
+
+    def pick(self, side, area):
+        if self.over:
+            raise ProtocolError("match is over")
+        if self.picks[side] is not None:
+            raise ProtocolError("already picked")
+        self.picks[side] = area
+        if self.picks[1 - side] is not None:
+            self.resolve()
+
+    def resolve(self):
+        # 双方の選択がそろったので判定して公開する
+        kick = self.picks[self.kicker]
+        save = self.picks[1 - self.kicker]
+        self.picks = [None, None]
+        super_save = self.rng.random() < self.super_save_chance
+        scored = resolve_kick(kick, save, super_save)
+        self.scores[self.kicker] += scored
+        message = "REVEAL %d %d %d %d %d %d" % (kick, save, super_save, scored, self.scores[0], self.scores[1])
+        for player in self.players:
+            player.send(message)
+
+        second_kicks = self.round if self.kicker == 1 else self.round - 1
+        if match_over(self.rounds, self.sudden_death, self.round, second_kicks, self.scores[0], self.scores[1]):
+            self.finish("END %d %d" % tuple(self.scores))
+            return
+        if self.kicker == 1:
+            self.round += 1
+        self.kicker = 1 - self.kicker
+        self.start_turn()
+
+    def finish(self, message):
+        self.over = True
+        for player in self.players:
+            player.send(message)
+            player.close()
+        if self.on_finish:
+            self.on_finish(self, True)
+
+    def timeout(self):
+        # 選んでいない側を切断する（相手には切断と同じくABORTが届く）
+        for side, player in enumerate(self.players):
+            if self.picks[side] is None:
+                player.send("ERROR timeout")
+                player.close()
+
+    def abort(self, side):
+        # sideが切断したので、相手にだけ知らせて終わる
+        if self.over:
+            return
+        self.over = True
+        opponent = self.players[1 - side]
+        opponent.send("ABORT")
+        opponent.close()
+        if self.on_finish:
+            self.on_finish(self, False)
+
+class PKServer:
+    def __init__(self, rounds=ROUNDS, sudden_death=False, super_save_chance=SUPER_SAVE_CHANCE, seed=None):
+        self.rounds = rounds
+        self.sudden_death = sudden_death
+        self.super_save_chance = super_save_chance
+        self.rng = random.Random(seed)  # 試合ごとの乱数のシードを作る
+        self.waiting = None             # 対戦相手を待っている接続
+        self.matches = set()            # 進行中の試合
+        self.finished = 0
+        self.aborted = 0
+        self.sweeper = None
+
+    @property
+    def active(self):
+        return len(self.matches)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        if self.sweeper is None:
+            self.sweeper = asyncio.create_task(self.sweep())
+        return await asyncio.start_server(self.handle, host, port, backlog=BACKLOG, limit=MAX_LINE)
+
+    def stop(self):
+        if self.sweeper is not None:
+            self.sweeper.cancel()
+            self.sweeper = None
+
+    async def sweep(self):
+        # 選択が時間内に届かない試合をまとめて探す
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            deadline = time.monotonic() - PICK_TIMEOUT
+            for match in [match for match in self.matches if match.turn_started < deadline]:
+                match.timeout()
+
+    def pair(self, connection):
+        # 待っている人がいれば試合を始め、いなければ待つ
+        waiting = self.waiting
+        if waiting is None or waiting.writer.is_closing():
+            self.waiting = connection
+            return
+        self.waiting = None
+        match = ServerMatch([waiting, connection], random.Random(self.rng.getrandbits(64)),
+                            self.rounds, self.sudden_death, self.super_save_chance, self.match_finished)
+        self.matches.add(match)
+        match.start()
+
+    def match_finished(self, match, completed):
+        self.matches.discard(match)
+        if completed:
+            self.finished += 1
+        else:
+            self.aborted += 1
+
+    def receive(self, connection, line):
+        fields = line.split()
+        if len(fields) != 2 or fields[0] != b"PICK":
+            raise ProtocolError("unknown message")
+        if connection.match is None:
+            raise ProtocolError("no match")
+        try:
+            area = int(fields[1])
+        except ValueError:
+            raise ProtocolError("bad area") from None
+        if not 0 <= area < NUM_AREAS:
+            raise ProtocolError("bad area")
+        connection.match.pick(connection.side, area)
+
+    async def handle(self, reader, writer):
+        connection = Connection(reader, writer)
+        self.pair(connection)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.receive(connection, line)
+                await writer.drain()
+        except ProtocolError as e:
+            connection.send("ERROR %s" % e)
+        except ValueError:
+            connection.send("ERROR line too long")
+        except ConnectionError:
+            pass  # 切断
+        finally:
+            if self.waiting is connection:
+                self.waiting = None
+            match = connection.match
+            if match is not None:
+                match.abort(connection.side)
+            connection.close()
+
+class BotPlayer:
+    # pk_aiの戦略で選ぶ代わりのクライアント（サーバーの動作確認と負荷試験用）
+    def __init__(self, strategy, rng):
+        self.strategy = strategy
+        self.rng = rng
+
+    def set_rules(self, rounds, sudden_death):
+        self.strategy.set_rules(rounds, sudden_death)
+
+    async def choose(self, round, kicking, own_score, opponent_score):
+        if kicking:
+            return self.strategy.choose_kick(self.rng, round, own_score, opponent_score)
+        return self.strategy.choose_save(self.rng, round, own_score, opponent_score)
+
+    def observe(self, kicking, own_area, opponent_area, scored, super_save):
+        self.strategy.observe(kicking, own_area, opponent_area, scored)
+
+    def show(self, text):
+        pass
+
+class HumanPlayer:
+    # 端末から1〜9（テンキーの並びではなく左上から右下の順）でエリアを選ぶクライアント
+    def set_rules(self, rounds, sudden_death):
+        self.show("match found: %d rounds%s" % (rounds, ", sudden death" if sudden_death else ""))
+
+    async def choose(self, round, kicking, own_score, opponent_score):
+        prompt = "round %d %s (%d-%d) area 1-9: " % (round, "kick" if kicking else "save", own_score, opponent_score)
+        loop = asyncio.get_running_loop()
+        while True:
+            text = await loop.run_in_executor(None, input, prompt)
+            if text.strip().isdigit() and 1 <= int(text) <= NUM_AREAS:
+                return int(text) - 1
+
+    def observe(self, kicking, own_area, opponent_area, scored, super_save):
+        kick, save = (own_area, opponent_area) if kicking else (opponent_area, own_area)
+        self.show("kick %s / save %s%s -> %s" % (GoalArea(kick).name, GoalArea(save).name,
+                                                 " (super save)" if super_save else "",
+                                                 "GOAL" if scored else "SAVED"))
+
+    def show(self, text):
+        print(text)
+
+async def play_client(player, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    # サーバーにつないで1試合行い、(自分の側, 先攻の得点, 後攻の得点) を返す（中断ならスコアはNone）
+    reader, writer = await asyncio.open_connection(host, port)
+    side = None
+    scores = [0, 0]
+    kicking = False
+    own_area = None
+    result = None
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            fields = line.split()
+            command = fields[0]
+            if command == b"TURN":
+                kicking = fields[2] == b"KICK"
+                own_area = await player.choose(int(fields[1]), kicking, scores[side], scores[1 - side])
+                writer.write(b"PICK %d\n" % own_area)
+            elif command == b"REVEAL":
+                kick, save, super_save, scored, score0, score1 = map(int, fields[1:])
+                scores = [score0, score1]
+                player.observe(kicking, own_area, save if kicking else kick, bool(scored), bool(super_save))
+            elif command == b"MATCH":
+                side = int(fields[1])
+                player.set_rules(int(fields[2]), fields[3] == b"1")
+            elif command == b"END":
+                result = (int(fields[1]), int(fields[2]))
+                player.show("final score %d-%d" % (result[side], result[1 - side]))
+                break
+            else:
+                player.show(line.decode().strip())  # ABORT / ERROR
+                break
+    finally:
+        writer.close()
+    return side, result
+
+async def run_bots(pairs, strategies, server, host=DEFAULT_HOST, seed=0):
+    # 同じプロセスでサーバーとpairs組の代わりのクライアントを動かす
+    listener = await server.start(host, 0)
+    port = listener.sockets[0].getsockname()[1]
+    names = [strategies[i % len(strategies)] for i in range(pairs * 2)]
+    players = [BotPlayer(create_strategy(name), random.Random(seed * 1_000_003 + i)) for i, name in enumerate(names)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(play_client(player, host, port) for player in players))
+    elapsed = time.perf_counter() - start
+    listener.close()
+    await listener.wait_closed()
+    server.stop()
+    return names, results, elapsed
+
+def summarize_bots(server, names, results, elapsed):
+    completed = sum(1 for _, scores in results if scores is not None) // 2
+    lines = [
+        "matches: %d completed, %d aborted (server: %d finished, %d aborted, %d active)" % (
+            completed, len(results) // 2 - completed, server.finished, server.aborted, server.active),
+        "elapsed: %.2fs (%.0f matches/s)" % (elapsed, completed / max(elapsed, 1e-9)),
+    ]
+    wins = {}
+    for name, (side, scores) in zip(names, results):
+        if scores is not None:
+            row = wins.setdefault(name, [0, 0, 0])
+            own, opponent = scores[side], scores[1 - side]
+            row[0 if own > opponent else 1 if own == opponent else 2] += 1
+    for name, (won, drawn, lost) in sorted(wins.items()):
+        lines.append("%-12s won %d  drawn %d  lost %d" % (name, won, drawn, lost))
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="2人対戦のサーバー（--connectでクライアント、--botsで代わりのクライアントを使った負荷試験）")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="待ち受ける（接続する）アドレス")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="ポート番号")
+    parser.add_argument("--rounds", type=parse_rounds, default=ROUNDS, help="1試合のラウンド数")
+    parser.add_argument("--sudden-death", action="store_true", help="同点ならサドンデスで決着をつける")
+    parser.add_argument("--seed", type=int, help="乱数シード（三角飛びの判定）")
+    parser.add_argument("--connect", action="store_true", help="サーバーに接続して端末から対戦する")
+    parser.add_argument("--bots", type=int, help="代わりのクライアントをこの組数だけ同時に対戦させる")
+    parser.add_argument("--bot-strategies", default="random,search",
+                        help="代わりのクライアントの戦略（カンマ区切り、順に割り当てる）")
+    args = parser.parse_args()
+
+    if args.connect:
+        asyncio.run(play_client(HumanPlayer(), args.host, args.port))
+        return
+
+    server = PKServer(args.rounds, args.sudden_death, seed=args.seed)
+    if args.bots:
+        strategies = [name.strip() for name in args.bot_strategies.split(",") if name.strip()]
+        for name in strategies:
+            if name not in STRATEGIES:
+                parser.error("unknown strategy: %s" % name)
+        names, results, elapsed = asyncio.run(run_bots(args.bots, strategies, server, args.host, args.seed or 0))
+        print(summarize_bots(server, names, results, elapsed))
+        sys.exit(1 if server.aborted else 0)
+
+    async def serve():
+        listener = await server.start(args.host, args.port)
+        print("listening on %s:%d" % (args.host, args.port))
+        async with listener:
+            await listener.serve_forever()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+from pk_engine import NUM_AREAS, ROUNDS, SUPER_SAVE_CHANCE, parse_rounds
+
+# PK戦のモンテカルロシミュレーター（バランス調整用）
+# 1回のPK戦を配列の1要素として扱い、N試合分をまとめて配列演算で進める
+# 勝敗が決まった試合はマスクで外し、その後のキックは数えない（ゲームと同じく途中で終わる）
+
+CHUNK_SIZE = 1_000_000       # 1回の配列演算で処理する試合数（メモリ使用量の上限）
+CONFIDENCE_Z = 1.959964      # 95%信頼区間のz値
+SUDDEN_DEATH_LIMIT = 1000    # サドンデスの最大ラウンド数（決着しない重みの組み合わせで止まらないように）
+
+def normalize_weights(weights):
+    # 9エリアの選択確率（Noneなら一様分布）
+    if weights is None:
+        return None
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.shape != (NUM_AREAS,) or (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("weights must be %d non-negative numbers" % NUM_AREAS)
+    return weights / weights.sum()
+
+def choose_areas(rng, weights, size):
+    # 各試合のエリア選択をまとめて引く
+    if weights is None:
+        return rng.integers(0, NUM_AREAS, size, dtype=np.int8)
+    return rng.choice(NUM_AREAS, size, p=weights).astype(np.int8)
+
+def kick_results(rng, kick_weights, save_weights, super_save_chance, size):
+    # キック1回分の判定（三角飛び発動時は必ずセーブ）
+    kicks = choose_areas(rng, kick_weights, size)
+    saves = choose_areas(rng, save_weights, size)
+    super_save = rng.random(size) < super_save_chance
+    return (kicks != saves) & ~super_save
+
+def simulate(n, rounds=ROUNDS, super_save_chance=SUPER_SAVE_CHANCE,
+             player_kick_weights=None, player_save_weights=None,
+             ai_kick_weights=None, ai_save_weights=None,
+             seed=None, chunk_size=CHUNK_SIZE, sudden_death=False, play_out=False):
+    rng = np.random.default_rng(seed)
+    player_kick_weights = normalize_weights(player_kick_weights)
+    player_save_weights = normalize_weights(player_save_weights)
+    ai_kick_weights = normalize_weights(ai_kick_weights)
+    ai_save_weights = normalize_weights(ai_save_weights)
+
+    wins = draws = losses = 0
+    player_goals = np.zeros(rounds, dtype=np.int64)  # ラウンドごとのゴール数
+    ai_goals = np.zeros(rounds, dtype=np.int64)
+    player_extra_goals = 0      # サドンデスでのゴール数
+    ai_extra_goals = 0
+    kicks = 0                   # 実際に蹴られたキックの数
+    sudden_death_matches = 0    # サドンデスにもつれた試合数
+    sudden_death_rounds = 0     # サドンデスで蹴ったラウンド数の合計
+    longest_sudden_death = 0
+
+    done = 0
+    while done < n:
+        size = min(chunk_size, n - done)
+        player_score = np.zeros(size, dtype=np.int16)
+        ai_score = np.zeros(size, dtype=np.int16)
+
+        alive = np.ones(size, dtype=bool)  # まだ勝敗が決まっていない試合
+
+        for r in range(rounds):
+            # プレイヤーのキック（AIがゴールキーパー）
+            kicks += int(np.count_nonzero(alive))
+            scored = kick_results(rng, player_kick_weights, ai_save_weights, super_save_chance, size) & alive
+            player_score += scored
+            player_goals[r] += np.count_nonzero(scored)
+            if not play_out:
+                # 残りを全部決めても追いつけない試合は終わり
+                alive &= (player_score + (rounds - r - 1) >= ai_score) & (ai_score + (rounds - r) >= player_score)
+
+            # AIのキック（プレイヤーがゴールキーパー）
+            kicks += int(np.count_nonzero(alive))
+            scored = kick_results(rng, ai_kick_weights, player_save_weights, super_save_chance, size) & alive
+            ai_score += scored
+            ai_goals[r] += np.count_nonzero(scored)
+            if not play_out:
+                alive &= (player_score + (rounds - r - 1) >= ai_score) & (ai_score + (rounds - r - 1) >= player_score)
+
+        if sudden_death:
+            # 同点の試合だけを取り出し、決着がつくまで1ラウンドずつ蹴る
+            tied = np.flatnonzero(player_score == ai_score)
+            sudden_death_matches += tied.size
+            extra = 0
+            while tied.size and extra < SUDDEN_DEATH_LIMIT:
+                extra += 1
+                player_scored = kick_results(rng, player_kick_weights, ai_save_weights, super_save_chance, tied.size)
+                ai_scored = kick_results(rng, ai_kick_weights, player_save_weights, super_save_chance, tied.size)
+                kicks += 2 * tied.size
+                sudden_death_rounds += tied.size
+                player_score[tied] += player_scored
+                ai_score[tied] += ai_scored
+                player_extra_goals += int(np.count_nonzero(player_scored))
+                ai_extra_goals += int(np.count_nonzero(ai_scored))
+                tied = tied[player_scored == ai_scored]
+            if sudden_death_matches:
+                longest_sudden_death = max(longest_sudden_death, extra)
+
+        wins += int(np.count_nonzero(player_score > ai_score))
+        losses += int(np.count_nonzero(player_score < ai_score))
+        draws += int(np.count_nonzero(player_score == ai_score))
+        done += size
+
+    return {
+        "matches": n,
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "player_goals": player_goals,
+        "ai_goals": ai_goals,
+        "player_extra_goals": player_extra_goals,
+        "ai_extra_goals": ai_extra_goals,
+        "kicks": kicks,
+        "sudden_death_matches": sudden_death_matches,
+        "sudden_death_rounds": sudden_death_rounds,
+        "longest_sudden_death": longest_sudden_death,
+    }
+
+def wilson_interval(successes, n, z=CONFIDENCE_Z):
+    # 二項比率の信頼区間（Wilsonスコア区間）
+    if n == 0:
+        return 0.0, 0.0
+    p = successes / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return center - margin, center + margin
+
+def format_report(stats):
+    n = stats["matches"]
+    lines = ["matches: %d" % n, ""]
+    lines.append("%-8s %9s   %s" % ("outcome", "rate", "95% CI"))
+    for label, key in (("win", "wins"), ("draw", "draws"), ("loss", "losses")):
+        low, high = wilson_interval(stats[key], n)
+        lines.append("%-8s %8.4f%%   [%.4f%%, %.4f%%]" % (label, stats[key] / n * 100, low * 100, high * 100))
+
+    lines.append("")
+    lines.append("%-6s %20s   %20s" % ("round", "player goals (95% CI)", "ai goals (95% CI)"))
+    for r in range(len(stats["player_goals"])):
+        cells = []
+        for goals in (stats["player_goals"][r], stats["ai_goals"][r]):
+            low, high = wilson_interval(int(goals), n)
+            cells.append("%.4f [%.4f, %.4f]" % (goals / n, low, high))
+        lines.append("%-6d %20s   %20s" % (r + 1, cells[0], cells[1]))
+
+    lines.append("")
+    lines.append("expected score: player %.4f - ai %.4f" % (
+        (stats["player_goals"].sum() + stats["player_extra_goals"]) / n,
+        (stats["ai_goals"].sum() + stats["ai_extra_goals"]) / n))
+    lines.append("kicks per match: %.4f" % (stats["kicks"] / n))
+    if stats["sudden_death_matches"]:
+        matches = stats["sudden_death_matches"]
+        low, high = wilson_interval(matches, n)
+        lines.append("sudden death: %.4f%% [%.4f%%, %.4f%%]  extra rounds: mean %.4f  longest %d" % (
+            matches / n * 100, low * 100, high * 100,
+            stats["sudden_death_rounds"] / matches, stats["longest_sudden_death"]))
+    return "\n".join(lines)
+
+def parse_matches(value):
+    # コマンドラインの -n（1以上の整数）
+    try:
+        matches = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("matches must be an integer: %s" % value) from None
+    if matches < 1:
+        raise argparse.ArgumentTypeError("matches must be at least 1: %s" % value)
+    return matches
+
+def parse_weights(text):
+    if text is None:
+        return None
+    return [float(value) for value in text.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="PK戦のモンテカルロシミュレーター")
+    parser.add_argument("-n", "--matches", type=parse_matches, default=1_000_000, help="シミュレーションする試合数")
+    parser.add_argument("--rounds", type=parse_rounds, default=ROUNDS, help="1試合のラウンド数")
+    parser.add_argument("--super-save", type=float, default=SUPER_SAVE_CHANCE, help="三角飛びの発動確率")
+    parser.add_argument("--seed", type=int, default=None, help="乱数シード")
+    parser.add_argument("--sudden-death", action="store_true", help="同点ならサドンデスで決着をつける")
+    parser.add_argument("--play-out", action="store_true", help="勝敗が決まっても規定のラウンド数まで蹴る")
+    parser.add_argument("--player-kick-weights", help="プレイヤーのシュート方向の重み（9個のカンマ区切り）")
+    parser.add_argument("--player-save-weights", help="プレイヤーのセーブ方向の重み（9個のカンマ区切り）")
+    parser.add_argument("--ai-kick-weights", help="AIのシュート方向の重み（9個のカンマ区切り）")
+    parser.add_argument("--ai-save-weights", help="AIのセーブ方向の重み（9個のカンマ区切り）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = simulate(args.matches, rounds=args.rounds, super_save_chance=args.super_save,
+                     player_kick_weights=parse_weights(args.player_kick_weights),
+                     player_save_weights=parse_weights(args.player_save_weights),
+                     ai_kick_weights=parse_weights(args.ai_kick_weights),
+                     ai_save_weights=parse_weights(args.ai_save_weights),
+                     seed=args.seed, sudden_death=args.sudden_death, play_out=args.play_out)
+    elapsed = time.perf_counter() - start
+
+    print(format_report(stats))
+    print("elapsed: %.2fs (%.0f matches/s)" % (elapsed, args.matches / elapsed))
+
+if __name__ == "__main__":
+    main()
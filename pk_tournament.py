@@ -0,0 +1,122 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from pk_ai import STRATEGIES, create_strategy
+from pk_engine import ROUNDS, parse_rounds, play_shootout
+
+# AI戦略の総当たりトーナメント（対戦カードを複数プロセスに分散して実行する）
+
+CHUNK_MATCHES = 2000         # 1タスクで行う試合数
+WIN_POINTS = 3               # 勝ち点（勝利）
+DRAW_POINTS = 1              # 勝ち点（引き分け）
+
+def task_seed(base_seed, task_index):
+    # タスクごとに決まったシードを使うので、ワーカー数や実行順に関係なく結果が再現できる
+    return base_seed * 1_000_003 + task_index
+
+def play_task(task):
+    # ワーカープロセスで実行する1タスク（homeが先攻でmatches試合）
+    home_name, away_name, matches, seed, rounds, sudden_death = task
+    rng = random.Random(seed)
+    home = create_strategy(home_name)
+    away = create_strategy(away_name)
+
+    home_wins = draws = away_wins = 0
+    home_goals = away_goals = 0
+    for _ in range(matches):
+        home_score, away_score = play_shootout(home, away, rng, rounds, sudden_death=sudden_death)
+        home_goals += home_score
+        away_goals += away_score
+        if home_score > away_score:
+            home_wins += 1
+        elif home_score < away_score:
+            away_wins += 1
+        else:
+            draws += 1
+    return home_name, away_name, home_wins, draws, away_wins, home_goals, away_goals
+
+def build_tasks(names, matches, base_seed, chunk_matches=CHUNK_MATCHES, rounds=ROUNDS, sudden_death=False):
+    # 各組み合わせで先攻・後攻を入れ替えて半分ずつ戦う
+    tasks = []
+    for a, b in combinations(names, 2):
+        for home, away, count in ((a, b, matches - matches // 2), (b, a, matches // 2)):
+            while count > 0:
+                size = min(chunk_matches, count)
+                tasks.append((home, away, size, task_seed(base_seed, len(tasks)), rounds, sudden_death))
+                count -= size
+    return tasks
+
+def new_row():
+    return {"played": 0, "wins": 0, "draws": 0, "losses": 0, "goals_for": 0, "goals_against": 0, "points": 0}
+
+def merge_result(table, result):
+    home_name, away_name, home_wins, draws, away_wins, home_goals, away_goals = result
+    for name, wins, losses, goals_for, goals_against in (
+            (home_name, home_wins, away_wins, home_goals, away_goals),
+            (away_name, away_wins, home_wins, away_goals, home_goals)):
+        row = table[name]
+        row["played"] += wins + draws + losses
+        row["wins"] += wins
+        row["draws"] += draws
+        row["losses"] += losses
+        row["goals_for"] += goals_for
+        row["goals_against"] += goals_against
+        row["points"] += wins * WIN_POINTS + draws * DRAW_POINTS
+
+def run_tournament(names, matches, workers=None, base_seed=0, chunk_matches=CHUNK_MATCHES,
+                   rounds=ROUNDS, sudden_death=False):
+    tasks = build_tasks(names, matches, base_seed, chunk_matches, rounds, sudden_death)
+    table = {name: new_row() for name in names}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(play_task, tasks, chunksize=max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))):
+            merge_result(table, result)
+    return table
+
+def ranking(table):
+    # 勝ち点、得失点差、総得点の順に並べる
+    return sorted(table.items(), key=lambda item: (
+        -item[1]["points"],
+        -(item[1]["goals_for"] - item[1]["goals_against"]),
+        -item[1]["goals_for"],
+        item[0]))
+
+def format_table(table):
+    lines = ["%-4s %-12s %8s %8s %8s %8s %9s %9s %8s" % (
+        "rank", "strategy", "played", "won", "drawn", "lost", "for", "against", "points")]
+    for rank, (name, row) in enumerate(ranking(table), 1):
+        lines.append("%-4d %-12s %8d %8d %8d %8d %9d %9d %8d" % (
+            rank, name, row["played"], row["wins"], row["draws"], row["losses"],
+            row["goals_for"], row["goals_against"], row["points"]))
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="AI戦略の総当たりトーナメント")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES),
+                        help="参加する戦略（カンマ区切り、既定はすべて）")
+    parser.add_argument("-n", "--matches", type=int, default=10000, help="1組み合わせあたりの試合数")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="ワーカープロセス数（既定はCPU数）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--rounds", type=parse_rounds, default=ROUNDS, help="1試合のラウンド数")
+    parser.add_argument("--sudden-death", action="store_true", help="同点ならサドンデスで決着をつける")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.strategies.split(",") if name.strip()]
+    for name in names:
+        create_strategy(name)  # 名前の誤りを先に検出する
+    if len(names) < 2:
+        parser.error("at least two strategies are required")
+
+    start = time.perf_counter()
+    table = run_tournament(names, args.matches, args.workers, args.seed,
+                           rounds=args.rounds, sudden_death=args.sudden_death)
+    elapsed = time.perf_counter() - start
+
+    print(format_table(table))
+    print("elapsed: %.2fs" % elapsed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import math
+
+from pk_engine import KICK_ANIMATION_TICKS
+
+# ボールの軌道の事前計算（pygameに依存しない）
+# キックのアニメーションで毎フレーム補間しなくてよいように、ゴールエリアとtickごとの
+# ボールの位置・軌跡の点・更新領域を表にしておく（描画側は表を引くだけ）
+
+TRAIL_POINTS = 7             # ボールの後ろに描く軌跡の点の数
+TRAIL_SPACING = 0.1          # 軌跡の点の間隔（アニメーション全体に対する割合）
+DIVE_TRAIL_POINTS = 5        # キーパーのダイビングの軌跡の点の数
+PATH_MARGIN = 4              # 更新領域に含めるボールや点の大きさの余白
+CURVES = ("linear", "ease", "arc")  # linear: 等速の直線（従来の動き）、ease: 減速、arc: 山なり
+
+def curve_progress(curve, progress):
+    # 経過時間の割合を軌道上の進み具合に変換する
+    if curve == "ease":
+        return 1 - (1 - progress) * (1 - progress)
+    return progress
+
+def path_rect(points):
+    # 点の集まりを囲む更新領域 (left, top, width, height)
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    left = min(xs) - PATH_MARGIN
+    top = min(ys) - PATH_MARGIN
+    return (left, top, max(xs) - left + PATH_MARGIN + 1, max(ys) - top + PATH_MARGIN + 1)
+
+class BallPath:
+    # startから各ゴールエリアの中心targets[area]に向かうボールの軌道の表
+    def __init__(self, start, targets, ticks=KICK_ANIMATION_TICKS, curve="linear", lift=0, swerve=0):
+        if curve not in CURVES:
+            raise ValueError("unknown curve: %s (choices: %s)" % (curve, ", ".join(CURVES)))
+        self.start = start
+        self.ticks = ticks
+        self.curve = curve
+        self.lift = lift        # arcのときの最高到達点の高さ（ピクセル）
+        self.swerve = swerve    # 横方向のカーブの大きさ（ピクセル、回転をかけたシュート）
+        self.positions = []     # [エリア][tick] -> ボールの位置
+        self.trails = []        # [エリア][tick] -> 軌跡の点のタプル
+        self.rects = []         # [エリア][tick] -> 開始位置から現在位置までの更新領域
+        for target in targets:
+            positions = []
+            trails = []
+            rects = []
+            for tick in range(ticks + 1):
+                progress = min(1.0, tick / ticks)
+                position = self.point(target, progress)
+                positions.append(position)
+
+                # 軌跡はボールより少し前の時刻の位置に点を打つ
+                trail = []
+                if progress > TRAIL_SPACING:
+                    for i in range(1, TRAIL_POINTS + 1):
+                        trail_progress = progress - i * TRAIL_SPACING
+                        if trail_progress > 0:
+                            trail.append(self.point(target, trail_progress))
+                trails.append(tuple(trail))
+                rects.append(path_rect(positions))
+            self.positions.append(positions)
+            self.trails.append(trails)
+            self.rects.append(rects)
+
+    def point(self, target, progress):
+        # 経過時間の割合progressでのボールの位置（整数のピクセル座標）
+        start_x, start_y = self.start
+        target_x, target_y = target
+        t = curve_progress(self.curve, progress)
+        x = start_x + (target_x - start_x) * t
+        y = start_y + (target_y - start_y) * t
+        if self.curve == "arc":
+            y -= self.lift * 4 * t * (1 - t)
+        if self.swerve:
+            x += self.swerve * math.sin(math.pi * t)
+        return int(x), int(y)
+
+    def lookup(self, area, tick, alpha=0.0):
+        # (位置, 軌跡の点, 更新領域) を返す
+        # alphaは次のtickまでの経過割合で、位置は前後のtickの間を補間する
+        tick = min(max(tick, 0), self.ticks)
+        positions = self.positions[area]
+        if alpha <= 0 or tick == self.ticks:
+            return positions[tick], self.trails[area][tick], self.rects[area][tick]
+        (x0, y0), (x1, y1) = positions[tick], positions[tick + 1]
+        position = (int(x0 + (x1 - x0) * alpha), int(y0 + (y1 - y0) * alpha))
+        nearest = tick + 1 if alpha >= 0.5 else tick
+        return position, self.trails[area][nearest], self.rects[area][tick + 1]
+
+def dive_trail(start, target, points=DIVE_TRAIL_POINTS):
+    # キーパーが飛んだ軌跡の点（開始位置からセーブ位置まで等間隔）
+    start_x, start_y = start
+    target_x, target_y = target
+    trail = []
+    for i in range(1, points + 1):
+        progress = i / points
+        trail.append((int(start_x + (target_x - start_x) * progress),
+                      int(start_y + (target_y - start_y) * progress)))
+    return tuple(trail)
@@ -0,0 +1,47 @@
+import random
+import sys
+
+import pytest
+
+from pk_engine import RandomStrategy, play_shootout
+from pk_sim import main, simulate
+
+# シミュレーターの平均得点が試合エンジン（play_shootout）と同じルールで一致するか
+ENGINE_MATCHES = 20_000
+SIM_MATCHES = 200_000
+TOLERANCE = 0.05             # 平均得点の許容差（エンジン側の標準誤差は約0.01）
+
+def engine_expected_score(sudden_death):
+    rng = random.Random(1)
+    home = RandomStrategy()
+    away = RandomStrategy()
+    home_goals = away_goals = 0
+    for _ in range(ENGINE_MATCHES):
+        home_score, away_score = play_shootout(home, away, rng, sudden_death=sudden_death)
+        home_goals += home_score
+        away_goals += away_score
+    return home_goals / ENGINE_MATCHES, away_goals / ENGINE_MATCHES
+
+def sim_expected_score(sudden_death):
+    stats = simulate(SIM_MATCHES, seed=1, sudden_death=sudden_death)
+    return ((stats["player_goals"].sum() + stats["player_extra_goals"]) / SIM_MATCHES,
+            (stats["ai_goals"].sum() + stats["ai_extra_goals"]) / SIM_MATCHES)
+
+def test_expected_score_matches_engine_with_sudden_death():
+    engine = engine_expected_score(sudden_death=True)
+    sim = sim_expected_score(sudden_death=True)
+    assert abs(sim[0] - engine[0]) < TOLERANCE
+    assert abs(sim[1] - engine[1]) < TOLERANCE
+
+def test_expected_score_matches_engine():
+    engine = engine_expected_score(sudden_death=False)
+    sim = sim_expected_score(sudden_death=False)
+    assert abs(sim[0] - engine[0]) < TOLERANCE
+    assert abs(sim[1] - engine[1]) < TOLERANCE
+
+@pytest.mark.parametrize("matches", ["0", "-5"])
+def test_rejects_non_positive_matches(monkeypatch, capsys, matches):
+    monkeypatch.setattr(sys, "argv", ["pk_sim.py", "-n", matches])
+    with pytest.raises(SystemExit):
+        main()
+    assert "matches must be at least 1" in capsys.readouterr().err